@@ -0,0 +1,16 @@
+import threading
+
+from .buffered_writer import BufferedWriter, create_buffered_writer
+from .models import AgentActivityLog
+
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def get_activity_writer() -> BufferedWriter:
+    global _writer
+    if _writer is None:
+        with _writer_lock:
+            if _writer is None:
+                _writer = create_buffered_writer(AgentActivityLog)
+    return _writer
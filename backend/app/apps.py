@@ -4,3 +4,9 @@ from django.apps import AppConfig
 class AgentsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'app'
+
+    def ready(self):
+        from . import signals  # noqa: F401
+        from .prometheus import REGISTRY
+
+        REGISTRY.start_exporter()
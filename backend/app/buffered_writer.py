@@ -0,0 +1,182 @@
+import atexit
+import logging
+import queue
+import threading
+import time
+
+from django.conf import settings
+from django.db import IntegrityError, close_old_connections, connection
+
+from .lifespan import on_shutdown
+
+logger = logging.getLogger(__name__)
+
+FULL_POLICIES = ("drop", "block")
+
+
+class BufferedWriter:
+    """
+    In-memory buffer of unsaved model instances written by a background thread with `bulk_create`.
+
+    A batch is flushed once it reaches `batch_size` rows or `flush_interval` seconds after
+    its first row. The queue is bounded: when it is full, rows are either dropped or the
+    producer blocks for up to `block_timeout` seconds, depending on `policy`.
+    """
+
+    def __init__(self, model, max_queue=10000, batch_size=200, flush_interval=1.0, policy="drop", block_timeout=5):
+        if policy not in FULL_POLICIES:
+            raise ValueError(f"Unsupported buffered writer queue policy: {policy}")
+
+        self.model = model
+        self.label = model._meta.verbose_name_plural
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.policy = policy
+        self.block_timeout = block_timeout
+
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._thread = None
+        self._start_lock = threading.Lock()
+
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+
+    def _ensure_started(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name=f"{self.model._meta.model_name}-writer", daemon=True)
+                self._thread.start()
+
+    def _drop(self, entry):
+        self.dropped += 1
+        if self.dropped == 1 or self.dropped % 1000 == 0:
+            logger.warning(f"Queue of {self.label} is full; dropped {self.dropped} entries so far")
+
+    def offer(self, entry) -> bool:
+        """
+        Enqueue without blocking.
+        Returns:
+            bool: False when the queue is full and the caller should block (`block` policy).
+        """
+        self._ensure_started()
+        try:
+            self._queue.put_nowait(entry)
+            return True
+        except queue.Full:
+            if self.policy == "drop":
+                self._drop(entry)
+                return True
+            return False
+
+    def put(self, entry):
+        """
+        Enqueue an unsaved instance, applying the full-queue policy.
+        """
+        if self.offer(entry):
+            return
+        try:
+            self._queue.put(entry, timeout=self.block_timeout)
+        except queue.Full:
+            self._drop(entry)
+
+    def _write(self, batch):
+        close_old_connections()
+        try:
+            self.model.objects.bulk_create(batch)
+            self.written += len(batch)
+            return
+        except Exception:
+            logger.warning(f"Bulk insert of {len(batch)} {self.label} failed; retrying one by one", exc_info=True)
+
+        for entry in batch:
+            try:
+                entry.save(force_insert=True)
+            except IntegrityError:
+                # The agent was deleted while the entry was queued
+                entry.agent = None
+                try:
+                    entry.save(force_insert=True)
+                except Exception:
+                    self.failed += 1
+                    logger.exception(f"Failed to write {self.label}")
+                    continue
+            except Exception:
+                self.failed += 1
+                logger.exception(f"Failed to write {self.label}")
+                continue
+            self.written += 1
+
+    def _run(self):
+        batch = []
+        waiters = []
+        deadline = None
+        try:
+            while True:
+                timeout = None if deadline is None else max(0, deadline - time.monotonic())
+                try:
+                    item = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    item = None
+
+                if isinstance(item, threading.Event):
+                    waiters.append(item)
+                elif item is not None:
+                    batch.append(item)
+                    if deadline is None:
+                        deadline = time.monotonic() + self.flush_interval
+
+                if batch and (waiters or len(batch) >= self.batch_size or time.monotonic() >= deadline):
+                    self._write(batch)
+                    batch = []
+                    deadline = None
+
+                for waiter in waiters:
+                    waiter.set()
+                waiters = []
+        finally:
+            connection.close()
+
+    def flush(self, timeout=10) -> bool:
+        """
+        Block until everything enqueued so far is written.
+        """
+        if self._thread is None or not self._thread.is_alive():
+            return True
+        done = threading.Event()
+        try:
+            self._queue.put(done, timeout=timeout)
+        except queue.Full:
+            return False
+        return done.wait(timeout)
+
+    def close(self, timeout=10):
+        if not self.flush(timeout):
+            logger.warning(f"Timed out flushing {self.label} on shutdown")
+
+    def stats(self):
+        return {
+            "queued": self._queue.qsize(),
+            "written": self.written,
+            "dropped": self.dropped,
+            "failed": self.failed,
+        }
+
+
+def create_buffered_writer(model, **options) -> BufferedWriter:
+    """
+    Build a writer with the `ACTIVITY_LOG_*` queue settings, flushed on shutdown and at exit.
+    """
+    writer = BufferedWriter(
+        model,
+        max_queue=options.get("max_queue", getattr(settings, "ACTIVITY_LOG_QUEUE_SIZE", 10000)),
+        batch_size=options.get("batch_size", getattr(settings, "ACTIVITY_LOG_BATCH_SIZE", 200)),
+        flush_interval=options.get("flush_interval", getattr(settings, "ACTIVITY_LOG_FLUSH_INTERVAL", 1.0)),
+        policy=options.get("policy", getattr(settings, "ACTIVITY_LOG_FULL_POLICY", "drop")),
+        block_timeout=options.get("block_timeout", getattr(settings, "ACTIVITY_LOG_BLOCK_TIMEOUT", 5)),
+    )
+    atexit.register(writer.close)
+    on_shutdown(writer.close)
+    return writer
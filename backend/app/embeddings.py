@@ -0,0 +1,45 @@
+import threading
+
+import numpy as np
+from django.conf import settings
+
+_model = None
+_model_lock = threading.Lock()
+
+
+def get_embedding_model():
+    """
+    Lazily load the fastembed model shared by tool selection and chat memory.
+    Raises:
+        ImportError: If fastembed is not installed.
+    """
+    global _model
+    if _model is None:
+        with _model_lock:
+            if _model is None:
+                from fastembed import TextEmbedding
+                _model = TextEmbedding(model_name=getattr(settings, "EMBEDDING_MODEL", "BAAI/bge-small-en-v1.5"))
+    return _model
+
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    norms[norms == 0] = 1
+    return (vectors / norms).astype(np.float32)
+
+
+def embed_texts(texts) -> np.ndarray:
+    """
+    Embed documents into an (n, dim) matrix of unit-length float32 rows.
+    """
+    texts = list(texts)
+    if not texts:
+        return np.zeros((0, 0), dtype=np.float32)
+    return normalize(np.asarray(list(get_embedding_model().embed(texts)), dtype=np.float32))
+
+
+def embed_query(text: str) -> np.ndarray:
+    """
+    Embed a search query into a unit-length float32 vector.
+    """
+    return normalize(np.asarray(next(iter(get_embedding_model().query_embed(text))), dtype=np.float32))
@@ -0,0 +1,40 @@
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+_shutdown_hooks = []
+
+
+def on_shutdown(hook):
+    """
+    Register a blocking callable to run when the ASGI server shuts down.
+
+    Hooks run in a worker thread, most recently registered first, so buffers that feed
+    each other are drained in the right order.
+    """
+    if hook not in _shutdown_hooks:
+        _shutdown_hooks.append(hook)
+    return hook
+
+
+def run_shutdown_hooks():
+    for hook in reversed(_shutdown_hooks):
+        try:
+            hook()
+        except Exception:
+            logger.exception(f"Shutdown hook {hook!r} failed")
+
+
+async def lifespan_application(scope, receive, send):
+    """
+    ASGI lifespan handler; Django's handler only speaks HTTP.
+    """
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            await asyncio.to_thread(run_shutdown_hooks)
+            await send({"type": "lifespan.shutdown.complete"})
+            return
@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from app.mcp.memory import drop_message_index, index_turns
+from app.models import AgentConfig, ChatHistory
+
+
+class Command(BaseCommand):
+    help = "Rebuild the long-term memory index of agents from their stored chat history."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--agent", help="Only rebuild the index of this agent id.")
+        parser.add_argument("--batch-size", type=int, default=256, help="Turns embedded per batch.")
+
+    def handle(self, *args, **options):
+        agents = AgentConfig.objects.filter(memory_top_k__isnull=False)
+        if options["agent"]:
+            agents = AgentConfig.objects.filter(id=options["agent"])
+            if not agents.exists():
+                raise CommandError(f"Agent {options['agent']} not found.")
+
+        for agent in agents:
+            drop_message_index(agent.id)
+            total = 0
+            batch = []
+            pending_human = None
+            messages = ChatHistory.objects.filter(agent=agent).order_by("timestamp", "role_order").iterator()
+            for message in messages:
+                if message.role == "human":
+                    pending_human = message
+                    continue
+                if pending_human is not None:
+                    batch.append((pending_human, message))
+                    pending_human = None
+                if len(batch) >= options["batch_size"]:
+                    index_turns(agent.id, batch)
+                    total += len(batch)
+                    batch = []
+
+            if batch:
+                index_turns(agent.id, batch)
+                total += len(batch)
+            self.stdout.write(self.style.SUCCESS(f"Indexed {total} turns for agent '{agent.agent_name}'"))
@@ -0,0 +1,112 @@
+import asyncio
+import contextlib
+import io
+import json
+import math
+import statistics
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand, CommandError
+
+from app.mcp.recording import load_recording, recording_paths
+from app.mcp.replay import ReplayMismatch, live_breakdown, replay_recording
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(len(ordered) * pct / 100) - 1)]
+
+
+def summarize(values):
+    return {
+        "mean": round(statistics.mean(values), 3),
+        "p50": round(percentile(values, 50), 3),
+        "p95": round(percentile(values, 95), 3),
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        "Replay recorded chats (CHAT_RECORD_DIR) through the agent pipeline with the LLM and MCP "
+        "servers stubbed by the recorded responses, and report the time spent per stage."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("paths", nargs="+", help="Recording files or directories containing them.")
+        parser.add_argument("--iterations", type=int, default=5, help="Measured replays per recording.")
+        parser.add_argument("--warmup", type=int, default=1, help="Unmeasured replays per recording.")
+        parser.add_argument(
+            "--simulate-latency", action="store_true",
+            help="Wait as long as the live LLM and tool calls took instead of answering instantly.",
+        )
+        parser.add_argument("--json", metavar="PATH", help="Also write the report as JSON.")
+
+    def handle(self, *args, **options):
+        paths = recording_paths(options["paths"])
+        if not paths:
+            raise CommandError("No recordings found.")
+
+        report = asyncio.run(self.replay(paths, options))
+        self.print_report(report)
+
+        if options["json"]:
+            with open(options["json"], "w") as f:
+                json.dump(report, f, indent=2)
+
+    async def replay(self, paths, options):
+        replay_stages = defaultdict(list)
+        live = defaultdict(list)
+        runs = matched = mismatches = skipped = 0
+
+        for path in paths:
+            recording = load_recording(path)
+            if recording.get("error") or recording.get("output") is None:
+                skipped += 1
+                continue
+
+            for name, value in live_breakdown(recording).items():
+                live[name].append(value)
+
+            for iteration in range(options["warmup"] + options["iterations"]):
+                try:
+                    # AgentExecutor is verbose; keep its chain logs out of the report
+                    with contextlib.redirect_stdout(io.StringIO()):
+                        result = await replay_recording(recording, simulate_latency=options["simulate_latency"])
+                except ReplayMismatch as e:
+                    mismatches += 1
+                    self.stderr.write(f"{path}: {e}")
+                    break
+
+                if iteration < options["warmup"]:
+                    continue
+                runs += 1
+                matched += result["output_matches"]
+                for name, value in result["stages"].items():
+                    replay_stages[name].append(value)
+
+        return {
+            "recordings": len(paths),
+            "skipped": skipped,
+            "runs": runs,
+            "outputs_matched": matched,
+            "mismatches": mismatches,
+            "simulate_latency": options["simulate_latency"],
+            "live_ms": {name: summarize(values) for name, values in live.items()},
+            "replay_ms": {name: summarize(values) for name, values in replay_stages.items()},
+        }
+
+    def print_report(self, report):
+        self.stdout.write(
+            f"{report['recordings']} recordings ({report['skipped']} failed chats skipped), {report['runs']} replays, "
+            f"{report['outputs_matched']} with the recorded output, {report['mismatches']} diverged"
+        )
+
+        for title, stages in (("Live chats (recorded)", report["live_ms"]), ("Replay", report["replay_ms"])):
+            if not stages:
+                continue
+            self.stdout.write(f"\n{title:<24} {'mean ms':>12} {'p50 ms':>12} {'p95 ms':>12}")
+            for name, values in stages.items():
+                self.stdout.write(f"{name:<24} {values['mean']:>12.3f} {values['p50']:>12.3f} {values['p95']:>12.3f}")
+
+        if report["outputs_matched"] < report["runs"] or report["mismatches"]:
+            self.stdout.write(self.style.WARNING("\nSome replays did not reproduce their recording."))
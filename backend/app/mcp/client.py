@@ -3,16 +3,30 @@ import asyncio
 import logging
 from math import log
 import time
+import uuid
 from django.conf import settings
 from langchain.agents import  AgentExecutor, create_tool_calling_agent
 from langchain_groq import ChatGroq
 from langchain_openai import ChatOpenAI
+from langchain_core.caches import BaseCache
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
 from langchain_core.messages import SystemMessage
 
 from ..models import ActivityEvents, AgentConfig, ChatHistory
 
-from ..utils import get_tools, log_activity, log_activity_async, update_metrics
+from .executor_cache import executor_config_version, get_executor_cache, tool_set_variant
+from .history import get_chat_history, load_history_window, summary_messages
+from .llm_cache import bypass_llm_cache, get_llm_cache
+from .memory import index_turns, recall_turns
+from .recording import start_recording
+from .registry import get_agent_tools
+from .stub_llm import StubChatModel, stub_script
+from .tool_selector import select_tools
+from .tools import tool_run
+
+from ..prometheus import llm_metrics_handler
+from ..tracing import current_trace, span, start_trace, trace_config, traced
+from ..utils import log_activity, log_activity_async
 
 from asgiref.sync import sync_to_async
 
@@ -58,6 +72,16 @@ DEFAULT_TEMPLATE = """
 
 def get_llm_from_config(agent_config: dict):
     provider = agent_config.get("provider", "groq").lower()
+    cache = get_llm_cache(agent_config)
+
+    if provider == "stub":
+        if not settings.STUB_LLM_ENABLED:
+            raise ValueError("The stub LLM provider is disabled. Set STUB_LLM_ENABLED=True to use it.")
+        return StubChatModel(
+            latency_ms=settings.STUB_LLM_LATENCY_MS,
+            script=stub_script(agent_config.get("model"), getattr(settings, "STUB_LLM_SCRIPTS", None)),
+            cache=cache,
+        )
 
     if provider == "groq":
         api_key = settings.GROQ_API_KEY
@@ -79,29 +103,86 @@ def get_llm_from_config(agent_config: dict):
         "timeout": agent_config.get("timeout", 10),
         "max_retries": agent_config.get("max_retries", 2),
     }
+    if cache is not None:
+        llm_kwargs["cache"] = cache
 
     return llm_class(**llm_kwargs)
 
 @sync_to_async(thread_sensitive=False)
-def get_chat_history(agent, n_history_messages):
-    return list(ChatHistory.objects.filter(agent=agent).order_by('-timestamp')[:n_history_messages])
-
-@sync_to_async(thread_sensitive=False)
-def save_messages(agent, user_message, ai_message):
-    ChatHistory.objects.create(agent=agent, message=user_message, role="human", role_order=0)
-    ChatHistory.objects.create(agent=agent, message=ai_message, role="ai", role_order=1)
+@traced("db.save_messages")
+def save_messages(agent, user_message, ai_message, message_id=None):
+    human = ChatHistory.objects.create(id=message_id or uuid.uuid4(), agent=agent, message=user_message, role="human", role_order=0)
+    ai = ChatHistory.objects.create(agent=agent, message=ai_message, role="ai", role_order=1)
     logger.info(f"Saved messages for agent {agent.agent_name}: User: {user_message}, AI: {ai_message}")
 
-async def run_client(query: str, agent: AgentConfig):
-    start_time = time.time()
-    duration_ms = 0
+    if agent.memory_top_k:
+        try:
+            with span("memory.index"):
+                index_turns(agent.id, [(human, ai)])
+        except ImportError:
+            logger.warning("fastembed is not installed; long-term memory is disabled")
+        except Exception:
+            logger.exception(f"[{agent.agent_name}] Failed to index messages into long-term memory")
 
-    agent_id = agent.id
-    agent_name = agent.agent_name
-    mcp_servers = agent.mcp_server or {}
-    llm_config = agent.llm
+def build_executor(agent_config: dict, tools, llm=None):
+    llm = llm or get_llm_from_config(agent_config)
 
-    agent_config = {
+    prompt = ChatPromptTemplate.from_messages([
+        SystemMessage(content=agent_config.get("system_message", DEFAULT_TEMPLATE)),
+        MessagesPlaceholder(variable_name="chat_history"),
+        ("human", "{input}"),
+        MessagesPlaceholder(variable_name="agent_scratchpad", optional=True),
+    ])
+
+    agent_instance = create_tool_calling_agent(llm=llm, tools=tools, prompt=prompt)
+    # A streamed agent step calls the model's `astream`, which never consults the LLM cache
+    stream_runnable = not isinstance(getattr(llm, "cache", None), BaseCache)
+    return AgentExecutor(
+        agent=agent_instance, tools=tools, verbose=True, handle_parsing_errors=True, return_intermediate_steps=False,
+        stream_runnable=stream_runnable,
+    )
+
+async def get_agent_executor(agent: AgentConfig, agent_config: dict, query: str = None):
+    """
+    Return a compiled executor for the agent, building and caching it on a miss.
+    Args:
+        agent (AgentConfig): The agent to run.
+        agent_config (dict): The flattened agent/LLM config.
+        query (str, optional): The user message; when the agent sets `tool_top_k`, only
+            the tools most relevant to it are bound to the executor.
+    Returns:
+        AgentExecutor: Executor ready to be invoked with `input` and `chat_history`.
+    """
+    cache = get_executor_cache()
+    version = executor_config_version(agent_config, agent.mcp_server)
+    top_k = agent_config.get("tool_top_k")
+
+    if not top_k or query is None:
+        executor = cache.get(agent.id, version)
+        if executor is None:
+            with span("tools.load"):
+                tools = await get_agent_tools(agent)
+            with span("executor.build"):
+                executor = build_executor(agent_config, tools)
+            cache.put(agent.id, version, executor)
+        return executor
+
+    with span("tools.load"):
+        tools = await get_agent_tools(agent)
+    with span("tools.select", top_k=top_k):
+        tools = await select_tools(agent, tools, query, top_k)
+    variant = tool_set_variant(tools)
+    executor = cache.get(agent.id, version, variant)
+    if executor is None:
+        with span("executor.build"):
+            executor = build_executor(agent_config, tools)
+        cache.put(agent.id, version, executor, variant)
+    return executor
+
+def build_agent_config(agent: AgentConfig) -> dict:
+    llm_config = agent.llm
+    return {
+        "agent_id": str(agent.id),
         "provider": llm_config.provider,
         "model": llm_config.model,
         "api_key": llm_config.api_key,
@@ -111,8 +192,90 @@ async def run_client(query: str, agent: AgentConfig):
         "max_retries": llm_config.max_retries,
         "system_message": agent.system_message,
         "n_history_messages": llm_config.n_history_messages,
+        "history_token_budget": llm_config.history_token_budget,
+        "response_cache_ttl": llm_config.response_cache_ttl,
+        "tool_top_k": agent.tool_top_k,
+        "memory_top_k": agent.memory_top_k,
     }
 
+async def load_chat_history(agent: AgentConfig, agent_config: dict, query: str = None):
+    """
+    Return the prompt history as chronological `(role, text)` tuples.
+
+    With a `history_token_budget`, the recent turns that fit in the budget are preceded by
+    the rolling summary of older ones; otherwise the last `n_history_messages` are used.
+    When the agent sets `memory_top_k` and a query is given, the most relevant older turns
+    are recalled ahead of them.
+    """
+    try:
+        if agent_config.get("history_token_budget"):
+            summary, messages = await load_history_window(agent, agent_config, get_llm_from_config)
+            chat_history = summary_messages(summary) + messages
+        else:
+            history = await get_chat_history(agent, n_history_messages=agent_config.get("n_history_messages", 4))
+            chat_history = [(msg.role, msg.message) for msg in history] if history else []
+
+        if query is not None and agent_config.get("memory_top_k"):
+            chat_history = await recall_memory(agent, agent_config, query, chat_history) + chat_history
+        logger.info(f"[{agent.agent_name}] Retrieved chat history: {chat_history}")
+        return chat_history
+    except Exception as e:
+        logger.exception(f"[{agent.agent_name}] Error retrieving chat history")
+        return []
+
+@traced("memory.recall")
+async def recall_memory(agent: AgentConfig, agent_config: dict, query: str, chat_history):
+    try:
+        return await recall_turns(agent, query, agent_config["memory_top_k"], exclude=chat_history)
+    except Exception:
+        logger.exception(f"[{agent.agent_name}] Error recalling long-term memory")
+        return []
+
+def run_config(recorder=None):
+    """
+    Runnable config of one agent run: LLM metrics, plus tracing when the request is sampled
+    and recording when the chat is recorded.
+    """
+    callbacks = [llm_metrics_handler, *trace_config().get("callbacks", [])]
+    if recorder is not None:
+        callbacks.append(recorder.callback)
+    return {"callbacks": callbacks}
+
+async def log_execution_error(agent: AgentConfig, start_time: float, error: Exception) -> str:
+    duration_ms = int((time.time() - start_time) * 1000)
+    error_msg = str(error)
+
+    logger.exception(f"[{agent.agent_name}] Error during agent execution")
+
+    await log_activity_async(
+        agent=agent,
+        action=ActivityEvents.ERROR_OCCURRED,
+        description="An error occurred during agent execution",
+        metadata={"error": error_msg, "duration_ms": duration_ms}
+    )
+    return error_msg
+
+async def run_client(query: str, agent: AgentConfig, bypass_cache: bool = False):
+    request_id = uuid.uuid4()
+    # Recorded chats are always traced so the recording holds the live stage timings
+    recorder = start_recording(agent, request_id, query)
+    with start_trace(agent, "http", request_id, force=recorder is not None) as trace, bypass_llm_cache(bypass_cache):
+        result = await execute_chat(query, agent, recorder)
+
+    if recorder is not None:
+        recorder.finish(result, trace)
+        await asyncio.to_thread(recorder.save)
+
+    result["request_id"] = str(request_id)
+    return result
+
+async def execute_chat(query: str, agent: AgentConfig, recorder=None):
+    start_time = time.time()
+
+    agent_name = agent.agent_name
+    agent_config = build_agent_config(agent)
+    trace = current_trace()
+
     await log_activity_async(
         agent=agent,
         action=ActivityEvents.CHAT_STARTED,
@@ -121,49 +284,111 @@ async def run_client(query: str, agent: AgentConfig):
     )
 
     try:
-        llm = get_llm_from_config(agent_config)
-        tools = await get_tools(mcp_servers)
-
-        try:
-            history = await get_chat_history(agent, n_history_messages=agent_config.get("n_history_messages", 4))
-            chat_history = [(msg.role, msg.message) for msg in history] if history else []
-            logger.info(f"[{agent_name}] Retrieved chat history: {chat_history}")
-        except Exception as e:
-            logger.exception(f"[{agent_name}] Error retrieving chat history")
-            chat_history = []
+        with span("executor.get"):
+            executor = await get_agent_executor(agent, agent_config, query)
+        with span("history.load"):
+            chat_history = await load_chat_history(agent, agent_config, query)
 
-        prompt = ChatPromptTemplate.from_messages([
-            SystemMessage(content=agent_config.get("system_message", DEFAULT_TEMPLATE)),
-            MessagesPlaceholder(variable_name="chat_history"),
-            ("human", "{input}"),
-            MessagesPlaceholder(variable_name="agent_scratchpad", optional=True),
-        ])
-
-        agent_instance = create_tool_calling_agent(llm=llm, tools=tools, prompt=prompt)
-        executor = AgentExecutor(agent=agent_instance, tools=tools, verbose=True, handle_parsing_errors=True, return_intermediate_steps=False)
+        if recorder is not None:
+            recorder.set_inputs(agent_config, executor.tools, chat_history)
 
         logger.info(f"[{agent_name}] Executing agent query: {query}")
-        result = await executor.ainvoke({"input": query, "chat_history": chat_history})
+        with tool_run() as run, span("agent.invoke"):
+            result = await executor.ainvoke({"input": query, "chat_history": chat_history}, config=run_config(recorder))
+        result["tool_calls"] = run.calls
 
-        await save_messages(agent, query, result["output"])
+        message_id = uuid.uuid4()
+        if trace is not None:
+            trace.message_id = message_id
+        await save_messages(agent, query, result["output"], message_id)
 
         return result
 
     except Exception as e:
-        duration_ms = int((time.time() - start_time) * 1000)
-        error_msg = str(e)
-
-        logger.exception(f"[{agent_name}] Error during agent execution")
+        if trace is not None:
+            trace.status = "error"
+        error_msg = await log_execution_error(agent, start_time, e)
+        return {"error": error_msg}
 
-        await log_activity_async(
-            agent=agent,
-            action=ActivityEvents.ERROR_OCCURRED,
-            description="An error occurred during agent execution",
-            metadata={"error": error_msg, "duration_ms": duration_ms}
+async def stream_executor(executor, query: str, chat_history):
+    """
+    Invoke an executor and translate its LangChain events into `(event, data)` tuples,
+    ending with `("final", {"response": output, "tool_calls": [...timings]})`.
+    """
+    output = None
+    with tool_run() as run, span("agent.stream"):
+        events = executor.astream_events(
+            {"input": query, "chat_history": chat_history}, config=run_config(), version="v2"
         )
-        update_metrics(agent, success=False, response_time_ms=duration_ms)
+        async for event in events:
+            kind = event["event"]
+            if kind == "on_chat_model_stream":
+                content = event["data"]["chunk"].content
+                if content:
+                    yield "token", {"content": content}
+            elif kind == "on_tool_start":
+                yield "tool_start", {"id": event["run_id"], "name": event["name"], "input": event["data"].get("input")}
+            elif kind == "on_tool_end":
+                yield "tool_end", {"id": event["run_id"], "name": event["name"], "output": str(event["data"].get("output", ""))}
+            elif kind == "on_chain_end" and not event["parent_ids"]:
+                output = event["data"]["output"]["output"]
 
-        return {"error": error_msg}
+    yield "final", {"response": output, "tool_calls": run.calls}
+
+async def stream_client(query: str, agent: AgentConfig, bypass_cache: bool = False):
+    """
+    Run the agent and yield its progress as `(event, data)` tuples.
+
+    Events are `token` (LLM output chunk), `tool_start`, `tool_end`, and finally either
+    `final` with the complete response and `request_id`, or `error`. Messages are saved
+    before `final`. LLM responses served from the response cache produce no `token` events.
+    """
+    request_id = uuid.uuid4()
+    with start_trace(agent, "stream", request_id), bypass_llm_cache(bypass_cache):
+        async for event, data in stream_chat(query, agent):
+            if event == "final":
+                data = {**data, "request_id": str(request_id)}
+            yield event, data
+
+async def stream_chat(query: str, agent: AgentConfig):
+    start_time = time.time()
+
+    agent_name = agent.agent_name
+    agent_config = build_agent_config(agent)
+    trace = current_trace()
+
+    await log_activity_async(
+        agent=agent,
+        action=ActivityEvents.CHAT_STARTED,
+        description="Chat started with agent",
+        metadata={"query": query, "stream": True}
+    )
+
+    try:
+        with span("executor.get"):
+            executor = await get_agent_executor(agent, agent_config, query)
+        with span("history.load"):
+            chat_history = await load_chat_history(agent, agent_config, query)
+
+        logger.info(f"[{agent_name}] Streaming agent query: {query}")
+        final = None
+        async for event, data in stream_executor(executor, query, chat_history):
+            if event == "final":
+                final = data
+                break
+            yield event, data
+
+        message_id = uuid.uuid4()
+        if trace is not None:
+            trace.message_id = message_id
+        await save_messages(agent, query, final["response"], message_id)
+        yield "final", final
+
+    except Exception as e:
+        if trace is not None:
+            trace.status = "error"
+        error_msg = await log_execution_error(agent, start_time, e)
+        yield "error", {"error": error_msg}
 
 def agent_executor(query, agent):
     try:
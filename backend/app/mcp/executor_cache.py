@@ -0,0 +1,139 @@
+import asyncio
+import hashlib
+import json
+import threading
+import time
+import weakref
+from collections import OrderedDict
+
+from django.conf import settings
+
+from .registry import mcp_config_hash
+
+EXECUTOR_CONFIG_FIELDS = (
+    "provider", "model", "max_tokens", "temperature", "timeout", "max_retries", "system_message", "tool_top_k",
+    "response_cache_ttl",
+)
+
+
+def executor_config_version(agent_config: dict, mcp_servers) -> str:
+    """
+    Version string of everything baked into a compiled executor.
+    Args:
+        agent_config (dict): The flattened agent/LLM config built by `run_client`.
+        mcp_servers (dict): The agent's MCP server configurations.
+    Returns:
+        str: Hash that changes whenever the LLM config, system message or servers change.
+    """
+    payload = {field: agent_config.get(field) for field in EXECUTOR_CONFIG_FIELDS}
+    payload["mcp_servers"] = mcp_config_hash(mcp_servers)
+    encoded = json.dumps(payload, sort_keys=True, default=str).encode("utf-8")
+    return hashlib.sha256(encoded).hexdigest()
+
+
+def tool_set_variant(tools) -> str:
+    """
+    Short hash of a tool subset, so executors bound to different selections can coexist.
+    """
+    names = "\0".join(sorted(tool.name for tool in tools))
+    return hashlib.sha256(names.encode("utf-8")).hexdigest()[:16]
+
+
+def _current_loop():
+    try:
+        return asyncio.get_running_loop()
+    except RuntimeError:
+        return None
+
+
+class CachedExecutor:
+    def __init__(self, executor, loop):
+        self.executor = executor
+        self.loop_ref = weakref.ref(loop) if loop is not None else None
+        self.created_at = time.monotonic()
+
+    def usable_on(self, loop):
+        # LLM clients hold async HTTP connections bound to the loop they were first used on
+        if self.loop_ref is None:
+            return loop is None
+        return self.loop_ref() is loop
+
+
+class ExecutorCache:
+    """
+    LRU cache of fully built `AgentExecutor`s keyed by agent id, config version and
+    tool-set variant (agents with `tool_top_k` keep one executor per selected subset).
+    """
+
+    def __init__(self, max_entries=128, ttl=3600):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, agent_id, version, variant=""):
+        key = (str(agent_id), version, variant)
+        loop = _current_loop()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and (time.monotonic() - entry.created_at > self.ttl or not entry.usable_on(loop)):
+                del self._entries[key]
+                self.evictions += 1
+                entry = None
+
+            if entry is None:
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry.executor
+
+    def put(self, agent_id, version, executor, variant=""):
+        agent_id = str(agent_id)
+        key = (agent_id, version, variant)
+        with self._lock:
+            # Only one version per agent is ever useful
+            for stale in [stale for stale in self._entries if stale[0] == agent_id and stale[1] != version]:
+                del self._entries[stale]
+                self.evictions += 1
+
+            self._entries[key] = CachedExecutor(executor, _current_loop())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, agent_id):
+        agent_id = str(agent_id)
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == agent_id]:
+                del self._entries[key]
+                self.evictions += 1
+
+    def stats(self):
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_executor_cache() -> ExecutorCache:
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = ExecutorCache(
+                    max_entries=getattr(settings, "EXECUTOR_CACHE_SIZE", 128),
+                    ttl=getattr(settings, "EXECUTOR_CACHE_TTL", 3600),
+                )
+    return _cache
@@ -0,0 +1,261 @@
+import asyncio
+import logging
+import threading
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from langchain_core.messages import HumanMessage, SystemMessage
+
+from ..models import ChatHistory, ChatSummary
+from ..tracing import traced
+
+logger = logging.getLogger(__name__)
+
+# Role/formatting overhead added by chat templates around every message
+MESSAGE_OVERHEAD_TOKENS = 4
+
+SUMMARY_PROMPT = """
+    You maintain the running summary of a conversation between a user and an AI assistant.
+    Merge the new messages into the existing summary. Keep facts, decisions, names, numbers and open questions;
+    drop greetings and repetition. Write in the third person and keep it under {limit} tokens.
+"""
+
+_encoding = None
+_encoding_lock = threading.Lock()
+
+
+def get_encoding():
+    """
+    Load the tiktoken encoding used to size history, or None when it cannot be loaded
+    (tiktoken downloads its vocabulary on first use).
+    """
+    global _encoding
+    if _encoding is None:
+        with _encoding_lock:
+            if _encoding is None:
+                try:
+                    import tiktoken
+                    _encoding = tiktoken.get_encoding(getattr(settings, "HISTORY_TOKEN_ENCODING", "cl100k_base"))
+                except Exception:
+                    logger.warning("tiktoken encoding unavailable; estimating tokens from text length", exc_info=True)
+                    _encoding = False
+    return _encoding or None
+
+
+def count_tokens(text: str) -> int:
+    encoding = get_encoding()
+    if encoding is None:
+        return len(text) // 4 + 1
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def truncate_to_tokens(text: str, limit: int) -> str:
+    encoding = get_encoding()
+    if encoding is None:
+        return text[:limit * 4]
+    tokens = encoding.encode(text, disallowed_special=())
+    return text if len(tokens) <= limit else encoding.decode(tokens[:limit])
+
+
+def message_tokens(text: str) -> int:
+    return count_tokens(text) + MESSAGE_OVERHEAD_TOKENS
+
+
+def overflow_count(messages, budget: int) -> int:
+    """
+    Number of leading messages that do not fit in the token budget.
+
+    `messages` is a chronological list of `(role, text)` tuples. Whole turns are kept from
+    the newest backwards, so a human message is never separated from its answer; a
+    single turn larger than the budget is dropped rather than overflowing the window.
+    Returns:
+        int: Index of the first message that fits; everything before it overflows.
+    """
+    used = 0
+    start = len(messages)
+    index = len(messages)
+    while index > 0:
+        turn_start = index - 1
+        while turn_start > 0 and messages[turn_start][0] != "human":
+            turn_start -= 1
+
+        used += sum(message_tokens(text) for _, text in messages[turn_start:index])
+        if used > budget:
+            break
+        start = index = turn_start
+    return start
+
+
+def summary_messages(summary: str):
+    return [("system", f"Summary of the earlier conversation:\n{summary}")] if summary else []
+
+
+@sync_to_async(thread_sensitive=False)
+@traced("db.chat_history")
+def get_chat_history(agent, n_history_messages):
+    """
+    Return the last `n_history_messages` messages in chronological order.
+    """
+    messages = ChatHistory.objects.filter(agent=agent).order_by("-timestamp", "-role_order")[:n_history_messages]
+    return list(reversed(messages))
+
+
+def unsummarized(agent, summary):
+    messages = ChatHistory.objects.filter(agent=agent)
+    if summary is not None and summary.covered_until is not None:
+        messages = messages.filter(timestamp__gt=summary.covered_until)
+    return messages
+
+
+@sync_to_async(thread_sensitive=False)
+@traced("db.chat_history")
+def get_unsummarized_history(agent):
+    """
+    Return the agent's summary and the messages newer than it, in chronological order.
+
+    Only the newest `HISTORY_MAX_MESSAGES` are returned; `complete` is False when older
+    unsummarized messages exist, which `fold_history` then folds oldest first.
+    Returns:
+        tuple: (summary or None, messages, complete)
+    """
+    summary = ChatSummary.objects.filter(agent=agent).first()
+    limit = getattr(settings, "HISTORY_MAX_MESSAGES", 200)
+    messages = list(unsummarized(agent, summary).order_by("-timestamp", "-role_order")[:limit + 1])
+    return summary, list(reversed(messages[:limit])), len(messages) <= limit
+
+
+@sync_to_async(thread_sensitive=False)
+@traced("db.chat_history")
+def get_oldest_unsummarized(agent, summary, limit):
+    """
+    Return up to `limit` of the oldest messages newer than the summary, in chronological order.
+
+    The chunk never ends inside a group of messages sharing a timestamp, since the summary
+    only records the timestamp it covers up to.
+    """
+    messages = list(unsummarized(agent, summary).order_by("timestamp", "role_order")[:limit + 1])
+    if len(messages) <= limit:
+        return messages
+    boundary = messages[limit].timestamp
+    return [msg for msg in messages[:limit] if msg.timestamp != boundary] or messages[:limit]
+
+
+@sync_to_async(thread_sensitive=False)
+def save_summary(agent, previous, text, covered_until):
+    """
+    Store a folded summary unless another worker moved it forward in the meantime.
+    Returns:
+        bool: Whether the summary was saved.
+    """
+    if previous is None:
+        _, created = ChatSummary.objects.get_or_create(
+            agent=agent, defaults={"summary": text, "covered_until": covered_until}
+        )
+        return created
+    return bool(ChatSummary.objects.filter(pk=previous.pk, covered_until=previous.covered_until).update(
+        summary=text, covered_until=covered_until
+    ))
+
+
+async def summarize(llm, previous: str, messages, limit: int) -> str:
+    per_message = max(limit, 256)
+    transcript = "\n".join(f"{role.upper()}: {truncate_to_tokens(text, per_message)}" for role, text in messages)
+    response = await llm.ainvoke([
+        SystemMessage(content=SUMMARY_PROMPT.format(limit=limit)),
+        HumanMessage(content=f"Existing summary:\n{previous or '(none)'}\n\nNew messages:\n{transcript}"),
+    ])
+    return truncate_to_tokens(str(response.content).strip(), limit)
+
+
+def summary_token_limit(budget: int) -> int:
+    return max(64, budget // 4)
+
+
+async def fold_history(agent, agent_config: dict, make_llm) -> str:
+    """
+    Fold the messages that no longer fit in the agent's history budget into its summary.
+
+    Only messages newer than the stored summary are read, so the summary is extended
+    incrementally and never rebuilt from the full history. A backlog beyond the newest
+    `HISTORY_MAX_MESSAGES` (e.g. when an agent with a long history gets a budget) is folded
+    first, oldest chunk first.
+    Returns:
+        str: The current summary text.
+    """
+    budget = agent_config["history_token_budget"]
+    limit = summary_token_limit(budget)
+    llm = None
+
+    while True:
+        summary, messages, complete = await get_unsummarized_history(agent)
+        previous = summary.summary if summary else ""
+
+        if complete:
+            pairs = [(msg.role, msg.message) for msg in messages]
+            split = overflow_count(pairs, budget - count_tokens(previous))
+            if split == 0:
+                return previous
+            messages = messages[:split]
+        else:
+            messages = await get_oldest_unsummarized(agent, summary, getattr(settings, "HISTORY_MAX_MESSAGES", 200))
+
+        llm = llm or make_llm(agent_config)
+        text = await summarize(llm, previous, [(msg.role, msg.message) for msg in messages], limit)
+        if not await save_summary(agent, summary, text, messages[-1].timestamp):
+            return previous
+        logger.info(f"[{agent.agent_name}] Folded {len(messages)} messages into the chat summary")
+        if complete:
+            return text
+
+
+_folding = set()
+_folding_lock = threading.Lock()
+_fold_tasks = set()
+
+
+def schedule_fold(agent, agent_config: dict, make_llm, on_done=None):
+    """
+    Fold overflowing history in the background, at most once at a time per agent.
+    Args:
+        make_llm (callable): Builds the chat model that writes the summary from `agent_config`.
+        on_done (callable, optional): Called with the new summary text.
+    """
+    key = str(agent.id)
+    with _folding_lock:
+        if key in _folding:
+            return
+        _folding.add(key)
+
+    async def run():
+        try:
+            summary = await fold_history(agent, agent_config, make_llm)
+            if on_done is not None:
+                on_done(summary)
+        except Exception:
+            logger.exception(f"[{agent.agent_name}] Failed to fold chat history into the summary")
+        finally:
+            with _folding_lock:
+                _folding.discard(key)
+
+    task = asyncio.create_task(run())
+    _fold_tasks.add(task)
+    task.add_done_callback(_fold_tasks.discard)
+
+
+async def load_history_window(agent, agent_config: dict, make_llm):
+    """
+    Load the summary and the recent messages that fit in the agent's token budget.
+
+    Messages that fall outside the budget are folded into the summary in the background.
+    Returns:
+        tuple[str, list]: Summary text and chronological `(role, text)` tuples.
+    """
+    budget = agent_config["history_token_budget"]
+    summary, messages, complete = await get_unsummarized_history(agent)
+    summary_text = summary.summary if summary else ""
+
+    pairs = [(msg.role, msg.message) for msg in messages]
+    split = overflow_count(pairs, budget - count_tokens(summary_text))
+    if split or not complete:
+        schedule_fold(agent, agent_config, make_llm)
+    return summary_text, pairs[split:]
@@ -0,0 +1,292 @@
+import asyncio
+import contextvars
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.utils.timezone import now
+from langchain_core.caches import BaseCache
+from langchain_core.load import dumpd, load
+
+from ..models import LLMResponseCacheEntry
+from ..prometheus import LLM_CACHE_LOOKUPS, LLM_CACHE_SAVED_SECONDS
+
+logger = logging.getLogger(__name__)
+
+_bypass = contextvars.ContextVar("llm_cache_bypass", default=False)
+# (key, perf_counter) of the cache miss the current LLM call started with. LangChain looks
+# up and updates the cache from the same context, and concurrent calls run in their own.
+_pending_call = contextvars.ContextVar("llm_cache_pending_call", default=None)
+
+
+@contextmanager
+def bypass_llm_cache(bypass=True):
+    """
+    Skip cached LLM responses inside the block; fresh responses still refresh the cache.
+    """
+    token = _bypass.set(bypass)
+    try:
+        yield
+    finally:
+        _bypass.reset(token)
+
+
+def response_cache_key(agent_id, prompt: str, llm_string: str) -> str:
+    """
+    Key of one LLM call. LangChain's `llm_string` covers the model, its parameters and the
+    bound tools; `prompt` is the serialized message list (system prompt, history, query and
+    tool results so far).
+    """
+    digest = hashlib.sha256()
+    for part in (str(agent_id), llm_string, prompt):
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+class LLMResponseStore:
+    """
+    Bounded in-memory LRU of LLM responses shared by all agents, each entry expiring after
+    its agent's TTL.
+    """
+
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry["expires_at"] <= time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key, agent_id, generations, latency_ms, ttl):
+        with self._lock:
+            self._entries[key] = {
+                "agent_id": str(agent_id),
+                "generations": generations,
+                "latency_ms": latency_ms,
+                "expires_at": time.monotonic() + ttl,
+            }
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, agent_id):
+        agent_id = str(agent_id)
+        with self._lock:
+            for key in [key for key, entry in self._entries.items() if entry["agent_id"] == agent_id]:
+                del self._entries[key]
+
+    def stats(self):
+        return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses, "evictions": self.evictions}
+
+
+def load_persisted(key):
+    close_old_connections()
+    entry = LLMResponseCacheEntry.objects.filter(key=key, expires_at__gt=now()).first()
+    if entry is None:
+        return None
+    return {"generations": [load(generation) for generation in entry.value], "latency_ms": entry.latency_ms, "expires_at": entry.expires_at}
+
+
+PURGE_INTERVAL = 3600
+_last_purge = 0.0
+_purge_lock = threading.Lock()
+
+
+def purge_due() -> bool:
+    """
+    True for one caller per `PURGE_INTERVAL` across the threads writing entries.
+    """
+    global _last_purge
+    with _purge_lock:
+        if time.monotonic() - _last_purge <= PURGE_INTERVAL:
+            return False
+        _last_purge = time.monotonic()
+        return True
+
+
+def persist(key, agent_id, generations, latency_ms, ttl):
+    close_old_connections()
+    LLMResponseCacheEntry.objects.bulk_create(
+        [LLMResponseCacheEntry(
+            key=key,
+            agent_id=agent_id,
+            value=[dumpd(generation) for generation in generations],
+            latency_ms=latency_ms,
+            expires_at=now() + timedelta(seconds=ttl),
+        )],
+        update_conflicts=True,
+        unique_fields=["key"],
+        update_fields=["value", "latency_ms", "created_at", "expires_at"],
+    )
+
+    # Expired rows are only replaced when the same call repeats; sweep the rest hourly
+    if purge_due():
+        LLMResponseCacheEntry.objects.filter(expires_at__lte=now()).delete()
+
+
+# Keeps persistent writes referenced until they finish
+_pending_writes = set()
+
+
+class AgentLLMCache(BaseCache):
+    """
+    LangChain cache of one agent's LLM responses: the shared in-memory LRU, backed by the
+    `LLMResponseCacheEntry` table when `LLM_CACHE_PERSISTENT` is set.
+
+    The time between a miss and the matching update (timed per call, see `_pending_call`)
+    is kept as the latency of the response, so every hit can report the LLM time it saved.
+    """
+
+    def __init__(self, agent_id, ttl, store, persistent=False):
+        self.agent_id = str(agent_id)
+        self.ttl = ttl
+        self.store = store
+        self.persistent = persistent
+
+    def _hit(self, entry, tier):
+        LLM_CACHE_LOOKUPS.inc(self.agent_id, f"hit_{tier}")
+        LLM_CACHE_SAVED_SECONDS.inc(self.agent_id, amount=entry["latency_ms"] / 1000)
+        return entry["generations"]
+
+    def _miss(self, key):
+        LLM_CACHE_LOOKUPS.inc(self.agent_id, "miss")
+        self._start_timing(key)
+
+    @staticmethod
+    def _start_timing(key):
+        _pending_call.set((key, time.perf_counter()))
+
+    def _promote(self, key, entry):
+        remaining = (entry["expires_at"] - now()).total_seconds()
+        self.store.put(key, self.agent_id, entry["generations"], entry["latency_ms"], remaining)
+
+    @staticmethod
+    def _latency_ms(key):
+        pending = _pending_call.get()
+        if pending is None or pending[0] != key:
+            return 0
+        _pending_call.set(None)
+        return int((time.perf_counter() - pending[1]) * 1000)
+
+    def lookup(self, prompt, llm_string):
+        key = response_cache_key(self.agent_id, prompt, llm_string)
+        if _bypass.get():
+            LLM_CACHE_LOOKUPS.inc(self.agent_id, "bypass")
+            self._start_timing(key)
+            return None
+
+        entry = self.store.get(key)
+        if entry is not None:
+            return self._hit(entry, "memory")
+        if self.persistent:
+            entry = load_persisted(key)
+            if entry is not None:
+                self._promote(key, entry)
+                return self._hit(entry, "persistent")
+        self._miss(key)
+        return None
+
+    async def alookup(self, prompt, llm_string):
+        key = response_cache_key(self.agent_id, prompt, llm_string)
+        if _bypass.get():
+            LLM_CACHE_LOOKUPS.inc(self.agent_id, "bypass")
+            self._start_timing(key)
+            return None
+
+        entry = self.store.get(key)
+        if entry is not None:
+            return self._hit(entry, "memory")
+        if self.persistent:
+            try:
+                entry = await asyncio.to_thread(load_persisted, key)
+            except Exception:
+                logger.exception("LLM response cache lookup failed")
+                entry = None
+            if entry is not None:
+                self._promote(key, entry)
+                return self._hit(entry, "persistent")
+        self._miss(key)
+        return None
+
+    def update(self, prompt, llm_string, return_val):
+        key = response_cache_key(self.agent_id, prompt, llm_string)
+        latency_ms = self._latency_ms(key)
+        self.store.put(key, self.agent_id, return_val, latency_ms, self.ttl)
+        if self.persistent:
+            try:
+                persist(key, self.agent_id, return_val, latency_ms, self.ttl)
+            except Exception:
+                logger.exception("Failed to persist LLM response")
+
+    async def aupdate(self, prompt, llm_string, return_val):
+        key = response_cache_key(self.agent_id, prompt, llm_string)
+        latency_ms = self._latency_ms(key)
+        self.store.put(key, self.agent_id, return_val, latency_ms, self.ttl)
+        if self.persistent:
+            # The reply is ready; never make the chat wait for the database
+            task = asyncio.create_task(asyncio.to_thread(persist, key, self.agent_id, return_val, latency_ms, self.ttl))
+            _pending_writes.add(task)
+            task.add_done_callback(_log_persist_failure)
+
+    def clear(self, **kwargs):
+        drop_llm_cache(self.agent_id)
+
+
+def _log_persist_failure(task):
+    _pending_writes.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        logger.error("Failed to persist LLM response", exc_info=task.exception())
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_llm_response_store() -> LLMResponseStore:
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = LLMResponseStore(max_entries=getattr(settings, "LLM_CACHE_SIZE", 1024))
+    return _store
+
+
+def get_llm_cache(agent_config: dict):
+    """
+    Response cache for an agent's LLM, or None unless the agent sets `response_cache_ttl`
+    and runs at temperature 0, where identical inputs are expected to give identical output.
+    """
+    ttl = agent_config.get("response_cache_ttl")
+    if not ttl or agent_config.get("temperature") != 0 or not agent_config.get("agent_id"):
+        return None
+    return AgentLLMCache(
+        agent_config["agent_id"],
+        ttl,
+        get_llm_response_store(),
+        persistent=getattr(settings, "LLM_CACHE_PERSISTENT", False),
+    )
+
+
+def drop_llm_cache(agent_id):
+    get_llm_response_store().invalidate(agent_id)
+    LLMResponseCacheEntry.objects.filter(agent_id=agent_id).delete()
@@ -0,0 +1,223 @@
+import asyncio
+import fcntl
+import json
+import logging
+import os
+import shutil
+import threading
+import uuid
+from contextlib import contextmanager
+
+import numpy as np
+from asgiref.sync import sync_to_async
+from django.conf import settings
+
+from ..embeddings import embed_query, embed_texts
+from ..models import ChatHistory
+from ..tracing import traced
+
+logger = logging.getLogger(__name__)
+
+# Each row maps to the (human, ai) message UUIDs of one turn
+ID_ROW_BYTES = 32
+SEARCH_CHUNK_ROWS = 65536
+
+
+def turn_text(user_message: str, ai_message: str) -> str:
+    return f"User: {user_message}\nAssistant: {ai_message}"
+
+
+class MessageIndex:
+    """
+    Append-only vector index of one agent's chat turns, stored in its own directory.
+
+    `vectors.f32` holds unit-length float32 rows and `ids.bin` the message UUID pair of the
+    row at the same position. Both files are memory-mapped for search and scanned in
+    chunks, so the index never has to fit in memory and is never re-embedded. Appends take
+    an exclusive file lock, which keeps several worker processes from interleaving rows.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.vectors_path = os.path.join(path, "vectors.f32")
+        self.ids_path = os.path.join(path, "ids.bin")
+        self.meta_path = os.path.join(path, "meta.json")
+        self._lock = threading.Lock()
+        self._mapped = None
+
+    def _read_meta(self):
+        try:
+            with open(self.meta_path) as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def _row_count(self, dim):
+        sizes = [os.path.getsize(p) if os.path.exists(p) else 0 for p in (self.vectors_path, self.ids_path)]
+        return min(sizes[0] // (dim * 4), sizes[1] // ID_ROW_BYTES)
+
+    @contextmanager
+    def _file_lock(self):
+        os.makedirs(self.path, exist_ok=True)
+        with open(os.path.join(self.path, ".lock"), "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def append(self, vectors: np.ndarray, id_pairs):
+        """
+        Add turns to the index.
+        Args:
+            vectors (np.ndarray): (n, dim) unit-length embeddings.
+            id_pairs (list): `(human_id, ai_id)` UUID pairs, one per row.
+        """
+        if not len(vectors):
+            return
+
+        dim = int(vectors.shape[1])
+        model = getattr(settings, "EMBEDDING_MODEL", "")
+        with self._file_lock():
+            meta = self._read_meta()
+            if meta and (meta["dim"] != dim or meta["model"] != model):
+                logger.warning(f"Embedding model changed; resetting memory index {self.path}")
+                for path in (self.vectors_path, self.ids_path):
+                    if os.path.exists(path):
+                        os.remove(path)
+                meta = None
+
+            if meta is None:
+                meta = {"dim": dim, "model": model, "generation": uuid.uuid4().hex}
+                with open(self.meta_path, "w") as f:
+                    json.dump(meta, f)
+
+            # Drop a partial row left by an interrupted write so both files stay aligned
+            rows = self._row_count(dim)
+            with open(self.vectors_path, "ab") as f:
+                f.truncate(rows * dim * 4)
+                f.write(np.ascontiguousarray(vectors, dtype=np.float32).tobytes())
+            with open(self.ids_path, "ab") as f:
+                f.truncate(rows * ID_ROW_BYTES)
+                f.write(b"".join(human_id.bytes + ai_id.bytes for human_id, ai_id in id_pairs))
+
+    def _map(self):
+        meta = self._read_meta()
+        if meta is None:
+            return None
+
+        rows = self._row_count(meta["dim"])
+        mapped = self._mapped
+        if mapped is None or mapped[0] != meta["generation"] or mapped[1] != rows:
+            if rows == 0:
+                return None
+            vectors = np.memmap(self.vectors_path, dtype=np.float32, mode="r", shape=(rows, meta["dim"]))
+            ids = np.memmap(self.ids_path, dtype=np.uint8, mode="r", shape=(rows, ID_ROW_BYTES))
+            mapped = self._mapped = (meta["generation"], rows, vectors, ids)
+        return mapped[2], mapped[3]
+
+    def search(self, query_vector: np.ndarray, k: int, min_score: float = 0.0):
+        """
+        Return up to `k` turns most similar to the query.
+        Returns:
+            list: `(score, human_id, ai_id)` tuples, best first.
+        """
+        with self._lock:
+            mapped = self._map()
+        if mapped is None:
+            return []
+
+        vectors, ids = mapped
+        if vectors.shape[1] != query_vector.shape[0]:
+            return []
+
+        best_scores = np.empty(0, dtype=np.float32)
+        best_rows = np.empty(0, dtype=np.int64)
+        for start in range(0, vectors.shape[0], SEARCH_CHUNK_ROWS):
+            scores = vectors[start:start + SEARCH_CHUNK_ROWS] @ query_vector
+            top = np.argpartition(-scores, k - 1)[:k] if len(scores) > k else np.arange(len(scores))
+            best_scores = np.concatenate([best_scores, scores[top]])
+            best_rows = np.concatenate([best_rows, top + start])
+            if len(best_scores) > k:
+                keep = np.argpartition(-best_scores, k - 1)[:k]
+                best_scores, best_rows = best_scores[keep], best_rows[keep]
+
+        results = []
+        for i in np.argsort(-best_scores):
+            if best_scores[i] < min_score:
+                break
+            row = ids[best_rows[i]].tobytes()
+            results.append((float(best_scores[i]), uuid.UUID(bytes=row[:16]), uuid.UUID(bytes=row[16:])))
+        return results
+
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def get_message_index(agent_id) -> MessageIndex:
+    with _indexes_lock:
+        key = str(agent_id)
+        if key not in _indexes:
+            _indexes[key] = MessageIndex(os.path.join(settings.MEMORY_INDEX_DIR, key))
+        return _indexes[key]
+
+
+def drop_message_index(agent_id):
+    with _indexes_lock:
+        _indexes.pop(str(agent_id), None)
+    shutil.rmtree(os.path.join(settings.MEMORY_INDEX_DIR, str(agent_id)), ignore_errors=True)
+
+
+def index_turns(agent_id, turns):
+    """
+    Embed and append `(human, ai)` ChatHistory pairs to an agent's memory index.
+    """
+    vectors = embed_texts(turn_text(human.message, ai.message) for human, ai in turns)
+    get_message_index(agent_id).append(vectors, [(human.id, ai.id) for human, ai in turns])
+
+
+@sync_to_async(thread_sensitive=False)
+@traced("db.recalled_turns")
+def get_turns(ids):
+    return {msg.id: msg for msg in ChatHistory.objects.filter(id__in=ids)}
+
+
+async def recall_turns(agent, query: str, top_k: int, exclude=()):
+    """
+    Find the past turns most relevant to the query.
+    Args:
+        agent (AgentConfig): Agent whose memory is searched.
+        query (str): The user message.
+        top_k (int): Maximum number of turns to return.
+        exclude (iterable): `(role, text)` tuples already in the prompt history.
+    Returns:
+        list: A single `("system", ...)` message listing the recalled turns in
+        chronological order, or an empty list.
+    """
+    try:
+        query_vector = await asyncio.to_thread(embed_query, query)
+    except ImportError:
+        logger.warning("fastembed is not installed; long-term memory is disabled")
+        return []
+
+    seen = {text for role, text in exclude if role == "human"}
+    index = get_message_index(agent.id)
+    hits = await asyncio.to_thread(
+        index.search, query_vector, top_k + len(seen), getattr(settings, "MEMORY_MIN_SCORE", 0.3)
+    )
+    if not hits:
+        return []
+
+    messages = await get_turns([message_id for _, human_id, ai_id in hits for message_id in (human_id, ai_id)])
+    turns = []
+    for _, human_id, ai_id in hits:
+        human, ai = messages.get(human_id), messages.get(ai_id)
+        if human is not None and ai is not None and human.message not in seen:
+            turns.append((human, ai))
+    turns = sorted(turns[:top_k], key=lambda turn: turn[0].timestamp)
+    if not turns:
+        return []
+
+    recalled = "\n\n".join(turn_text(human.message, ai.message) for human, ai in turns)
+    return [("system", f"Relevant earlier conversation:\n{recalled}")]
@@ -0,0 +1,313 @@
+import asyncio
+import atexit
+import hashlib
+import json
+import logging
+import threading
+import time
+
+from django.conf import settings
+from mcp_use.client import MCPClient
+
+from ..prometheus import MCP_SPAWNS
+
+logger = logging.getLogger(__name__)
+
+
+# ConnectForge options allowed inside an `mcpServers` entry; they never reach mcp_use
+SERVER_OPTION_KEYS = ("toolTimeout", "toolTimeouts", "resultCache")
+
+
+def connector_config(server_config: dict) -> dict:
+    """
+    Strip ConnectForge-specific options from a server config before spawning it.
+    """
+    return {key: value for key, value in server_config.items() if key not in SERVER_OPTION_KEYS}
+
+
+def server_config_key(server_config: dict) -> str:
+    """
+    Build a stable hash for a single MCP server configuration.
+    Args:
+        server_config (dict): One entry of an agent's `mcpServers` dictionary.
+    Returns:
+        str: Hex digest identifying the server process the config would spawn.
+    """
+    payload = json.dumps(connector_config(server_config), sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class PooledSession:
+    def __init__(self, key, client, session):
+        self.key = key
+        self.client = client
+        self.session = session
+        self.created_at = time.monotonic()
+        self.last_used = self.created_at
+        self.last_checked = self.created_at
+        self.in_use = 0
+        self.retained = 0
+
+
+class MCPSessionPool:
+    """
+    Process-wide pool of live MCP sessions keyed by the hash of each server's config.
+
+    Sessions are owned by a dedicated event loop running in a background thread, so a
+    session spawned for one chat can be reused by any later chat no matter which event
+    loop the caller runs on (ASGI, `async_to_sync` or `asyncio.run`).
+    """
+
+    def __init__(self, idle_ttl=600, health_check_interval=30, health_check_timeout=5):
+        self.idle_ttl = idle_ttl
+        self.health_check_interval = health_check_interval
+        self.health_check_timeout = health_check_timeout
+
+        self._loop = None
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._entries = {}
+        self._key_locks = {}
+        # Unhealthy sessions replaced while calls were still running on them; closed once idle
+        self._detached = set()
+
+        self.spawned = 0
+        self.reused = 0
+        self.evicted = 0
+
+    def _ensure_loop(self):
+        if self._loop is not None and self._loop.is_running():
+            return self._loop
+
+        with self._start_lock:
+            if self._loop is None or not self._loop.is_running():
+                loop = asyncio.new_event_loop()
+                ready = threading.Event()
+
+                def run():
+                    asyncio.set_event_loop(loop)
+                    loop.call_soon(ready.set)
+                    loop.run_forever()
+
+                thread = threading.Thread(target=run, name="mcp-session-pool", daemon=True)
+                thread.start()
+                ready.wait()
+
+                self._loop = loop
+                self._thread = thread
+                asyncio.run_coroutine_threadsafe(self._reap_idle(), loop)
+
+        return self._loop
+
+    async def _run(self, coro):
+        loop = self._ensure_loop()
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+
+        if running is loop:
+            return await coro
+        return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(coro, loop))
+
+    async def _spawn(self, key, server_config):
+        client = MCPClient.from_dict({"mcpServers": {key: connector_config(server_config)}})
+        try:
+            session = await client.create_session(key)
+        except Exception:
+            MCP_SPAWNS.inc(key[:12], "error")
+            try:
+                await client.close_all_sessions()
+            except Exception:
+                logger.debug("Failed to clean up MCP client after spawn error", exc_info=True)
+            raise
+
+        self.spawned += 1
+        MCP_SPAWNS.inc(key[:12], "ok")
+        logger.info(f"Spawned MCP session {key[:12]} ({server_config.get('command') or server_config.get('url')})")
+        return PooledSession(key, client, session)
+
+    async def _close_entry(self, entry):
+        try:
+            await entry.client.close_all_sessions()
+        except Exception:
+            logger.warning(f"Error while closing MCP session {entry.key[:12]}", exc_info=True)
+
+    async def _is_healthy(self, entry):
+        if not entry.session.is_connected:
+            return False
+
+        # A busy server may be too slow to answer a ping; its running calls report real failures
+        if entry.in_use > 0 or time.monotonic() - entry.last_checked < self.health_check_interval:
+            return True
+
+        client_session = getattr(entry.session.connector, "client", None)
+        if client_session is None:
+            return False
+
+        # Concurrent callers reuse the session while this ping is in flight
+        entry.last_checked = time.monotonic()
+        try:
+            await asyncio.wait_for(client_session.send_ping(), timeout=self.health_check_timeout)
+        except Exception:
+            logger.warning(f"Health check failed for MCP session {entry.key[:12]}", exc_info=True)
+            return False
+
+        entry.last_checked = time.monotonic()
+        return True
+
+    async def _retire(self, entry):
+        """
+        Close an entry already removed from `_entries`, or defer it until its running calls finish.
+        """
+        if entry.in_use > 0:
+            self._detached.add(entry)
+        else:
+            await self._close_entry(entry)
+
+    async def _acquire(self, server_config):
+        key = server_config_key(server_config)
+        lock = self._key_locks.setdefault(key, asyncio.Lock())
+
+        # Pinged outside the key lock so a slow server does not queue every caller behind it
+        checked = self._entries.get(key)
+        healthy = checked is not None and await self._is_healthy(checked)
+
+        async with lock:
+            retained = 0
+            entry = self._entries.get(key)
+            if entry is not None and entry is checked and not healthy:
+                self._entries.pop(key, None)
+                retained, entry.retained = entry.retained, 0
+                await self._retire(entry)
+                entry = None
+
+            if entry is None:
+                entry = await self._spawn(key, server_config)
+                entry.retained = retained
+                self._entries[key] = entry
+            else:
+                self.reused += 1
+
+            entry.last_used = time.monotonic()
+            return entry
+
+    async def _list_tools(self, server_config):
+        entry = await self._acquire(server_config)
+        return list(entry.session.connector.tools)
+
+    async def _call_tool(self, server_config, tool_name, arguments):
+        entry = await self._acquire(server_config)
+        entry.in_use += 1
+        try:
+            return await entry.session.connector.call_tool(tool_name, arguments)
+        finally:
+            entry.in_use -= 1
+            entry.last_used = time.monotonic()
+            if entry.in_use == 0 and entry in self._detached:
+                self._detached.discard(entry)
+                await self._close_entry(entry)
+
+    async def _retain(self, server_config):
+        entry = await self._acquire(server_config)
+        entry.retained += 1
+
+    async def _release(self, server_config):
+        entry = self._entries.get(server_config_key(server_config))
+        if entry is not None:
+            entry.retained = max(0, entry.retained - 1)
+            entry.last_used = time.monotonic()
+
+    async def _evict(self, key):
+        lock = self._key_locks.setdefault(key, asyncio.Lock())
+        async with lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self.evicted += 1
+                await self._retire(entry)
+
+    async def _reap_idle(self):
+        interval = max(1, min(self.idle_ttl, self.health_check_interval))
+        while True:
+            await asyncio.sleep(interval)
+            now = time.monotonic()
+            for key, entry in list(self._entries.items()):
+                if entry.in_use == 0 and entry.retained == 0 and now - entry.last_used > self.idle_ttl:
+                    logger.info(f"Evicting idle MCP session {key[:12]}")
+                    await self._evict(key)
+
+    async def _close_all(self):
+        for key in list(self._entries.keys()):
+            await self._evict(key)
+        while self._detached:
+            await self._close_entry(self._detached.pop())
+
+    async def list_tools(self, server_config):
+        """
+        Return the MCP tool definitions exposed by a server, reusing a pooled session.
+        Args:
+            server_config (dict): A single MCP server configuration.
+        Returns:
+            list: `mcp.types.Tool` objects advertised by the server.
+        """
+        return await self._run(self._list_tools(server_config))
+
+    async def call_tool(self, server_config, tool_name, arguments):
+        """
+        Invoke a tool on a pooled session.
+        Args:
+            server_config (dict): A single MCP server configuration.
+            tool_name (str): Name of the tool to call.
+            arguments (dict): Tool arguments.
+        Returns:
+            CallToolResult: Raw MCP result of the call.
+        """
+        return await self._run(self._call_tool(server_config, tool_name, arguments))
+
+    async def retain(self, server_config):
+        """
+        Spawn the server session if needed and keep it out of idle eviction until `release`.
+        """
+        await self._run(self._retain(server_config))
+
+    async def release(self, server_config):
+        await self._run(self._release(server_config))
+
+    async def evict(self, server_config):
+        await self._run(self._evict(server_config_key(server_config)))
+
+    def close_all(self, timeout=10):
+        if self._loop is None or not self._loop.is_running():
+            return
+        try:
+            asyncio.run_coroutine_threadsafe(self._close_all(), self._loop).result(timeout=timeout)
+        except Exception:
+            logger.warning("Failed to close MCP sessions cleanly", exc_info=True)
+        self._loop.call_soon_threadsafe(self._loop.stop)
+
+    def stats(self):
+        return {
+            "active_sessions": len(self._entries),
+            "in_use": sum(entry.in_use for entry in self._entries.values()),
+            "spawned": self.spawned,
+            "reused": self.reused,
+            "evicted": self.evicted,
+        }
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_session_pool() -> MCPSessionPool:
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = MCPSessionPool(
+                    idle_ttl=getattr(settings, "MCP_POOL_IDLE_TTL", 600),
+                    health_check_interval=getattr(settings, "MCP_POOL_HEALTH_CHECK_INTERVAL", 30),
+                    health_check_timeout=getattr(settings, "MCP_POOL_HEALTH_CHECK_TIMEOUT", 5),
+                )
+                atexit.register(_pool.close_all)
+    return _pool
@@ -0,0 +1,195 @@
+import logging
+import os
+import random
+import time
+
+import ormsgpack
+import zstandard
+from django.conf import settings
+from django.utils.timezone import now
+from langchain_core.callbacks import BaseCallbackHandler
+
+from ..tracing import token_usage
+
+logger = logging.getLogger(__name__)
+
+RECORDING_VERSION = 1
+RECORDING_SUFFIX = ".chat.zst"
+
+# Never written to a recording
+SECRET_CONFIG_FIELDS = ("api_key",)
+
+
+def dump_recording(data: dict) -> bytes:
+    """
+    Encode a recording as zstd-compressed MessagePack.
+    """
+    return zstandard.ZstdCompressor(level=9).compress(ormsgpack.packb(data))
+
+
+def load_recording(path) -> dict:
+    with open(path, "rb") as f:
+        data = ormsgpack.unpackb(zstandard.ZstdDecompressor().decompress(f.read()))
+    if data.get("version") != RECORDING_VERSION:
+        raise ValueError(f"{path}: unsupported recording version {data.get('version')}")
+    return data
+
+
+def recording_paths(paths):
+    """
+    Expand files and directories (searched recursively) into recording files, sorted.
+    """
+    found = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, files in os.walk(path):
+                found.extend(os.path.join(root, name) for name in files if name.endswith(RECORDING_SUFFIX))
+        else:
+            found.append(path)
+    return sorted(found)
+
+
+def message_content(message):
+    content = message.content
+    return content if isinstance(content, str) else str(content)
+
+
+def history_entry(entry):
+    # Prompt history holds `(role, text)` tuples and LangChain messages (summary, recall)
+    if isinstance(entry, tuple):
+        return [entry[0], str(entry[1])]
+    return [entry.type, message_content(entry)]
+
+
+class RecordingCallbackHandler(BaseCallbackHandler):
+    """
+    Captures every LLM response and tool result of an agent run, with their latency.
+    """
+
+    run_inline = True
+
+    def __init__(self, recorder):
+        self.recorder = recorder
+        self._started = {}
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+        batch = messages[0] if messages else []
+        self._started[run_id] = (
+            time.perf_counter(),
+            {"input_messages": len(batch), "input_chars": sum(len(message_content(m)) for m in batch)},
+        )
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        started, call = self._started.pop(run_id, (time.perf_counter(), {}))
+        generations = response.generations[0] if response.generations else []
+        message = getattr(generations[0], "message", None) if generations else None
+        call.update({
+            "latency_ms": round((time.perf_counter() - started) * 1000, 1),
+            "content": message_content(message) if message is not None else "",
+            "tool_calls": [
+                {"name": tool_call["name"], "args": tool_call["args"], "id": tool_call.get("id")}
+                for tool_call in getattr(message, "tool_calls", None) or []
+            ],
+            "usage": dict(token_usage(response) or {}),
+        })
+        self.recorder.data["llm_calls"].append(call)
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        started, call = self._started.pop(run_id, (time.perf_counter(), {}))
+        call.update({"latency_ms": round((time.perf_counter() - started) * 1000, 1), "error": str(error)})
+        self.recorder.data["llm_calls"].append(call)
+
+    def on_tool_start(self, serialized, input_str, *, run_id, inputs=None, **kwargs):
+        self._started[run_id] = (
+            time.perf_counter(),
+            {"name": (serialized or {}).get("name", "unknown"), "args": inputs if inputs is not None else input_str},
+        )
+
+    def on_tool_end(self, output, *, run_id, **kwargs):
+        started, call = self._started.pop(run_id, (time.perf_counter(), {}))
+        call.update({
+            "latency_ms": round((time.perf_counter() - started) * 1000, 1),
+            "output": message_content(output) if hasattr(output, "content") else str(output),
+        })
+        self.recorder.data["tool_calls"].append(call)
+
+    def on_tool_error(self, error, *, run_id, **kwargs):
+        started, call = self._started.pop(run_id, (time.perf_counter(), {}))
+        call.update({"latency_ms": round((time.perf_counter() - started) * 1000, 1), "error": str(error)})
+        self.recorder.data["tool_calls"].append(call)
+
+
+class ChatRecorder:
+    """
+    Full record of one chat: agent config, tool schemas, prompt history, every LLM response
+    and tool result, the output and the stage timings of the live run.
+
+    MCP server configurations are left out since they may hold credentials; replays only
+    need the tool schemas and recorded results.
+    """
+
+    def __init__(self, agent, request_id, query):
+        self.path = os.path.join(settings.CHAT_RECORD_DIR, str(agent.id), f"{request_id}{RECORDING_SUFFIX}")
+        self.started = time.perf_counter()
+        self.callback = RecordingCallbackHandler(self)
+        self.data = {
+            "version": RECORDING_VERSION,
+            "request_id": str(request_id),
+            "agent_id": str(agent.id),
+            "agent_name": agent.agent_name,
+            "recorded_at": now().isoformat(),
+            "query": query,
+            "agent_config": {},
+            "tools": [],
+            "chat_history": [],
+            "llm_calls": [],
+            "tool_calls": [],
+            "output": None,
+            "error": None,
+            "duration_ms": None,
+            "spans": [],
+        }
+
+    def set_inputs(self, agent_config: dict, tools, chat_history):
+        self.data["agent_config"] = {
+            key: value for key, value in agent_config.items() if key not in SECRET_CONFIG_FIELDS
+        }
+        self.data["tools"] = [
+            {
+                "name": tool.name,
+                "description": tool.description,
+                "input_schema": (tool.metadata or {}).get("input_schema", {}),
+            }
+            for tool in tools
+        ]
+        self.data["chat_history"] = [history_entry(entry) for entry in chat_history]
+
+    def finish(self, result: dict, trace=None):
+        self.data["duration_ms"] = round((time.perf_counter() - self.started) * 1000, 1)
+        self.data["output"] = result.get("output")
+        self.data["error"] = result.get("error")
+        if trace is not None:
+            self.data["spans"] = trace.spans
+
+    def save(self):
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp = f"{self.path}.tmp"
+            with open(tmp, "wb") as f:
+                f.write(dump_recording(self.data))
+            os.replace(tmp, self.path)
+        except Exception:
+            logger.exception(f"Failed to write chat recording {self.path}")
+
+
+def start_recording(agent, request_id, query):
+    """
+    Recorder for this chat if recording is enabled (`CHAT_RECORD_DIR`) and the chat is
+    sampled (`CHAT_RECORD_SAMPLE_RATE`), else None.
+    """
+    if not getattr(settings, "CHAT_RECORD_DIR", ""):
+        return None
+    rate = getattr(settings, "CHAT_RECORD_SAMPLE_RATE", 1.0)
+    if rate < 1 and random.random() >= rate:
+        return None
+    return ChatRecorder(agent, request_id, query)
@@ -0,0 +1,174 @@
+import asyncio
+import hashlib
+import json
+import logging
+import threading
+from collections import OrderedDict
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import transaction
+
+from ..models import Tool
+from ..tracing import traced
+from .pool import get_session_pool, server_config_key
+from .tools import build_langchain_tool
+
+logger = logging.getLogger(__name__)
+
+
+def mcp_config_hash(mcp_servers) -> str:
+    """
+    Content hash of an agent's whole `mcpServers` dictionary.
+    """
+    payload = json.dumps(mcp_servers or {}, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+@traced("mcp.discover")
+async def discover_tool_specs(mcp_servers):
+    """
+    Discover tool definitions from live MCP servers.
+    Args:
+        mcp_servers (dict): A dictionary of MCP server configurations.
+    Returns:
+        list: Dicts with `name`, `description`, `input_schema` and `server_key`.
+    """
+    pool = get_session_pool()
+    server_configs = list((mcp_servers or {}).values())
+    discovered = await asyncio.gather(*[pool.list_tools(config) for config in server_configs])
+
+    specs = []
+    for server_config, mcp_tools in zip(server_configs, discovered):
+        key = server_config_key(server_config)
+        for mcp_tool in mcp_tools:
+            specs.append({
+                "name": mcp_tool.name,
+                "description": mcp_tool.description or "",
+                "input_schema": mcp_tool.inputSchema or {},
+                "server_key": key,
+            })
+    return specs
+
+
+def build_tools(mcp_servers, specs):
+    """
+    Build LangChain tools from cached specs without contacting any MCP server.
+    """
+    configs = {server_config_key(config): config for config in (mcp_servers or {}).values()}
+    tools = []
+    for spec in specs:
+        server_config = configs.get(spec["server_key"])
+        if server_config is None:
+            continue
+        tools.append(build_langchain_tool(server_config, spec["name"], spec["description"], spec["input_schema"]))
+    return tools
+
+
+def replace_tool_specs(agent, specs):
+    """
+    Replace the persisted tools of an agent with freshly discovered specs.
+    Returns:
+        list: The created Tool instances.
+    """
+    seen = set()
+    instances = []
+    for spec in specs:
+        if spec["name"] in seen:
+            continue
+        seen.add(spec["name"])
+        instances.append(Tool(agent=agent, **spec))
+
+    with transaction.atomic():
+        Tool.objects.filter(agent=agent).delete()
+        return Tool.objects.bulk_create(instances)
+
+
+@sync_to_async(thread_sensitive=False)
+@traced("db.load_tools")
+def load_tool_specs(agent):
+    return list(Tool.objects.filter(agent=agent).values("name", "description", "input_schema", "server_key"))
+
+
+class ToolRegistry:
+    """
+    In-memory LRU of built LangChain tools keyed by the content hash of `mcpServers`.
+
+    Because the key is a content hash, a config change in another worker simply misses
+    here and falls back to the persisted specs; explicit invalidation only frees memory.
+    """
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            tools = self._entries.get(key)
+            if tools is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return tools
+
+    def put(self, key, tools):
+        with self._lock:
+            self._entries[key] = tools
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def stats(self):
+        return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_tool_registry() -> ToolRegistry:
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = ToolRegistry(max_entries=getattr(settings, "TOOL_REGISTRY_CACHE_SIZE", 256))
+    return _registry
+
+
+def invalidate_agent_tools(mcp_servers):
+    get_tool_registry().invalidate(mcp_config_hash(mcp_servers))
+
+
+async def get_agent_tools(agent):
+    """
+    Return the LangChain tools of an agent from the cache, falling back to persisted specs
+    and only running live discovery for agents registered before schemas were stored.
+    """
+    mcp_servers = agent.mcp_server or {}
+    key = mcp_config_hash(mcp_servers)
+    registry = get_tool_registry()
+
+    tools = registry.get(key)
+    if tools is not None:
+        return tools
+
+    specs = await load_tool_specs(agent)
+    # Stale when a spec belongs to no configured server, or a configured server has no specs
+    # (e.g. its discovery failed after the agent was saved)
+    server_keys = {server_config_key(config) for config in mcp_servers.values()}
+    if not specs or {spec["server_key"] for spec in specs} != server_keys:
+        logger.info(f"[{agent.agent_name}] Tool schemas missing or stale, running discovery")
+        specs = await discover_tool_specs(mcp_servers)
+        await sync_to_async(replace_tool_specs, thread_sensitive=False)(agent, specs)
+
+    tools = build_tools(mcp_servers, specs)
+    registry.put(key, tools)
+    return tools
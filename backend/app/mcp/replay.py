@@ -0,0 +1,185 @@
+import asyncio
+import json
+import time
+from collections import defaultdict, deque
+from typing import Any, List, Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from mcp.types import CallToolResult, TextContent
+from pydantic import PrivateAttr
+
+from .client import build_executor, run_config
+from .tools import build_langchain_tool, tool_run
+
+
+class ReplayMismatch(Exception):
+    """
+    The replayed pipeline asked for an LLM response or tool result that was not recorded.
+    """
+
+
+class ReplayChatModel(BaseChatModel):
+    """
+    Answers with the recorded LLM responses, in order.
+
+    With `simulate_latency` every answer takes as long as it took live; the time spent
+    waiting is kept in `waited` so it can be told apart from our own overhead.
+    """
+
+    calls: List[dict] = []
+    simulate_latency: bool = False
+    _cursor: int = PrivateAttr(default=0)
+    _waited: float = PrivateAttr(default=0.0)
+
+    @property
+    def _llm_type(self) -> str:
+        return "replay"
+
+    @property
+    def served(self) -> int:
+        return self._cursor
+
+    @property
+    def waited(self) -> float:
+        return self._waited
+
+    def _next(self):
+        if self._cursor >= len(self.calls):
+            raise ReplayMismatch(f"LLM call {self._cursor + 1} was not recorded")
+        call = self.calls[self._cursor]
+        self._cursor += 1
+        if call.get("error"):
+            raise RuntimeError(call["error"])
+
+        message = AIMessage(content=call.get("content", ""), tool_calls=[
+            {"name": tool_call["name"], "args": tool_call["args"], "id": tool_call.get("id") or f"call_{self._cursor}_{i}", "type": "tool_call"}
+            for i, tool_call in enumerate(call.get("tool_calls", []))
+        ])
+        if call.get("usage"):
+            message.usage_metadata = call["usage"]
+        return call, ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager=None, **kwargs: Any) -> ChatResult:
+        call, result = self._next()
+        if self.simulate_latency:
+            started = time.perf_counter()
+            time.sleep(call.get("latency_ms", 0) / 1000)
+            self._waited += time.perf_counter() - started
+        return result
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager=None, **kwargs: Any) -> ChatResult:
+        call, result = self._next()
+        if self.simulate_latency:
+            started = time.perf_counter()
+            await asyncio.sleep(call.get("latency_ms", 0) / 1000)
+            self._waited += time.perf_counter() - started
+        return result
+
+    def bind_tools(self, tools, **kwargs: Any):
+        return self
+
+
+def arguments_key(arguments) -> str:
+    return json.dumps(arguments, sort_keys=True, default=str)
+
+
+class ToolReplayer:
+    """
+    Stands in for `MCPSessionPool.call_tool`: returns the recorded result of the call with
+    the same tool and arguments, else the next unused result of that tool.
+    """
+
+    def __init__(self, calls, simulate_latency=False):
+        self.simulate_latency = simulate_latency
+        self.waited = 0.0
+        self.served = 0
+        self._exact = defaultdict(deque)
+        self._by_name = defaultdict(deque)
+        for call in calls:
+            entry = {**call, "used": False}
+            self._exact[(call["name"], arguments_key(call.get("args")))].append(entry)
+            self._by_name[call["name"]].append(entry)
+
+    @staticmethod
+    def _take(entries):
+        while entries and entries[0]["used"]:
+            entries.popleft()
+        if not entries:
+            return None
+        entry = entries.popleft()
+        entry["used"] = True
+        return entry
+
+    async def call_tool(self, server_config, name, arguments):
+        entry = self._take(self._exact[(name, arguments_key(arguments))]) or self._take(self._by_name[name])
+        if entry is None:
+            raise ReplayMismatch(f"No recorded result left for tool '{name}'")
+        self.served += 1
+
+        if self.simulate_latency:
+            started = time.perf_counter()
+            await asyncio.sleep(entry.get("latency_ms", 0) / 1000)
+            self.waited += time.perf_counter() - started
+
+        if entry.get("error"):
+            return CallToolResult(content=[TextContent(type="text", text=entry["error"])], isError=True)
+        return CallToolResult(content=[TextContent(type="text", text=entry.get("output", ""))], isError=False)
+
+
+async def replay_recording(recording: dict, simulate_latency=False) -> dict:
+    """
+    Re-run the agent pipeline of a recorded chat with the LLM and MCP servers replaced by
+    the recorded responses.
+
+    Returns:
+        dict: `stages` (ms), whether the output matched the recording, and how many LLM
+        responses and tool results were served.
+    """
+    stages = {}
+    llm = ReplayChatModel(calls=recording["llm_calls"], simulate_latency=simulate_latency)
+    replayer = ToolReplayer(recording["tool_calls"], simulate_latency)
+
+    started = time.perf_counter()
+    tools = [
+        build_langchain_tool({}, spec["name"], spec["description"], spec["input_schema"], call_tool=replayer.call_tool)
+        for spec in recording["tools"]
+    ]
+    stages["tools.build"] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    executor = build_executor(recording["agent_config"], tools, llm=llm)
+    stages["executor.build"] = time.perf_counter() - started
+
+    chat_history = [tuple(entry) for entry in recording["chat_history"]]
+    started = time.perf_counter()
+    with tool_run():
+        result = await executor.ainvoke({"input": recording["query"], "chat_history": chat_history}, config=run_config())
+    stages["agent.invoke"] = time.perf_counter() - started
+
+    stages["llm.wait"] = llm.waited
+    stages["tool.wait"] = replayer.waited
+    # Parallel tool calls overlap, so with simulated latency this is a lower bound
+    stages["agent.overhead"] = max(0.0, stages["agent.invoke"] - llm.waited - replayer.waited)
+
+    return {
+        "stages": {name: round(seconds * 1000, 3) for name, seconds in stages.items()},
+        "output_matches": result.get("output") == recording["output"],
+        "llm_calls": llm.served,
+        "tool_calls": replayer.served,
+    }
+
+
+def live_breakdown(recording: dict) -> dict:
+    """
+    Where the recorded live chat spent its time: LLM, tools, and everything else (ours).
+    """
+    llm_ms = sum(call.get("latency_ms", 0) for call in recording["llm_calls"])
+    tool_ms = sum(call.get("latency_ms", 0) for call in recording["tool_calls"])
+    total_ms = recording.get("duration_ms") or 0
+    breakdown = {"total": total_ms, "llm": llm_ms, "tools": tool_ms, "own": max(0.0, total_ms - llm_ms - tool_ms)}
+    for name, _, duration_ms, parent, _ in recording.get("spans", []):
+        if parent == -1 and duration_ms is not None:
+            breakdown[f"span:{name}"] = breakdown.get(f"span:{name}", 0) + duration_ms
+    return breakdown
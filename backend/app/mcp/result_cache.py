@@ -0,0 +1,95 @@
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+
+
+def result_cache_ttl(server_config: dict, tool_name: str):
+    """
+    Resolve how long results of a tool may be cached.
+
+    The `resultCache` option of an `mcpServers` entry is either a boolean or
+    `{"ttl": seconds, "tools": {"tool_name": seconds | false}}`; servers without it follow
+    `TOOL_RESULT_CACHE_DEFAULT`.
+    Returns:
+        float | None: TTL in seconds, or None when caching is disabled for the tool.
+    """
+    default_ttl = getattr(settings, "TOOL_RESULT_CACHE_TTL", 300)
+    option = server_config.get("resultCache", getattr(settings, "TOOL_RESULT_CACHE_DEFAULT", False))
+
+    if isinstance(option, dict):
+        ttl = (option.get("tools") or {}).get(tool_name, option.get("ttl", default_ttl))
+    else:
+        ttl = option
+
+    if ttl is True:
+        ttl = default_ttl
+    if not ttl or ttl < 0:
+        return None
+    return ttl
+
+
+def result_cache_key(server_key: str, tool_name: str, arguments: dict) -> str:
+    canonical = json.dumps(arguments, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(f"{server_key}\0{tool_name}\0{canonical}".encode("utf-8")).hexdigest()
+
+
+class ToolResultCache:
+    """
+    Size-bounded LRU of successful tool results with per-entry expiry.
+    """
+
+    def __init__(self, max_entries=2048):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                    self.evictions += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key, value, ttl):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_result_cache() -> ToolResultCache:
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = ToolResultCache(max_entries=getattr(settings, "TOOL_RESULT_CACHE_SIZE", 2048))
+    return _cache
@@ -1,6 +1,13 @@
+import asyncio
+import hashlib
+import io
+import json
 import os
+import tempfile
+import threading
+import time
 from mcp.server.fastmcp import FastMCP
-import requests
+import httpx
 
 mcp = FastMCP("github")
 
@@ -9,7 +16,127 @@ GITHUB_TOKEN = os.getenv("GITHUB_PERSONAL_ACCESS_TOKEN")
 if not GITHUB_TOKEN:
     raise EnvironmentError("❌ GITHUB_PERSONAL_ACCESS_TOKEN not set in environment.")
 
-HEADERS = {"Authorization": f"Bearer {GITHUB_TOKEN}"}
+HEADERS = {"Authorization": f"Bearer {GITHUB_TOKEN}", "Accept": "application/vnd.github+json"}
+
+REQUEST_TIMEOUT = float(os.getenv("GITHUB_REQUEST_TIMEOUT", "15"))
+CACHE_DIR = os.getenv("GITHUB_CACHE_DIR", os.path.join(tempfile.gettempdir(), "connectforge-github-cache"))
+CACHE_MAX_ENTRIES = int(os.getenv("GITHUB_CACHE_MAX_ENTRIES", "1000"))
+RATE_LIMIT_RESERVE = int(os.getenv("GITHUB_RATE_LIMIT_RESERVE", "50"))
+RATE_LIMIT_MAX_WAIT = float(os.getenv("GITHUB_RATE_LIMIT_MAX_WAIT", "10"))
+RETRY_STATUSES = (502, 503, 504)
+MAX_RETRIES = 2
+
+
+class ResponseCache:
+    """
+    Bounded on-disk cache of GitHub responses with their validators (ETag/Last-Modified),
+    so conditional requests answered with 304 are served locally.
+    """
+
+    def __init__(self, directory, max_entries):
+        self.directory = directory
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def key(url, params=None):
+        # Scoped by token so private data is never served to a different account
+        raw = GITHUB_TOKEN + "\0" + url + "?" + json.dumps(params or {}, sort_keys=True)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.json")
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+            os.utime(path)  # mtime doubles as the LRU clock
+            return entry
+        except (OSError, ValueError):
+            return None
+
+    def put(self, key, entry):
+        with self._lock:
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(entry, f)
+            os.replace(tmp_path, self._path(key))
+            self._prune()
+
+    def _prune(self):
+        entries = [e for e in os.scandir(self.directory) if e.name.endswith(".json")]
+        if len(entries) <= self.max_entries:
+            return
+        entries.sort(key=lambda e: e.stat().st_mtime)
+        for entry in entries[: len(entries) - self.max_entries]:
+            try:
+                os.remove(entry.path)
+            except OSError:
+                pass
+
+
+class RateLimitTracker:
+    """
+    Tracks GitHub's X-RateLimit-* headers so calls back off before the limit is hit.
+    """
+
+    def __init__(self, reserve, max_wait):
+        self.reserve = reserve
+        self.max_wait = max_wait
+        self.remaining = None
+        self.reset_at = None
+        self._lock = threading.Lock()
+
+    def update(self, headers):
+        with self._lock:
+            if "X-RateLimit-Remaining" in headers:
+                self.remaining = int(headers["X-RateLimit-Remaining"])
+            if "X-RateLimit-Reset" in headers:
+                self.reset_at = int(headers["X-RateLimit-Reset"])
+
+    def check(self):
+        """
+        Decide whether a request may go out now.
+        Returns:
+            tuple: (seconds to wait first, error message when the API must not be hit now).
+        """
+        with self._lock:
+            remaining, reset_at = self.remaining, self.reset_at
+        if remaining is None or reset_at is None or remaining > self.reserve:
+            return 0, None
+
+        wait = reset_at - time.time()
+        if wait <= 0:
+            return 0, None
+        if remaining > 0 and wait <= self.max_wait:
+            return wait, None
+        reset = time.strftime("%H:%M:%S UTC", time.gmtime(reset_at))
+        return 0, f"❌ GitHub rate limit nearly exhausted ({remaining} left), resets at {reset}."
+
+
+CACHE = ResponseCache(CACHE_DIR, CACHE_MAX_ENTRIES)
+RATE_LIMIT = RateLimitTracker(RATE_LIMIT_RESERVE, RATE_LIMIT_MAX_WAIT)
+
+BATCH_CONCURRENCY = int(os.getenv("GITHUB_BATCH_CONCURRENCY", "5"))
+MAX_BATCH_REPOS = int(os.getenv("GITHUB_MAX_BATCH_REPOS", "20"))
+_async_client = None
+
+
+def get_async_client():
+    # One keep-alive connection pool for every tool call of this server process, created
+    # lazily so it binds to the event loop FastMCP runs the tools on
+    global _async_client
+    if _async_client is None:
+        _async_client = httpx.AsyncClient(
+            headers=HEADERS,
+            timeout=REQUEST_TIMEOUT,
+            limits=httpx.Limits(max_connections=max(16, BATCH_CONCURRENCY * 2), max_keepalive_connections=BATCH_CONCURRENCY),
+            transport=httpx.AsyncHTTPTransport(retries=MAX_RETRIES),
+        )
+    return _async_client
 
 def parse_repo_url(repo_url: str):
     parts = repo_url.rstrip("/").split("/")
@@ -27,39 +154,200 @@ def handle_api_response(response):
         return None, f"❌ Failed to parse response: {str(e)}"
 
 
-@mcp.tool()
-def get_commit_history(repo_url: str) -> str:
-    """Get commit history from GitHub."""
-    owner, repo = parse_repo_url(repo_url)
-    if not owner:
-        return "Invalid GitHub repo URL format."
+def conditional_headers(cached):
+    headers = {}
+    if cached:
+        if cached.get("etag"):
+            headers["If-None-Match"] = cached["etag"]
+        if cached.get("last_modified"):
+            headers["If-Modified-Since"] = cached["last_modified"]
+    return headers
+
+
+def handle_cached_response(key, cached, response):
+    """
+    Resolve a (possibly conditional) response against the cache.
+    Returns:
+        tuple: (data, Link header, error)
+    """
+    RATE_LIMIT.update(response.headers)
+
+    if response.status_code == 304 and cached:
+        return cached["data"], cached.get("link"), None
 
-    url = f"{GITHUB_API_BASE}/{owner}/{repo}/commits"
-    response = requests.get(url, headers=HEADERS)
     data, error = handle_api_response(response)
-    if error:
-        return error
-    if not isinstance(data, list):
-        return "Unexpected API response structure."
+    link = response.headers.get("Link")
+    if error is None and (response.headers.get("ETag") or response.headers.get("Last-Modified")):
+        CACHE.put(key, {
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+            "link": link,
+            "data": data,
+        })
+    return data, link, error
+
+
+async def send_github_request(url, headers, params):
+    """
+    GET through the shared client, retrying GitHub's transient gateway errors with backoff.
+    Connection failures are retried by the transport.
+    """
+    for attempt in range(MAX_RETRIES + 1):
+        response = await get_async_client().get(url, headers=headers, params=params)
+        if response.status_code not in RETRY_STATUSES or attempt == MAX_RETRIES:
+            return response
+        await asyncio.sleep(0.5 * 2 ** attempt)
+
+
+async def github_fetch(url, params=None):
+    """
+    GET a GitHub API resource through the pooled client, revalidating cached copies
+    with conditional requests (304s do not count against the rate limit).
+
+    Never blocks the event loop: the server process is shared by every chat using it,
+    so rate-limit backoff and disk cache access must not stall other tool calls.
+    Returns:
+        tuple: (data, Link header, error)
+    """
+    key = ResponseCache.key(url, params)
+    cached = await asyncio.to_thread(CACHE.get, key)
+
+    wait, limit_error = RATE_LIMIT.check()
+    if limit_error:
+        # A possibly stale answer beats no answer while we back off
+        return (cached["data"], cached.get("link"), None) if cached else (None, None, limit_error)
+    if wait:
+        await asyncio.sleep(wait)
+
+    try:
+        response = await send_github_request(url, conditional_headers(cached), params)
+    except httpx.HTTPError as e:
+        if cached:
+            return cached["data"], cached.get("link"), None
+        return None, None, f"❌ Request failed: {str(e)}"
+
+    return await asyncio.to_thread(handle_cached_response, key, cached, response)
+
+
+async def github_get(url, params=None):
+    data, _, error = await github_fetch(url, params)
+    return data, error
+
+
+def next_page_url(link_header):
+    """
+    Extract the `rel="next"` URL from a GitHub Link header.
+    """
+    for part in (link_header or "").split(","):
+        section = part.split(";")
+        if len(section) > 1 and any(p.strip() == 'rel="next"' for p in section[1:]):
+            return section[0].strip().strip("<>")
+    return None
+
+
+class GitHubError(Exception):
+    pass
+
+
+async def iter_github_items(url, params, limit, page_size=None):
+    """
+    Yield list items across pages, following Link headers and stopping as soon as
+    `limit` items were produced or the caller stops iterating.
+    """
+    params = dict(params or {})
+    params["per_page"] = min(100, page_size or limit)
+    produced = 0
+
+    while url and produced < limit:
+        data, link, error = await github_fetch(url, params)
+        if error:
+            raise GitHubError(error)
+        if not isinstance(data, list):
+            raise GitHubError("Unexpected API response structure.")
+
+        for item in data:
+            yield item
+            produced += 1
+            if produced >= limit:
+                return
+
+        # The next link already carries every query parameter
+        url, params = next_page_url(link), None
+
+
+MAX_LIST_ITEMS = int(os.getenv("GITHUB_MAX_LIST_ITEMS", "1000"))
+
 
-    formatted = [
+def format_commit(c):
+    return (
         f"{c.get('sha', '')[:7]} by {c.get('commit', {}).get('author', {}).get('name', 'Unknown')}: "
         f"{c.get('commit', {}).get('message', 'No message')}"
-        for c in data[:5]
-    ]
-    return "\n".join(formatted)
+    )
+
+
+def format_pull_request(pr):
+    return (
+        f"🔃 PR #{pr.get('number')} by {pr.get('user', {}).get('login', 'unknown')} on {pr.get('created_at', '')}:\n"
+        f"➡️ {pr.get('title', 'No title')}\n🔗 {pr.get('html_url', '')}\n"
+    )
+
+
+
+async def write_items(items, formatter, empty_message):
+    """
+    Format items one at a time into a single string, keeping what was already
+    fetched if a later page fails.
+    """
+    output = io.StringIO()
+    count = 0
+    try:
+        async for item in items:
+            if count:
+                output.write("\n")
+            output.write(formatter(item))
+            count += 1
+    except GitHubError as e:
+        output.write(("\n" if count else "") + str(e))
+    return output.getvalue() if output.tell() else empty_message
+
+
+async def commit_history(owner, repo, limit, since="", author=""):
+    limit = max(1, min(limit, MAX_LIST_ITEMS))
+    params = {}
+    if since:
+        params["since"] = since
+    if author:
+        params["author"] = author
+
+    url = f"{GITHUB_API_BASE}/{owner}/{repo}/commits"
+    return await write_items(iter_github_items(url, params, limit), format_commit, "No commits found.")
 
 
 @mcp.tool()
-def get_repo_details(repo_url: str) -> str:
+async def get_commit_history(repo_url: str, limit: int = 5, since: str = "", author: str = "") -> str:
+    """
+    Get commit history from GitHub, newest first.
+    Args:
+        repo_url: URL of the repository.
+        limit: Maximum number of commits to return.
+        since: Only commits after this ISO 8601 date, e.g. 2025-01-31T00:00:00Z.
+        author: Only commits by this GitHub login or email address.
+    """
+    owner, repo = parse_repo_url(repo_url)
+    if not owner:
+        return "Invalid GitHub repo URL format."
+    return await commit_history(owner, repo, limit, since, author)
+
+
+@mcp.tool()
+async def get_repo_details(repo_url: str) -> str:
     """Get repository details from GitHub."""
     owner, repo = parse_repo_url(repo_url)
     if not owner:
         return "Invalid GitHub repo URL format."
 
     url = f"{GITHUB_API_BASE}/{owner}/{repo}"
-    response = requests.get(url, headers=HEADERS)
-    data, error = handle_api_response(response)
+    data, error = await github_get(url)
     if error:
         return error
 
@@ -74,27 +362,135 @@ def get_repo_details(repo_url: str) -> str:
     )
 
 
+PULL_REQUEST_STATES = ("open", "closed", "all")
+
+
+async def take_while(predicate, items):
+    async for item in items:
+        if not predicate(item):
+            return
+        yield item
+
+
+async def take(items, limit):
+    if limit <= 0:
+        return
+    count = 0
+    async for item in items:
+        yield item
+        count += 1
+        if count >= limit:
+            return
+
+
 @mcp.tool()
-def summarize_pull_requests(repo_url: str) -> str:
-    """Get open pull requests from GitHub and summarize them."""
+async def summarize_pull_requests(repo_url: str, limit: int = 5, state: str = "open", since: str = "", author: str = "") -> str:
+    """
+    Get pull requests from GitHub and summarize them, newest first.
+    Args:
+        repo_url: URL of the repository.
+        limit: Maximum number of pull requests to return.
+        state: "open", "closed" or "all".
+        since: Only pull requests created after this ISO 8601 date, e.g. 2025-01-31T00:00:00Z.
+        author: Only pull requests opened by this GitHub login.
+    """
     owner, repo = parse_repo_url(repo_url)
     if not owner:
         return "Invalid GitHub repo URL format."
+    if state not in PULL_REQUEST_STATES:
+        return "state must be one of: open, closed, all."
+    return await pull_request_summary(owner, repo, limit, state, since, author)
+
 
+async def pull_request_summary(owner, repo, limit, state="open", since="", author=""):
+    limit = max(1, min(limit, MAX_LIST_ITEMS))
+    params = {"state": state, "sort": "created", "direction": "desc"}
     url = f"{GITHUB_API_BASE}/{owner}/{repo}/pulls"
-    response = requests.get(url, headers=HEADERS, params={"state": "open"})
-    data, error = handle_api_response(response)
-    if error:
-        return error
-    if not data:
-        return "No open pull requests found."
 
-    summaries = [
-        f"🔃 PR #{pr.get('number')} by {pr.get('user', {}).get('login', 'unknown')} on {pr.get('created_at', '')}:\n"
-        f"➡️ {pr.get('title', 'No title')}\n🔗 {pr.get('html_url', '')}\n"
-        for pr in data[:5]
-    ]
-    return "\n".join(summaries)
+    # The pulls API has no author/date filters: filter while paging and stop at the first PR older than `since`
+    page_size = 100 if author else limit
+    pulls = iter_github_items(url, params, MAX_LIST_ITEMS, page_size=page_size)
+    if since:
+        pulls = take_while(lambda pr: pr.get("created_at", "") >= since, pulls)
+    if author:
+        pulls = (pr async for pr in pulls if pr.get("user", {}).get("login", "").lower() == author.lower())
+
+    empty = "No open pull requests found." if state == "open" else "No pull requests found."
+    return await write_items(take(pulls, limit), format_pull_request, empty)
+
+
+async def for_each_repo(repo_urls, fetch):
+    """
+    Run `fetch(owner, repo)` for every distinct repo concurrently (capped by
+    GITHUB_BATCH_CONCURRENCY) and join the sections in input order.
+    """
+    unique_urls = list(dict.fromkeys(url.strip() for url in repo_urls if url.strip()))
+    if not unique_urls:
+        return "No repository URLs given."
+
+    semaphore = asyncio.Semaphore(BATCH_CONCURRENCY)
+
+    async def run(repo_url):
+        owner, repo = parse_repo_url(repo_url)
+        if not owner:
+            return f"### {repo_url}\nInvalid GitHub repo URL format."
+        async with semaphore:
+            return f"### {owner}/{repo}\n{await fetch(owner, repo)}"
+
+    sections = await asyncio.gather(*[run(url) for url in unique_urls[:MAX_BATCH_REPOS]])
+    skipped = len(unique_urls) - MAX_BATCH_REPOS
+    if skipped > 0:
+        sections.append(f"Skipped {skipped} repositories (limit is {MAX_BATCH_REPOS} per call).")
+    return "\n\n".join(sections)
+
+
+@mcp.tool()
+async def get_repos_details(repo_urls: list[str]) -> str:
+    """Get repository details for several GitHub repositories in one call."""
+    async def fetch(owner, repo):
+        data, error = await github_get(f"{GITHUB_API_BASE}/{owner}/{repo}")
+        if error:
+            return error
+        return (
+            f"⭐ {data.get('stargazers_count', 0)} | 🍴 {data.get('forks_count', 0)} | "
+            f"🐛 {data.get('open_issues_count', 0)} | 🕒 {data.get('updated_at', 'N/A')}\n"
+            f"📝 {data.get('description') or 'No description'}"
+        )
+
+    return await for_each_repo(repo_urls, fetch)
+
+
+@mcp.tool()
+async def get_repos_commit_history(repo_urls: list[str], limit: int = 5, since: str = "", author: str = "") -> str:
+    """
+    Get recent commits for several GitHub repositories in one call, newest first.
+    Args:
+        repo_urls: URLs of the repositories.
+        limit: Maximum number of commits per repository.
+        since: Only commits after this ISO 8601 date, e.g. 2025-01-31T00:00:00Z.
+        author: Only commits by this GitHub login or email address.
+    """
+    return await for_each_repo(repo_urls, lambda owner, repo: commit_history(owner, repo, limit, since, author))
+
+
+@mcp.tool()
+async def summarize_repos_pull_requests(
+    repo_urls: list[str], limit: int = 5, state: str = "open", since: str = "", author: str = "",
+) -> str:
+    """
+    Get and summarize pull requests for several GitHub repositories in one call, newest first.
+    Args:
+        repo_urls: URLs of the repositories.
+        limit: Maximum number of pull requests per repository.
+        state: "open", "closed" or "all".
+        since: Only pull requests created after this ISO 8601 date, e.g. 2025-01-31T00:00:00Z.
+        author: Only pull requests opened by this GitHub login.
+    """
+    if state not in PULL_REQUEST_STATES:
+        return "state must be one of: open, closed, all."
+    return await for_each_repo(
+        repo_urls, lambda owner, repo: pull_request_summary(owner, repo, limit, state, since, author),
+    )
 
 
 if __name__ == "__main__":
@@ -0,0 +1,98 @@
+import asyncio
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, ToolMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+# Tool-call scripts selected by the `model` of a stub agent. A script is a list of steps,
+# each step a list of tool calls the model requests in parallel before answering.
+STUB_SCRIPTS = {
+    "stub": [],
+    "calculator": [
+        [{"name": "add", "args": {"a": 2, "b": 3}}],
+    ],
+    "calculator_parallel": [
+        [{"name": "add", "args": {"a": 2, "b": 3}}, {"name": "multiply", "args": {"a": 4, "b": 5}}],
+    ],
+    "calculator_chain": [
+        [{"name": "add", "args": {"a": 2, "b": 3}}],
+        [{"name": "multiply", "args": {"a": 5, "b": 7}}],
+    ],
+}
+
+
+def stub_script(name: str, custom: Optional[dict] = None) -> list:
+    """
+    Steps of the named script; `custom` scripts (`STUB_LLM_SCRIPTS`) override the built-in
+    ones and unknown names never call a tool.
+    """
+    scripts = {**STUB_SCRIPTS, **(custom or {})}
+    return scripts.get(name or "stub", [])
+
+
+def estimate_tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+
+class StubChatModel(BaseChatModel):
+    """
+    Deterministic stand-in for Groq/OpenAI used by benchmarks.
+
+    Waits for a fixed latency, like a remote LLM would, then either requests the next step of
+    its tool-call script or answers with an echo of the latest human message and the tool
+    results it received. Calls to tools that are not bound to the agent are skipped.
+    """
+
+    latency_ms: int = 500
+    script: List[List[Dict[str, Any]]] = []
+    tool_names: Tuple[str, ...] = ()
+
+    @property
+    def _llm_type(self) -> str:
+        return "stub"
+
+    def _bound_script(self):
+        steps = [[call for call in step if call["name"] in self.tool_names] for step in self.script]
+        return [step for step in steps if step]
+
+    def _reply(self, messages: List[BaseMessage]) -> ChatResult:
+        start = next((i for i in range(len(messages) - 1, -1, -1) if isinstance(messages[i], HumanMessage)), None)
+        query = messages[start].content if start is not None else ""
+        turn = messages[start + 1:] if start is not None else messages
+
+        step = sum(1 for message in turn if isinstance(message, AIMessage) and message.tool_calls)
+        script = self._bound_script()
+        if step < len(script):
+            message = AIMessage(content="", tool_calls=[
+                {"name": call["name"], "args": call.get("args", {}), "id": f"call_{step}_{i}", "type": "tool_call"}
+                for i, call in enumerate(script[step])
+            ])
+        else:
+            results = [str(message.content) for message in turn if isinstance(message, ToolMessage)]
+            content = f"Stub reply to: {query}"
+            if results:
+                content += f" (tool results: {', '.join(results)})"
+            message = AIMessage(content=content)
+
+        input_tokens = sum(estimate_tokens(str(m.content)) for m in messages)
+        output_tokens = estimate_tokens(str(message.content) or str(message.tool_calls))
+        message.usage_metadata = {
+            "input_tokens": input_tokens,
+            "output_tokens": output_tokens,
+            "total_tokens": input_tokens + output_tokens,
+        }
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager=None, **kwargs: Any) -> ChatResult:
+        time.sleep(self.latency_ms / 1000)
+        return self._reply(messages)
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager=None, **kwargs: Any) -> ChatResult:
+        await asyncio.sleep(self.latency_ms / 1000)
+        return self._reply(messages)
+
+    def bind_tools(self, tools, **kwargs: Any):
+        names = tuple(tool["name"] if isinstance(tool, dict) else tool.name for tool in tools)
+        return self.model_copy(update={"tool_names": names})
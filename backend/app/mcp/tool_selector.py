@@ -0,0 +1,140 @@
+import asyncio
+import logging
+import threading
+
+import numpy as np
+from asgiref.sync import sync_to_async
+
+from ..embeddings import embed_query, embed_texts
+from ..models import Tool
+
+logger = logging.getLogger(__name__)
+
+
+def tool_text(tool) -> str:
+    return f"{tool.name}: {tool.description}"
+
+
+@sync_to_async(thread_sensitive=False)
+def load_tool_embeddings(agent, names):
+    return dict(Tool.objects.filter(agent=agent, name__in=names, embedding__isnull=False).values_list("name", "embedding"))
+
+
+@sync_to_async(thread_sensitive=False)
+def save_tool_embeddings(agent, embeddings):
+    for name, vector in embeddings.items():
+        Tool.objects.filter(agent=agent, name=name).update(embedding=vector.tobytes())
+
+
+class ToolIndex:
+    """
+    Embedding matrix of one agent's tools, one unit-length row per tool name.
+
+    The index is reconciled with the agent's current tool list on every lookup: rows of
+    removed tools are dropped, and new tools are embedded (or loaded from `Tool.embedding`
+    when another worker already did it), so descriptions are embedded only once. Rows and
+    stored embeddings whose dimension differs from the query's (after `EMBEDDING_MODEL`
+    changed) are discarded and re-embedded.
+    """
+
+    def __init__(self):
+        self.names = []
+        self.matrix = None
+        self._lock = threading.Lock()
+
+    def _apply(self, current, added):
+        with self._lock:
+            keep = [i for i, name in enumerate(self.names) if name in current]
+            names = [self.names[i] for i in keep]
+            rows = [self.matrix[keep]] if self.matrix is not None and keep else []
+
+            new_names = [name for name in added if name not in names]
+            if new_names:
+                rows.append(np.stack([added[name] for name in new_names]))
+                names.extend(new_names)
+
+            self.names = names
+            self.matrix = np.vstack(rows) if rows else None
+
+    async def sync(self, agent, tools, dim):
+        current = {tool.name: tool for tool in tools}
+        with self._lock:
+            if self.matrix is not None and self.matrix.shape[1] != dim:
+                logger.info(f"[{agent.agent_name}] Tool embeddings have a different dimension; rebuilding the tool index")
+                self.names, self.matrix = [], None
+            missing = [name for name in current if name not in self.names]
+            stale = len(self.names) != len(current) - len(missing)
+        if not missing and not stale:
+            return
+
+        added = {}
+        if missing:
+            stored = await load_tool_embeddings(agent, missing)
+            for name, blob in stored.items():
+                vector = np.frombuffer(bytes(blob), dtype=np.float32)
+                if vector.shape[0] == dim:
+                    added[name] = vector
+
+            to_embed = [name for name in missing if name not in added]
+            if to_embed:
+                vectors = await asyncio.to_thread(embed_texts, [tool_text(current[name]) for name in to_embed])
+                computed = dict(zip(to_embed, vectors))
+                await save_tool_embeddings(agent, computed)
+                added.update(computed)
+
+        self._apply(current, added)
+
+    def top_k(self, query_vector, k):
+        with self._lock:
+            if self.matrix is None:
+                return set()
+            scores = self.matrix @ query_vector
+            k = min(k, len(self.names))
+            best = np.argpartition(-scores, k - 1)[:k]
+            return {self.names[i] for i in best}
+
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+_selection_disabled = False
+
+
+def get_tool_index(agent_id) -> ToolIndex:
+    with _indexes_lock:
+        return _indexes.setdefault(str(agent_id), ToolIndex())
+
+
+def drop_tool_index(agent_id):
+    with _indexes_lock:
+        _indexes.pop(str(agent_id), None)
+
+
+async def select_tools(agent, tools, query, top_k):
+    """
+    Keep only the `top_k` tools whose descriptions are most similar to the query.
+    Args:
+        agent (AgentConfig): Agent owning the tools.
+        tools (list): All LangChain tools of the agent.
+        query (str): The user message.
+        top_k (int | None): Number of tools to bind; falsy disables selection.
+    Returns:
+        list: The selected tools, in their original order.
+    """
+    global _selection_disabled
+    if not top_k or len(tools) <= top_k or _selection_disabled:
+        return tools
+
+    try:
+        query_vector = await asyncio.to_thread(embed_query, query)
+        index = get_tool_index(agent.id)
+        await index.sync(agent, tools, dim=query_vector.shape[0])
+        selected = index.top_k(query_vector, top_k)
+    except ImportError:
+        logger.warning("fastembed is not installed; binding all tools to every request")
+        _selection_disabled = True
+        return tools
+    except Exception:
+        logger.exception(f"[{agent.agent_name}] Tool selection failed; binding all tools")
+        return tools
+
+    return [tool for tool in tools if tool.name in selected]
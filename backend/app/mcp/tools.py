@@ -0,0 +1,181 @@
+import asyncio
+import contextvars
+import logging
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from jsonschema_pydantic import jsonschema_to_pydantic
+from langchain_core.tools import StructuredTool, ToolException
+
+from ..prometheus import TOOL_DURATION
+from .pool import get_session_pool, server_config_key
+from .result_cache import get_result_cache, result_cache_key, result_cache_ttl
+
+logger = logging.getLogger(__name__)
+
+_current_tool_run = contextvars.ContextVar("current_tool_run", default=None)
+
+
+class ToolTimeoutError(ToolException):
+    pass
+
+
+class ToolRun:
+    """
+    Per-chat tool execution state: caps how many tool calls of one agent run are in
+    flight at once and records the timing of every call.
+    """
+
+    def __init__(self, max_parallel):
+        self.semaphore = asyncio.Semaphore(max(1, max_parallel))
+        self.started = time.perf_counter()
+        self.calls = []
+
+    def record(self, name, queued, started, finished, status):
+        self.calls.append({
+            "tool": name,
+            "status": status,
+            "queued_ms": round((started - queued) * 1000, 1),
+            "start_ms": round((started - self.started) * 1000, 1),
+            "duration_ms": round((finished - started) * 1000, 1),
+        })
+
+
+@contextmanager
+def tool_run(max_parallel=None):
+    """
+    Scope the tool calls made by one agent invocation.
+
+    LangChain's async AgentExecutor already gathers the tool calls of a single LLM turn;
+    this bounds that fan-out and collects per-call timings (ordered by start time).
+    """
+    run = ToolRun(max_parallel or getattr(settings, "MCP_TOOL_MAX_PARALLEL", 4))
+    token = _current_tool_run.set(run)
+    try:
+        yield run
+    finally:
+        run.calls.sort(key=lambda call: call["start_ms"])
+        _current_tool_run.reset(token)
+
+
+def tool_timeout(server_config, name):
+    timeouts = server_config.get("toolTimeouts") or {}
+    if name in timeouts:
+        return timeouts[name]
+    return server_config.get("toolTimeout", getattr(settings, "MCP_TOOL_TIMEOUT", 30))
+
+
+def fix_schema(schema):
+    """
+    Rewrite JSON-schema `"type": [...]` unions into `anyOf` so pydantic can build a model.
+    """
+    if isinstance(schema, dict):
+        if isinstance(schema.get("type"), list):
+            schema = dict(schema)
+            schema["anyOf"] = [{"type": t} for t in schema.pop("type")]
+        return {key: fix_schema(value) for key, value in schema.items()}
+    if isinstance(schema, list):
+        return [fix_schema(item) for item in schema]
+    return schema
+
+
+def parse_tool_result(result) -> str:
+    """
+    Flatten an MCP `CallToolResult` into the text handed back to the LLM.
+    """
+    parts = []
+    for item in result.content or []:
+        text = getattr(item, "text", None)
+        if text is not None:
+            parts.append(text)
+        elif getattr(item, "resource", None) is not None:
+            resource = item.resource
+            parts.append(getattr(resource, "text", None) or str(getattr(resource, "uri", resource)))
+        else:
+            parts.append(str(item))
+
+    output = "\n".join(parts)
+    if getattr(result, "isError", False):
+        raise ToolException(output or "Tool execution failed.")
+    return output
+
+
+def build_langchain_tool(server_config, name, description, input_schema, call_tool=None):
+    """
+    Create a LangChain tool whose calls are routed through the MCP session pool.
+    Args:
+        server_config (dict): Configuration of the MCP server exposing the tool.
+        name (str): Tool name.
+        description (str): Tool description shown to the LLM.
+        input_schema (dict): JSON schema of the tool arguments.
+        call_tool (callable): Replaces `MCPSessionPool.call_tool`, e.g. to replay recorded results.
+    Returns:
+        StructuredTool: An async-only LangChain tool.
+    """
+    call_tool = call_tool or get_session_pool().call_tool
+    timeout = tool_timeout(server_config, name)
+    cache_ttl = result_cache_ttl(server_config, name)
+    server_key = server_config_key(server_config)
+
+    async def _call(arguments):
+        started = time.perf_counter()
+        status = "ok"
+        try:
+            result = await asyncio.wait_for(call_tool(server_config, name, arguments), timeout=timeout)
+        except asyncio.TimeoutError:
+            status = "timeout"
+            raise ToolTimeoutError(f"Tool '{name}' timed out after {timeout} seconds.")
+        except Exception:
+            status = "error"
+            raise
+        finally:
+            TOOL_DURATION.observe(time.perf_counter() - started, name, status)
+        return parse_tool_result(result)
+
+    async def _cached_call(arguments, cache_key):
+        output = await _call(arguments)
+        if cache_key is not None:
+            get_result_cache().put(cache_key, output, cache_ttl)
+        return output
+
+    async def _invoke(**kwargs):
+        run = _current_tool_run.get()
+
+        cache_key = None
+        if cache_ttl:
+            cache_key = result_cache_key(server_key, name, kwargs)
+            cached = get_result_cache().get(cache_key)
+            if cached is not None:
+                if run is not None:
+                    now = time.perf_counter()
+                    run.record(name, now, now, now, "cached")
+                return cached
+
+        if run is None:
+            return await _cached_call(kwargs, cache_key)
+
+        queued = time.perf_counter()
+        async with run.semaphore:
+            started = time.perf_counter()
+            status = "ok"
+            try:
+                return await _cached_call(kwargs, cache_key)
+            except ToolTimeoutError:
+                status = "timeout"
+                raise
+            except Exception:
+                status = "error"
+                raise
+            finally:
+                run.record(name, queued, started, time.perf_counter(), status)
+
+    schema = fix_schema(input_schema or {"type": "object", "properties": {}})
+    return StructuredTool(
+        name=name,
+        description=description or "",
+        args_schema=jsonschema_to_pydantic(schema),
+        coroutine=_invoke,
+        handle_tool_error=True,
+        metadata={"input_schema": input_schema or {}},
+    )
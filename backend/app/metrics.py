@@ -0,0 +1,282 @@
+import atexit
+import logging
+import math
+import threading
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.db import IntegrityError, close_old_connections, connection, transaction
+from django.utils.timezone import now
+
+from .lifespan import on_shutdown
+from .models import AgentConfig, AgentLatencyBucket, AgentMetric, DailyMetricRollup, MetricTotals
+
+logger = logging.getLogger(__name__)
+
+# Log-scale buckets: 8 per doubling keeps every bucket within ~9% of its lower bound
+BUCKETS_PER_DOUBLING = 8
+MAX_LATENCY_BUCKET = 255
+
+
+def latency_bucket(response_time_ms: float) -> int:
+    """
+    Histogram bucket of a latency; bucket `b > 0` covers [2^((b-1)/8), 2^(b/8)) ms.
+    """
+    if response_time_ms < 1:
+        return 0
+    return min(MAX_LATENCY_BUCKET, int(math.log2(response_time_ms) * BUCKETS_PER_DOUBLING) + 1)
+
+
+def bucket_upper_bound(bucket: int) -> float:
+    return 2 ** (bucket / BUCKETS_PER_DOUBLING)
+
+
+def percentiles_from_buckets(counts: dict, percentiles) -> dict:
+    """
+    Estimate percentiles from `{bucket: count}`, reporting each bucket's upper bound.
+    Histograms of any agents and days merge by adding their counts first.
+    """
+    total = sum(counts.values())
+    if not total:
+        return {f"p{p:g}": None for p in percentiles}
+
+    result = {}
+    ordered = sorted(counts.items())
+    for p in percentiles:
+        rank = max(1, math.ceil(total * p / 100))
+        seen = 0
+        for bucket, count in ordered:
+            seen += count
+            if seen >= rank:
+                result[f"p{p:g}"] = round(bucket_upper_bound(bucket), 1)
+                break
+    return result
+
+
+class MetricDelta:
+    """
+    Counters accumulated for one (agent, date) between two flushes.
+    """
+
+    __slots__ = ("requests", "success", "failures", "response_time_ms", "latency_buckets")
+
+    def __init__(self):
+        self.requests = 0
+        self.success = 0
+        self.failures = 0
+        self.response_time_ms = 0
+        self.latency_buckets = Counter()
+
+    def add(self, success: bool, response_time_ms: int):
+        self.requests += 1
+        if success:
+            self.success += 1
+        else:
+            self.failures += 1
+        self.response_time_ms += response_time_ms
+        self.latency_buckets[latency_bucket(response_time_ms)] += 1
+
+    def merge(self, other):
+        self.requests += other.requests
+        self.success += other.success
+        self.failures += other.failures
+        self.response_time_ms += other.response_time_ms
+        self.latency_buckets.update(other.latency_buckets)
+
+
+COUNTER_FIELDS = ("total_requests", "total_success", "total_failures", "total_response_time_ms")
+
+
+def upsert_increments(model, key_fields, counter_fields, rows):
+    """
+    Insert rows, or add their counters to the existing rows with the same key, in one
+    `INSERT ... ON CONFLICT DO UPDATE`.
+
+    The increments happen inside the database, so concurrent workers never lose updates.
+    Rows are written in key order so that flushes touching the same keys lock them in the
+    same order and cannot deadlock.
+    Args:
+        model: Model whose table has a unique constraint on `key_fields`.
+        key_fields (tuple): Field names of the conflict target.
+        counter_fields (tuple): Field names incremented on conflict.
+        rows (list): Value tuples ordered as `key_fields + counter_fields`.
+    """
+    if not rows:
+        return
+    rows = sorted(rows, key=lambda row: row[:len(key_fields)])
+
+    quote = connection.ops.quote_name
+    table = quote(model._meta.db_table)
+    keys = [quote(model._meta.get_field(name).column) for name in key_fields]
+    counters = [quote(model._meta.get_field(name).column) for name in counter_fields]
+    placeholders = "(" + ", ".join(["%s"] * (len(keys) + len(counters))) + ")"
+
+    sql = f"""
+        INSERT INTO {table} ({", ".join(keys + counters)})
+        VALUES {", ".join([placeholders] * len(rows))}
+        ON CONFLICT ({", ".join(keys)}) DO UPDATE SET
+            {", ".join(f"{column} = {table}.{column} + EXCLUDED.{column}" for column in counters)}
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [value for row in rows for value in row])
+
+
+def delta_counters(delta):
+    return (delta.requests, delta.success, delta.failures, delta.response_time_ms)
+
+
+def upsert_metric_deltas(deltas):
+    """
+    Add coalesced `{(agent_id, date): MetricDelta}` deltas to `AgentMetric`.
+    """
+    rows = [(agent_id, date, *delta_counters(delta)) for (agent_id, date), delta in deltas.items()]
+    upsert_increments(AgentMetric, ("agent", "date"), COUNTER_FIELDS, rows)
+
+
+def upsert_latency_buckets(deltas):
+    """
+    Add the latency histogram counts of coalesced deltas to `AgentLatencyBucket`.
+    """
+    rows = [
+        (agent_id, date, bucket, count)
+        for (agent_id, date), delta in deltas.items()
+        for bucket, count in delta.latency_buckets.items()
+    ]
+    upsert_increments(AgentLatencyBucket, ("agent", "date", "bucket"), ("count",), rows)
+
+
+def update_rollups(daily, agents=0):
+    """
+    Add per-day counters to `DailyMetricRollup` and their sum to the `MetricTotals` row.
+    Args:
+        daily (dict): `{date: (requests, success, failures, response_time_ms)}`; negative
+            values remove metrics, e.g. of a deleted agent.
+        agents (int): Change of the agent count.
+    """
+    upsert_increments(
+        DailyMetricRollup, ("date",), COUNTER_FIELDS,
+        [(date, *counters) for date, counters in daily.items()],
+    )
+    totals = [sum(values) for values in zip(*daily.values())] or [0] * len(COUNTER_FIELDS)
+    upsert_increments(MetricTotals, ("id",), ("total_agents",) + COUNTER_FIELDS, [(1, agents, *totals)])
+
+
+def daily_counters(deltas):
+    daily = defaultdict(lambda: [0] * len(COUNTER_FIELDS))
+    for (_, date), delta in deltas.items():
+        for i, value in enumerate(delta_counters(delta)):
+            daily[date][i] += value
+    return daily
+
+
+class MetricsAggregator:
+    """
+    Coalesces chat outcomes in memory per (agent, date) and upserts them periodically.
+
+    Recording is a dictionary update under a lock; a background thread flushes every
+    `flush_interval` seconds, so the hot `AgentMetric` rows see one write per interval and
+    worker instead of one per chat.
+    """
+
+    def __init__(self, flush_interval=5.0):
+        self.flush_interval = flush_interval
+        self._pending = defaultdict(MetricDelta)
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._stop = threading.Event()
+
+        self.flushes = 0
+        self.failed_flushes = 0
+
+    def _ensure_started(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="metrics-flusher", daemon=True)
+                self._thread.start()
+
+    def record(self, agent_id, success: bool, response_time_ms: int):
+        self._ensure_started()
+        key = (agent_id, now().date())
+        with self._lock:
+            self._pending[key].add(success, response_time_ms)
+
+    def _take(self):
+        with self._lock:
+            pending, self._pending = self._pending, defaultdict(MetricDelta)
+        return pending
+
+    def _restore(self, pending):
+        with self._lock:
+            for key, delta in pending.items():
+                self._pending[key].merge(delta)
+
+    def _write(self, pending):
+        with transaction.atomic():
+            upsert_metric_deltas(pending)
+            upsert_latency_buckets(pending)
+            update_rollups(daily_counters(pending))
+
+    def flush(self):
+        """
+        Write everything recorded so far. Deltas are kept for the next flush if the write fails.
+        """
+        with self._flush_lock:
+            pending = self._take()
+            if not pending:
+                return
+
+            close_old_connections()
+            try:
+                self._write(pending)
+            except IntegrityError:
+                # An agent was deleted since its chats were recorded
+                existing = set(AgentConfig.objects.filter(id__in={key[0] for key in pending}).values_list("id", flat=True))
+                pending = {key: delta for key, delta in pending.items() if key[0] in existing}
+                try:
+                    self._write(pending)
+                except Exception:
+                    self.failed_flushes += 1
+                    logger.exception("Failed to flush agent metrics")
+                    self._restore(pending)
+                    return
+            except Exception:
+                self.failed_flushes += 1
+                logger.exception("Failed to flush agent metrics; keeping them for the next flush")
+                self._restore(pending)
+                return
+            self.flushes += 1
+
+    def _run(self):
+        try:
+            while not self._stop.wait(self.flush_interval):
+                self.flush()
+        finally:
+            connection.close()
+
+    def close(self):
+        self._stop.set()
+        self.flush()
+
+    def stats(self):
+        with self._lock:
+            pending = len(self._pending)
+        return {"pending": pending, "flushes": self.flushes, "failed_flushes": self.failed_flushes}
+
+
+_aggregator = None
+_aggregator_lock = threading.Lock()
+
+
+def get_metrics_aggregator() -> MetricsAggregator:
+    global _aggregator
+    if _aggregator is None:
+        with _aggregator_lock:
+            if _aggregator is None:
+                _aggregator = MetricsAggregator(flush_interval=getattr(settings, "METRICS_FLUSH_INTERVAL", 5.0))
+                atexit.register(_aggregator.close)
+                on_shutdown(_aggregator.close)
+    return _aggregator
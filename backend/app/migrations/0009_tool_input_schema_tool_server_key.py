@@ -0,0 +1,23 @@
+# Generated by Django 5.2.1 on 2026-10-18 09:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0008_remove_agentconfig_n_history_messages_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tool',
+            name='input_schema',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.AddField(
+            model_name='tool',
+            name='server_key',
+            field=models.CharField(blank=True, default='', max_length=64),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.1 on 2026-10-18 10:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0009_tool_input_schema_tool_server_key'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='llmconfig',
+            name='provider',
+            field=models.CharField(choices=[('groq', 'Groq'), ('openai', 'OpenAI'), ('stub', 'Stub')], default='groq', max_length=50),
+        ),
+    ]
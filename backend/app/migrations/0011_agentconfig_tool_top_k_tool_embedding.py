@@ -0,0 +1,23 @@
+# Generated by Django 5.2.1 on 2026-10-18 12:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0010_alter_llmconfig_provider'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='agentconfig',
+            name='tool_top_k',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='tool',
+            name='embedding',
+            field=models.BinaryField(blank=True, editable=False, null=True),
+        ),
+    ]
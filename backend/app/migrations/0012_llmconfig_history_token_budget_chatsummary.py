@@ -0,0 +1,29 @@
+# Generated by Django 5.2.1 on 2026-10-18 13:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0011_agentconfig_tool_top_k_tool_embedding'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='llmconfig',
+            name='history_token_budget',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.CreateModel(
+            name='ChatSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('summary', models.TextField(blank=True, default='')),
+                ('covered_until', models.DateTimeField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('agent', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='chat_summary', to='app.agentconfig')),
+            ],
+        ),
+    ]
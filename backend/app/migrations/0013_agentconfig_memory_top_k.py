@@ -0,0 +1,18 @@
+# Generated by Django 5.2.1 on 2026-10-18 13:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0012_llmconfig_history_token_budget_chatsummary'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='agentconfig',
+            name='memory_top_k',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+    ]
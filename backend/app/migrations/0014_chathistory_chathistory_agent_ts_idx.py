@@ -0,0 +1,17 @@
+# Generated by Django 5.2.1 on 2026-10-18 14:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0013_agentconfig_memory_top_k'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='chathistory',
+            index=models.Index(fields=['agent', 'timestamp', 'role_order'], name='chathistory_agent_ts_idx'),
+        ),
+    ]
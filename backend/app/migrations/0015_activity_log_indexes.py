@@ -0,0 +1,30 @@
+# Generated by Django 5.2.1 on 2026-10-18 14:32
+
+import django.contrib.postgres.indexes
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0014_chathistory_chathistory_agent_ts_idx'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='agentactivitylog',
+            index=models.Index(fields=['-timestamp'], name='activitylog_ts_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='agentactivitylog',
+            index=models.Index(fields=['agent', '-timestamp'], name='activitylog_agent_ts_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='agentactivitylog',
+            index=models.Index(fields=['action', '-timestamp'], name='activitylog_action_ts_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='agentactivitylog',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['metadata'], name='activitylog_metadata_gin', opclasses=['jsonb_path_ops']),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.1 on 2026-10-18 15:02
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0015_activity_log_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='agentactivitylog',
+            name='timestamp',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+    ]
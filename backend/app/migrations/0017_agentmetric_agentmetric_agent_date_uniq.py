@@ -0,0 +1,39 @@
+# Generated by Django 5.2.1 on 2026-10-18 15:40
+
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def merge_duplicate_metrics(apps, schema_editor):
+    AgentMetric = apps.get_model('app', 'AgentMetric')
+    duplicates = (
+        AgentMetric.objects.values('agent_id', 'date')
+        .annotate(rows=Count('id'))
+        .filter(rows__gt=1)
+    )
+    for duplicate in duplicates:
+        rows = AgentMetric.objects.filter(agent_id=duplicate['agent_id'], date=duplicate['date']).order_by('id')
+        totals = rows.aggregate(
+            total_requests=Sum('total_requests'),
+            total_success=Sum('total_success'),
+            total_failures=Sum('total_failures'),
+            total_response_time_ms=Sum('total_response_time_ms'),
+        )
+        keep = rows.first()
+        rows.exclude(id=keep.id).delete()
+        AgentMetric.objects.filter(id=keep.id).update(**totals)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0016_alter_agentactivitylog_timestamp'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_metrics, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='agentmetric',
+            constraint=models.UniqueConstraint(fields=('agent', 'date'), name='agentmetric_agent_date_uniq'),
+        ),
+    ]
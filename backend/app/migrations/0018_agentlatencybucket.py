@@ -0,0 +1,28 @@
+# Generated by Django 5.2.1 on 2026-10-18 16:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0017_agentmetric_agentmetric_agent_date_uniq'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AgentLatencyBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('bucket', models.PositiveSmallIntegerField()),
+                ('count', models.BigIntegerField(default=0)),
+                ('agent', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='app.agentconfig')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('agent', 'date', 'bucket'), name='latencybucket_agent_date_bucket_uniq')],
+                'indexes': [models.Index(fields=['date'], name='latencybucket_date_idx')],
+            },
+        ),
+    ]
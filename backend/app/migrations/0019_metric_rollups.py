@@ -0,0 +1,66 @@
+# Generated by Django 5.2.1 on 2026-10-18 16:40
+
+from django.db import migrations, models
+from django.db.models import Sum
+
+
+def build_rollups(apps, schema_editor):
+    AgentConfig = apps.get_model('app', 'AgentConfig')
+    AgentMetric = apps.get_model('app', 'AgentMetric')
+    DailyMetricRollup = apps.get_model('app', 'DailyMetricRollup')
+    MetricTotals = apps.get_model('app', 'MetricTotals')
+
+    sums = {
+        'total_requests': Sum('total_requests'),
+        'total_success': Sum('total_success'),
+        'total_failures': Sum('total_failures'),
+        'total_response_time_ms': Sum('total_response_time_ms'),
+    }
+    DailyMetricRollup.objects.bulk_create([
+        DailyMetricRollup(**row) for row in AgentMetric.objects.values('date').annotate(**sums).order_by('date')
+    ])
+    totals = {field: value or 0 for field, value in AgentMetric.objects.aggregate(**sums).items()}
+    MetricTotals.objects.create(id=1, total_agents=AgentConfig.objects.count(), **totals)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0018_agentlatencybucket'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='agentmetric',
+            index=models.Index(fields=['date'], name='agentmetric_date_idx'),
+        ),
+        migrations.CreateModel(
+            name='DailyMetricRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('total_requests', models.BigIntegerField(default=0)),
+                ('total_success', models.BigIntegerField(default=0)),
+                ('total_failures', models.BigIntegerField(default=0)),
+                ('total_response_time_ms', models.BigIntegerField(default=0)),
+                ('date', models.DateField(unique=True)),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='MetricTotals',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('total_requests', models.BigIntegerField(default=0)),
+                ('total_success', models.BigIntegerField(default=0)),
+                ('total_failures', models.BigIntegerField(default=0)),
+                ('total_response_time_ms', models.BigIntegerField(default=0)),
+                ('total_agents', models.BigIntegerField(default=0)),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+        migrations.RunPython(build_rollups, migrations.RunPython.noop),
+    ]
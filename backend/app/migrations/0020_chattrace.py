@@ -0,0 +1,32 @@
+# Generated by Django 5.2.1 on 2026-10-18 17:20
+
+import django.db.models.deletion
+import django.utils.timezone
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0019_metric_rollups'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChatTrace',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('message_id', models.UUIDField(blank=True, db_index=True, null=True)),
+                ('transport', models.CharField(default='http', max_length=16)),
+                ('status', models.CharField(default='ok', max_length=16)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('duration_ms', models.PositiveIntegerField(default=0)),
+                ('spans', models.JSONField(default=list)),
+                ('agent', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='app.agentconfig')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['agent', '-created_at'], name='chattrace_agent_created_idx')],
+            },
+        ),
+    ]
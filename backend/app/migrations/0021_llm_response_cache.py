@@ -0,0 +1,31 @@
+# Generated by Django 5.2.1 on 2026-10-18 18:05
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0020_chattrace'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='llmconfig',
+            name='response_cache_ttl',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.CreateModel(
+            name='LLMResponseCacheEntry',
+            fields=[
+                ('key', models.CharField(max_length=64, primary_key=True, serialize=False)),
+                ('value', models.JSONField()),
+                ('latency_ms', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('expires_at', models.DateTimeField(db_index=True)),
+                ('agent', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='app.agentconfig')),
+            ],
+        ),
+    ]
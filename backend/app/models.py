@@ -1,9 +1,12 @@
 import uuid
+from django.contrib.postgres.indexes import GinIndex
 from django.db import models
+from django.utils import timezone
 
 class LLMProvider(models.TextChoices):
     GROQ = "groq", "Groq"
     OPENAI = "openai", "OpenAI"
+    STUB = "stub", "Stub"
 
 class LLMConfig(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
@@ -14,6 +17,8 @@ class LLMConfig(models.Model):
     timeout = models.PositiveIntegerField(default=10)
     max_retries = models.PositiveIntegerField(default=2)
     n_history_messages = models.PositiveIntegerField(default=4)
+    history_token_budget = models.PositiveIntegerField(null=True, blank=True)  # replaces n_history_messages when set
+    response_cache_ttl = models.PositiveIntegerField(null=True, blank=True)  # seconds; caches LLM responses when temperature is 0
     api_key = models.CharField(max_length=512, null=True, blank=True)  # stored but excluded from serializer
 
 
@@ -25,6 +30,8 @@ class AgentConfig(models.Model):
     llm = models.OneToOneField(LLMConfig, on_delete=models.CASCADE, default=None)
     system_message = models.TextField(null=True, blank=True, default="You are a helpful AI assistant with access to tools.")
     mcp_server = models.JSONField(default=dict)
+    tool_top_k = models.PositiveIntegerField(null=True, blank=True)  # bind only the k most relevant tools per query
+    memory_top_k = models.PositiveIntegerField(null=True, blank=True)  # recall the k most relevant past turns per query
 
 
 class Tool(models.Model):
@@ -32,6 +39,9 @@ class Tool(models.Model):
     agent = models.ForeignKey(AgentConfig, related_name='tools', on_delete=models.CASCADE)
     name = models.CharField(max_length=255)
     description = models.TextField()
+    input_schema = models.JSONField(default=dict, blank=True)
+    server_key = models.CharField(max_length=64, blank=True, default="")
+    embedding = models.BinaryField(null=True, blank=True, editable=False)  # normalized float32 vector of the description
     
 class ChatHistory(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
@@ -41,9 +51,23 @@ class ChatHistory(models.Model):
     timestamp = models.DateTimeField(auto_now_add=True)
     role_order = models.IntegerField(choices=[(0, 'Human'), (1, 'AI')], default=0)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["agent", "timestamp", "role_order"], name="chathistory_agent_ts_idx"),
+        ]
+
     def __str__(self):
         return f"Message from {self.role.capitalize()} at {self.timestamp}"
 
+class ChatSummary(models.Model):
+    agent = models.OneToOneField(AgentConfig, related_name='chat_summary', on_delete=models.CASCADE)
+    summary = models.TextField(blank=True, default="")
+    covered_until = models.DateTimeField(null=True, blank=True)  # timestamp of the newest message folded in
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Summary for {self.agent.agent_name} up to {self.covered_until}"
+
 class ActivityEvents(models.TextChoices):
     AGENT_CREATED = "agent_created", "Agent Created"
     AGENT_DELETED = "agent_deleted", "Agent Deleted"
@@ -56,10 +80,19 @@ class ActivityEvents(models.TextChoices):
 class AgentActivityLog(models.Model):
     agent = models.ForeignKey(AgentConfig, on_delete=models.SET_NULL, null=True, blank=True)
     action = models.CharField(max_length=50, choices=ActivityEvents.choices)
-    timestamp = models.DateTimeField(auto_now_add=True)
+    timestamp = models.DateTimeField(default=timezone.now)  # set when the event happens, not when the buffer is flushed
     description = models.TextField(blank=True, null=True)
     metadata = models.JSONField(blank=True, null=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["-timestamp"], name="activitylog_ts_idx"),
+            models.Index(fields=["agent", "-timestamp"], name="activitylog_agent_ts_idx"),
+            models.Index(fields=["action", "-timestamp"], name="activitylog_action_ts_idx"),
+            # Serves `metadata__contains` (jsonb @>) filters
+            GinIndex(fields=["metadata"], opclasses=["jsonb_path_ops"], name="activitylog_metadata_gin"),
+        ]
+
     def __str__(self):
         return f"{self.user} - {self.action} @ {self.timestamp}"
 
@@ -72,7 +105,95 @@ class AgentMetric(models.Model):
     total_failures = models.PositiveIntegerField(default=0)
     total_response_time_ms = models.BigIntegerField(default=0)
 
+    class Meta:
+        constraints = [
+            # Conflict target of the metrics upsert
+            models.UniqueConstraint(fields=["agent", "date"], name="agentmetric_agent_date_uniq"),
+        ]
+        indexes = [
+            models.Index(fields=["date"], name="agentmetric_date_idx"),
+        ]
+
     def average_response_time(self):
         if self.total_requests == 0:
             return 0
         return self.total_response_time_ms / self.total_requests
+
+class AgentLatencyBucket(models.Model):
+    """
+    One bucket of an agent's daily chat latency histogram (see `app.metrics.latency_bucket`).
+    """
+    agent = models.ForeignKey(AgentConfig, on_delete=models.CASCADE)
+    date = models.DateField()
+    bucket = models.PositiveSmallIntegerField()
+    count = models.BigIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["agent", "date", "bucket"], name="latencybucket_agent_date_bucket_uniq"),
+        ]
+        indexes = [
+            models.Index(fields=["date"], name="latencybucket_date_idx"),
+        ]
+
+class MetricRollupFields(models.Model):
+    total_requests = models.BigIntegerField(default=0)
+    total_success = models.BigIntegerField(default=0)
+    total_failures = models.BigIntegerField(default=0)
+    total_response_time_ms = models.BigIntegerField(default=0)
+
+    class Meta:
+        abstract = True
+
+    def average_response_time(self):
+        if self.total_requests == 0:
+            return 0
+        return self.total_response_time_ms / self.total_requests
+
+class DailyMetricRollup(MetricRollupFields):
+    """
+    `AgentMetric` summed over all agents for one day, maintained by the metrics flush.
+    """
+    date = models.DateField(unique=True)
+
+class MetricTotals(MetricRollupFields):
+    """
+    Single row (id=1) holding all-time totals and the number of agents.
+    """
+    total_agents = models.BigIntegerField(default=0)
+
+class ChatTrace(models.Model):
+    """
+    Timing spans of one sampled chat request.
+
+    `spans` is a list of `[name, start_ms, duration_ms, parent_index, attributes]` rows,
+    where `start_ms` is relative to the start of the request and `parent_index` points into
+    the same list (-1 for top-level spans).
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)  # request id
+    agent = models.ForeignKey(AgentConfig, on_delete=models.SET_NULL, null=True, blank=True)
+    message_id = models.UUIDField(null=True, blank=True, db_index=True)  # human ChatHistory row of the turn
+    transport = models.CharField(max_length=16, default="http")
+    status = models.CharField(max_length=16, default="ok")
+    created_at = models.DateTimeField(default=timezone.now)
+    duration_ms = models.PositiveIntegerField(default=0)
+    spans = models.JSONField(default=list)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["agent", "-created_at"], name="chattrace_agent_created_idx"),
+        ]
+
+class LLMResponseCacheEntry(models.Model):
+    """
+    Persistent tier of the LLM response cache (see `app.mcp.llm_cache`).
+
+    `key` hashes the agent, the model config, the bound tools and the full prompt; `value`
+    holds the serialized generations.
+    """
+    key = models.CharField(max_length=64, primary_key=True)
+    agent = models.ForeignKey(AgentConfig, on_delete=models.CASCADE)
+    value = models.JSONField()
+    latency_ms = models.PositiveIntegerField(default=0)  # time the LLM took to produce it
+    created_at = models.DateTimeField(default=timezone.now)
+    expires_at = models.DateTimeField(db_index=True)
@@ -0,0 +1,442 @@
+import atexit
+import bisect
+import json
+import logging
+import os
+import threading
+import time
+
+from django.conf import settings
+from langchain_core.callbacks import BaseCallbackHandler
+
+from .lifespan import on_shutdown
+from .tracing import token_usage
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class Metric:
+    """
+    A metric family: one value per combination of label values, updated under a lock.
+    """
+
+    type = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+        REGISTRY.register(self)
+
+    def samples(self):
+        with self._lock:
+            return [(labels, self._copy(value)) for labels, value in self._values.items()]
+
+    def _copy(self, value):
+        return value
+
+
+class Counter(Metric):
+    type = "counter"
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+
+class Gauge(Metric):
+    type = "gauge"
+
+    def set(self, value, *labels):
+        with self._lock:
+            self._values[labels] = value
+
+
+class Histogram(Metric):
+    """
+    Values are `[count per bucket..., count above the last bound, sum]`; buckets are made
+    cumulative only when rendered.
+    """
+
+    type = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=()):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames)
+
+    def observe(self, value, *labels):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts = self._values.get(labels)
+            if counts is None:
+                counts = self._values[labels] = [0] * (len(self.buckets) + 2)
+            counts[index] += 1
+            counts[-1] += value
+
+    def _copy(self, value):
+        return list(value)
+
+
+class Registry:
+    """
+    The metrics of this process.
+
+    With several worker processes each one periodically writes a snapshot of its metrics to
+    `PROMETHEUS_MULTIPROC_DIR`, and a scrape served by any worker adds up the snapshots of
+    all live workers, so counters do not depend on which worker answers. Snapshot files are
+    named after the worker's pid and start time, so a file left by a killed worker is never
+    mistaken for a later process that got the same pid; such files are deleted on scrape.
+    """
+
+    def __init__(self):
+        self._metrics = []
+        self._collectors = []
+        self._exporter = None
+        self._stop = threading.Event()
+
+    def register(self, metric):
+        self._metrics.append(metric)
+
+    def register_collector(self, collector):
+        """
+        Register a callable run before every snapshot, e.g. to refresh gauges.
+        """
+        self._collectors.append(collector)
+        return collector
+
+    def snapshot(self):
+        for collector in self._collectors:
+            try:
+                collector()
+            except Exception:
+                logger.exception(f"Metrics collector {collector!r} failed")
+
+        return {
+            metric.name: {
+                "type": metric.type,
+                "help": metric.documentation,
+                "labelnames": metric.labelnames,
+                "buckets": getattr(metric, "buckets", ()),
+                "samples": metric.samples(),
+            }
+            for metric in self._metrics
+        }
+
+    # Multi-process export
+
+    def _snapshot_path(self, directory):
+        return os.path.join(directory, f"worker-{worker_id()}.json")
+
+    def write_snapshot(self, directory):
+        path = self._snapshot_path(directory)
+        tmp = f"{path}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(self.snapshot(), f)
+        os.replace(tmp, path)
+
+    def start_exporter(self):
+        directory = getattr(settings, "PROMETHEUS_MULTIPROC_DIR", "")
+        if not directory or self._exporter is not None:
+            return
+
+        os.makedirs(directory, exist_ok=True)
+        interval = getattr(settings, "PROMETHEUS_SYNC_INTERVAL", 5.0)
+
+        def run():
+            while not self._stop.wait(interval):
+                try:
+                    self.write_snapshot(directory)
+                except Exception:
+                    logger.exception("Failed to write the metrics snapshot")
+
+        self._exporter = threading.Thread(target=run, name="prometheus-exporter", daemon=True)
+        self._exporter.start()
+
+        def stop():
+            self._stop.set()
+            # Let a snapshot being written finish first, or it would recreate the file
+            self._exporter.join(timeout=5)
+            try:
+                os.remove(self._snapshot_path(directory))
+            except OSError:
+                pass
+
+        atexit.register(stop)
+        on_shutdown(stop)
+
+    def worker_snapshots(self):
+        """
+        Snapshots written by the other live workers.
+        """
+        directory = getattr(settings, "PROMETHEUS_MULTIPROC_DIR", "")
+        if not directory or not os.path.isdir(directory):
+            return []
+
+        own = f"worker-{worker_id()}.json"
+        snapshots = []
+        for filename in os.listdir(directory):
+            if not (filename.startswith("worker-") and filename.endswith(".json")) or filename == own:
+                continue
+            path = os.path.join(directory, filename)
+            if not worker_alive(filename[len("worker-"):-len(".json")]):
+                # Left behind by a worker that died without its shutdown hook
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+                continue
+            try:
+                with open(path) as f:
+                    snapshots.append(json.load(f))
+            except (OSError, ValueError):
+                # Being replaced or removed by its worker right now
+                continue
+        return snapshots
+
+    def render(self) -> str:
+        snapshot = self.snapshot()
+        for other in self.worker_snapshots():
+            merge_snapshot(snapshot, other)
+        return render_snapshot(snapshot)
+
+
+def process_alive(pid) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def process_start_time(pid):
+    """
+    Start time of a process in clock ticks since boot (Linux), None where unavailable.
+    """
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            stat = f.read()
+    except OSError:
+        return None
+    # The command name may contain spaces; fields after it are fixed
+    return stat[stat.rindex(")") + 2:].split()[19]
+
+
+def worker_id(pid=None) -> str:
+    pid = pid or os.getpid()
+    start = process_start_time(pid)
+    return f"{pid}-{start}" if start is not None else str(pid)
+
+
+def worker_alive(identifier) -> bool:
+    """
+    Whether the worker that wrote the snapshot `worker-<identifier>.json` is still running.
+    """
+    pid, _, start = identifier.partition("-")
+    try:
+        pid = int(pid)
+    except ValueError:
+        return False
+    if not process_alive(pid):
+        return False
+    # Same pid, different process: the writer died and the pid was reused
+    return not start or process_start_time(pid) in (None, start)
+
+
+def merge_snapshot(snapshot, other):
+    for name, family in other.items():
+        if name not in snapshot:
+            continue
+        values = {tuple(labels): value for labels, value in snapshot[name]["samples"]}
+        for labels, value in family["samples"]:
+            labels = tuple(labels)
+            current = values.get(labels)
+            if current is None:
+                values[labels] = value
+            elif isinstance(current, list):
+                values[labels] = [a + b for a, b in zip(current, value)]
+            else:
+                values[labels] = current + value
+        snapshot[name]["samples"] = list(values.items())
+
+
+def escape_label(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def format_labels(labelnames, labels, extra=()):
+    pairs = [f'{name}="{escape_label(value)}"' for name, value in (*zip(labelnames, labels), *extra)]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def format_value(value) -> str:
+    if isinstance(value, float) and value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def render_snapshot(snapshot) -> str:
+    """
+    Render metrics in the Prometheus text exposition format.
+    """
+    lines = []
+    for name, family in snapshot.items():
+        lines.append(f"# HELP {name} {family['help']}")
+        lines.append(f"# TYPE {name} {family['type']}")
+        labelnames = family["labelnames"]
+
+        for labels, value in sorted(family["samples"], key=lambda sample: tuple(map(str, sample[0]))):
+            if family["type"] != "histogram":
+                lines.append(f"{name}{format_labels(labelnames, labels)} {format_value(value)}")
+                continue
+
+            cumulative = 0
+            for bound, count in zip((*family["buckets"], float("inf")), value[:-1]):
+                cumulative += count
+                le = (("le", format_value(float(bound))),)
+                lines.append(f"{name}_bucket{format_labels(labelnames, labels, le)} {cumulative}")
+            lines.append(f"{name}_sum{format_labels(labelnames, labels)} {format_value(float(value[-1]))}")
+            lines.append(f"{name}_count{format_labels(labelnames, labels)} {cumulative}")
+    return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+CHAT_REQUESTS = Counter(
+    "connectforge_chat_requests_total", "Chat requests handled, by agent and outcome.", ("agent_id", "status"),
+)
+CHAT_DURATION = Histogram(
+    "connectforge_chat_duration_seconds", "End-to-end chat latency, by agent.", ("agent_id",),
+    buckets=(0.25, 0.5, 1, 2, 4, 8, 16, 32, 64, 128),
+)
+LLM_DURATION = Histogram(
+    "connectforge_llm_call_duration_seconds", "Latency of single LLM calls, by model and outcome.", ("model", "status"),
+    buckets=(0.1, 0.25, 0.5, 1, 2, 4, 8, 16, 32, 64),
+)
+LLM_TOKENS = Counter(
+    "connectforge_llm_tokens_total", "Tokens reported by the LLM provider, by model and direction.", ("model", "type"),
+)
+TOOL_DURATION = Histogram(
+    "connectforge_tool_call_duration_seconds", "Latency of MCP tool calls, by tool and outcome.", ("tool", "status"),
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+MCP_SPAWNS = Counter(
+    "connectforge_mcp_session_spawns_total", "MCP sessions started, by server config key and outcome.", ("server", "status"),
+)
+DB_QUERIES = Counter(
+    "connectforge_db_queries_total", "Database queries executed, by connection alias and statement.", ("alias", "statement"),
+)
+DB_QUERY_DURATION = Histogram(
+    "connectforge_db_query_duration_seconds", "Database query latency, by connection alias.", ("alias",),
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1),
+)
+LLM_CACHE_LOOKUPS = Counter(
+    "connectforge_llm_cache_lookups_total", "LLM response cache lookups, by agent and result.", ("agent_id", "result"),
+)
+LLM_CACHE_SAVED_SECONDS = Counter(
+    "connectforge_llm_cache_saved_seconds_total", "LLM latency avoided by cache hits, by agent.", ("agent_id",),
+)
+COMPONENT_STATS = Gauge(
+    "connectforge_component_stat", "Counters and sizes reported by in-process caches, pools and writers.", ("component", "stat"),
+)
+
+
+@REGISTRY.register_collector
+def collect_component_stats():
+    from .activity_log import get_activity_writer
+    from .mcp.executor_cache import get_executor_cache
+    from .mcp.llm_cache import get_llm_response_store
+    from .mcp.pool import get_session_pool
+    from .mcp.registry import get_tool_registry
+    from .mcp.result_cache import get_result_cache
+    from .metrics import get_metrics_aggregator
+    from .tracing import get_trace_writer
+
+    components = {
+        "executor_cache": get_executor_cache,
+        "tool_registry": get_tool_registry,
+        "tool_result_cache": get_result_cache,
+        "llm_response_cache": get_llm_response_store,
+        "mcp_session_pool": get_session_pool,
+        "activity_log_writer": get_activity_writer,
+        "trace_writer": get_trace_writer,
+        "metrics_aggregator": get_metrics_aggregator,
+    }
+    for component, getter in components.items():
+        for stat, value in getter().stats().items():
+            # Ratios are left to PromQL: they cannot be added up across workers
+            if isinstance(value, int) and not isinstance(value, bool):
+                COMPONENT_STATS.set(value, component, stat)
+
+
+SQL_STATEMENTS = {"SELECT", "INSERT", "UPDATE", "DELETE"}
+
+
+def count_queries(execute, sql, params, many, context):
+    """
+    `connection.execute_wrappers` hook counting and timing every query.
+    """
+    alias = context["connection"].alias
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        DB_QUERY_DURATION.observe(time.perf_counter() - started, alias)
+        statement = sql[:32].lstrip()[:6].upper() if isinstance(sql, str) else ""
+        DB_QUERIES.inc(alias, statement if statement in SQL_STATEMENTS else "OTHER")
+
+
+def instrument_connection(connection):
+    """
+    Install the query counter on a database connection; Django keeps the wrapper list per
+    connection wrapper, so it survives reconnects.
+    """
+    if count_queries not in connection.execute_wrappers:
+        connection.execute_wrappers.append(count_queries)
+
+
+def record_chat(agent_id, success: bool, response_time_ms: int):
+    CHAT_REQUESTS.inc(str(agent_id), "ok" if success else "error")
+    CHAT_DURATION.observe(response_time_ms / 1000, str(agent_id))
+
+
+class LLMMetricsHandler(BaseCallbackHandler):
+    """
+    Times every LLM call of an agent run and counts its tokens.
+
+    Runs inline on the event loop, since it only updates in-memory metrics; one instance
+    serves all runs, keyed by LangChain's run id.
+    """
+
+    run_inline = True
+
+    def __init__(self):
+        self._started = {}
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, metadata=None, **kwargs):
+        self._started[run_id] = (time.perf_counter(), (metadata or {}).get("ls_model_name") or "unknown")
+
+    def _finish(self, run_id, status):
+        started = self._started.pop(run_id, None)
+        if started is None:
+            return None
+        LLM_DURATION.observe(time.perf_counter() - started[0], started[1], status)
+        return started[1]
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        model = self._finish(run_id, "ok")
+        usage = token_usage(response)
+        if model is not None and usage:
+            LLM_TOKENS.inc(model, "input", amount=usage.get("input_tokens") or 0)
+            LLM_TOKENS.inc(model, "output", amount=usage.get("output_tokens") or 0)
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self._finish(run_id, "error")
+
+
+llm_metrics_handler = LLMMetricsHandler()
@@ -0,0 +1,71 @@
+from django.urls import reverse
+from drf_yasg import openapi
+from drf_yasg.generators import OpenAPISchemaGenerator
+
+CHAT_REQUEST = openapi.Schema(
+    type=openapi.TYPE_OBJECT,
+    required=["message", "agent_id"],
+    properties={
+        "message": openapi.Schema(type=openapi.TYPE_STRING, description="User message"),
+        "agent_id": openapi.Schema(type=openapi.TYPE_STRING, description="UUID of the agent"),
+        "cache": openapi.Schema(
+            type=openapi.TYPE_BOOLEAN, description="false skips the agent's LLM response cache for this request",
+        ),
+    },
+)
+
+ERROR_RESPONSES = {
+    400: openapi.Response(description="Bad Request"),
+    404: openapi.Response(description="Agent Not Found"),
+}
+
+
+def chat_operations():
+    """
+    Swagger operations of the native async chat views. They are plain Django views, which
+    drf_yasg cannot inspect, so their schema is declared here.
+    """
+    body = openapi.Parameter("data", openapi.IN_BODY, required=True, schema=CHAT_REQUEST)
+    chat = openapi.Operation(
+        operation_id="chat_create",
+        description="Send a message to a specific agent and get response.",
+        parameters=[body],
+        tags=["chat"],
+        responses=openapi.Responses({
+            200: openapi.Response(
+                description="Successful response",
+                examples={"application/json": {"response": "Agent's reply", "request_id": "UUID of the request trace"}},
+            ),
+            **ERROR_RESPONSES,
+            500: openapi.Response(description="Internal Server Error"),
+        }),
+    )
+    stream = openapi.Operation(
+        operation_id="chat_stream_create",
+        description=(
+            "Send a message to a specific agent and stream the reply as Server-Sent Events: `token`, "
+            "`tool_start`, `tool_end`, then `final` (with `response` and `request_id`) or `error`."
+        ),
+        parameters=[body],
+        tags=["chat"],
+        produces=["text/event-stream"],
+        responses=openapi.Responses({
+            200: openapi.Response(description="Event stream"),
+            **ERROR_RESPONSES,
+        }),
+    )
+    return {reverse("chat"): openapi.PathItem(post=chat), reverse("chat-stream"): openapi.PathItem(post=stream)}
+
+
+class SchemaGenerator(OpenAPISchemaGenerator):
+    """
+    Default generator plus the operations of views outside DRF (see `chat_operations`).
+    """
+
+    def get_paths(self, endpoints, components, request, public):
+        paths, prefix = super().get_paths(endpoints, components, request, public)
+        extra = {}
+        for path, item in chat_operations().items():
+            suffix = path[len(prefix):] if prefix and path.startswith(prefix) else path
+            extra[suffix if suffix.startswith("/") else "/" + suffix] = item
+        return openapi.Paths(paths={**paths, **extra}), prefix
@@ -3,8 +3,10 @@ import logging
 from venv import logger
 from rest_framework import serializers
 
-from .utils import get_tools
-from .models import AgentActivityLog, AgentConfig, AgentMetric, LLMConfig, Tool
+from .mcp.executor_cache import get_executor_cache
+from .mcp.registry import discover_tool_specs, invalidate_agent_tools, mcp_config_hash, replace_tool_specs
+from .mcp.tool_selector import drop_tool_index
+from .models import AgentActivityLog, AgentConfig, AgentMetric, ChatTrace, LLMConfig, Tool
 
 logger  = logging.getLogger(__name__)
 class LLMConfigSerializer(serializers.ModelSerializer):
@@ -24,7 +26,7 @@ class AgentConfigCoreSerializer(serializers.ModelSerializer):
     id = serializers.UUIDField(read_only=True)
     class Meta:
         model = AgentConfig
-        fields = ('id', 'agent_name', 'description', 'tags', 'llm', 'prompt')
+        fields = ('id', 'agent_name', 'description', 'tags', 'llm', 'prompt', 'tool_top_k', 'memory_top_k')
 
 class AgentConfigWrapperSerializer(serializers.Serializer):
     agentConfig = AgentConfigCoreSerializer()
@@ -46,10 +48,8 @@ class AgentConfigWrapperSerializer(serializers.Serializer):
             **agent_data
         )
 
-        tools = asyncio.run(get_tools(mcp_servers))
-
-        for tool in tools:
-            Tool.objects.create(agent=agent, name=tool.name, description=tool.description)
+        specs = asyncio.run(discover_tool_specs(mcp_servers))
+        replace_tool_specs(agent, specs)
 
         return agent
 
@@ -72,20 +72,20 @@ class AgentConfigWrapperSerializer(serializers.Serializer):
         if "system_message" in prompt_data:
             instance.system_message = prompt_data["system_message"]
 
-        # Detect if mcp_server keys have changed
-        old_keys = set(instance.mcp_server.keys() if instance.mcp_server else [])
-        new_keys = set(new_mcp_servers.keys() if new_mcp_servers else [])
-        mcp_keys_changed = old_keys != new_keys
+        # Detect if mcp_server config has changed; stored tool schemas are tied to its content
+        old_mcp_servers = instance.mcp_server
+        mcp_changed = mcp_config_hash(old_mcp_servers) != mcp_config_hash(new_mcp_servers)
 
         instance.mcp_server = new_mcp_servers
         instance.save()
+        get_executor_cache().invalidate(instance.id)
 
-        # Regenerate tools only if keys changed
-        if mcp_keys_changed:
-            Tool.objects.filter(agent=instance).delete()
-            tools = asyncio.run(get_tools(new_mcp_servers))
-            for tool in tools:
-                Tool.objects.create(agent=instance, name=tool.name, description=tool.description)
+        # Regenerate tools only if the config changed
+        if mcp_changed:
+            invalidate_agent_tools(old_mcp_servers)
+            specs = asyncio.run(discover_tool_specs(new_mcp_servers))
+            replace_tool_specs(instance, specs)
+            drop_tool_index(instance.id)
 
         return instance
 
@@ -102,6 +102,9 @@ class AgentActivityLogSerializer(serializers.ModelSerializer):
         fields = ['id', 'agent', 'action', 'timestamp', 'description', 'metadata']
 
     def get_agent(self, obj):
+        # Querysets annotated with `agent_name` avoid one agent lookup per log
+        if hasattr(obj, "agent_name"):
+            return obj.agent_name
         return obj.agent.agent_name if obj.agent else None
 
 class AgentMetricSerializer(serializers.ModelSerializer):
@@ -116,4 +119,9 @@ class AgentMetricSerializer(serializers.ModelSerializer):
         ]
 
     def get_average_response_time(self, obj):
-        return obj.average_response_time()
\ No newline at end of file
+        return obj.average_response_time()
+
+class ChatTraceSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ChatTrace
+        fields = ['id', 'agent', 'message_id', 'transport', 'status', 'created_at', 'duration_ms', 'spans']
@@ -0,0 +1,33 @@
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_save, pre_delete
+from django.dispatch import receiver
+
+from .metrics import COUNTER_FIELDS, update_rollups
+from .models import AgentConfig, AgentMetric
+from .prometheus import instrument_connection
+
+
+@receiver(connection_created)
+def count_connection_queries(sender, connection, **kwargs):
+    instrument_connection(connection)
+
+
+@receiver(post_save, sender=AgentConfig)
+def count_created_agent(sender, instance, created, **kwargs):
+    if created:
+        update_rollups({}, agents=1)
+
+
+@receiver(pre_delete, sender=AgentConfig)
+def remove_agent_from_rollups(sender, instance, **kwargs):
+    # The agent's AgentMetric rows are about to be cascade-deleted; keep the rollups equal to their sum.
+    # Runs inside the delete's transaction. Locking the agent makes flushes that would insert new
+    # rows for it wait (and then drop them), and locking its rows makes flushes that already
+    # updated them commit first, so no counts land in the rollups after they were read here.
+    list(AgentConfig.objects.select_for_update().filter(pk=instance.pk).values_list("pk", flat=True))
+    rows = AgentMetric.objects.select_for_update().filter(agent=instance).order_by("date")
+    daily = {
+        row["date"]: tuple(-row[field] for field in COUNTER_FIELDS)
+        for row in rows.values("date", *COUNTER_FIELDS)
+    }
+    update_rollups(daily, agents=-1)
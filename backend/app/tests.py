@@ -1,3 +1,890 @@
-from django.test import TestCase
+import asyncio
+import importlib
+import os
+import tempfile
+from datetime import timedelta
+from types import SimpleNamespace
+from unittest import mock
 
-# Create your tests here.
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from .mcp.history import fold_history, overflow_count
+from .mcp.llm_cache import AgentLLMCache, LLMResponseStore, bypass_llm_cache, get_llm_cache, response_cache_key
+from .mcp.pool import MCPSessionPool, PooledSession, connector_config, server_config_key
+from .mcp.registry import get_agent_tools, get_tool_registry, mcp_config_hash
+from .mcp.replay import ReplayChatModel, ReplayMismatch, ToolReplayer
+from .mcp.result_cache import ToolResultCache, result_cache_key, result_cache_ttl
+from .metrics import (
+    COUNTER_FIELDS, MetricsAggregator, bucket_upper_bound, latency_bucket, percentiles_from_buckets, upsert_increments,
+)
+from .models import (
+    AgentConfig, AgentMetric, ChatHistory, ChatSummary, DailyMetricRollup, LLMConfig, MetricTotals, Tool,
+)
+from .websocket import AgentChatSession
+
+
+class ServerConfigKeyTests(SimpleTestCase):
+    def test_key_ignores_key_order(self):
+        a = {"command": "npx", "args": ["-y", "server"], "env": {"A": "1", "B": "2"}}
+        b = {"env": {"B": "2", "A": "1"}, "args": ["-y", "server"], "command": "npx"}
+        self.assertEqual(server_config_key(a), server_config_key(b))
+
+    def test_connectforge_options_do_not_change_the_process(self):
+        config = {"command": "npx", "args": ["server"]}
+        with_options = {**config, "toolTimeout": 20, "toolTimeouts": {"search": 45}, "resultCache": True}
+        self.assertEqual(connector_config(with_options), config)
+        self.assertEqual(server_config_key(config), server_config_key(with_options))
+
+    def test_different_processes_get_different_keys(self):
+        config = {"command": "npx", "args": ["server"], "env": {"TOKEN": "a"}}
+        self.assertNotEqual(server_config_key(config), server_config_key({**config, "env": {"TOKEN": "b"}}))
+        self.assertNotEqual(server_config_key(config), server_config_key({**config, "args": ["other"]}))
+
+
+class FakeMCPConnection:
+    """
+    Client, session and connector of one fake MCP server. Tool calls wait for `release`.
+    """
+
+    def __init__(self):
+        self.is_connected = True
+        self.answers_pings = True
+        self.pings = 0
+        self.closed = False
+        self.release = asyncio.Event()
+        self.connector = SimpleNamespace(client=self, call_tool=self.call_tool)
+
+    async def send_ping(self):
+        self.pings += 1
+        if not self.answers_pings:
+            raise TimeoutError("no pong")
+
+    async def call_tool(self, name, arguments):
+        await self.release.wait()
+        return name
+
+    async def close_all_sessions(self):
+        self.closed = True
+
+
+class SessionPoolHealthTests(SimpleTestCase):
+    config = {"command": "server"}
+
+    def setUp(self):
+        self.pool = MCPSessionPool(health_check_interval=0)
+        self.connections = []
+
+        async def spawn(key, server_config):
+            connection = FakeMCPConnection()
+            self.connections.append(connection)
+            return PooledSession(key, connection, connection)
+
+        self.pool._spawn = spawn
+
+    def test_failed_ping_replaces_an_idle_session(self):
+        async def run():
+            await self.pool._retain(self.config)
+            self.connections[0].answers_pings = False
+            return await self.pool._acquire(self.config)
+
+        entry = asyncio.run(run())
+        self.assertTrue(self.connections[0].closed)
+        self.assertIs(entry.session, self.connections[1])
+        self.assertEqual(entry.retained, 1)
+
+    def test_busy_sessions_are_not_pinged(self):
+        async def run():
+            call = asyncio.create_task(self.pool._call_tool(self.config, "slow", {}))
+            await asyncio.sleep(0)
+            self.connections[0].answers_pings = False
+            entry = await self.pool._acquire(self.config)
+            self.connections[0].release.set()
+            await call
+            return entry
+
+        entry = asyncio.run(run())
+        self.assertIs(entry.session, self.connections[0])
+        self.assertEqual(self.connections[0].pings, 0)
+        self.assertFalse(self.connections[0].closed)
+
+    def test_disconnected_session_closes_after_its_running_calls(self):
+        async def run():
+            call = asyncio.create_task(self.pool._call_tool(self.config, "slow", {}))
+            await asyncio.sleep(0)
+            self.connections[0].is_connected = False
+            entry = await self.pool._acquire(self.config)
+            self.assertFalse(self.connections[0].closed)
+
+            self.connections[0].release.set()
+            self.assertEqual(await call, "slow")
+            return entry
+
+        entry = asyncio.run(run())
+        self.assertIs(entry.session, self.connections[1])
+        self.assertTrue(self.connections[0].closed)
+        self.assertFalse(self.connections[1].closed)
+
+
+@override_settings(TOOL_RESULT_CACHE_TTL=300, TOOL_RESULT_CACHE_DEFAULT=False)
+class ResultCacheTtlTests(SimpleTestCase):
+    def test_servers_without_the_option_follow_the_default(self):
+        self.assertIsNone(result_cache_ttl({}, "search"))
+        with self.settings(TOOL_RESULT_CACHE_DEFAULT=True):
+            self.assertEqual(result_cache_ttl({}, "search"), 300)
+
+    def test_boolean_and_ttl_options(self):
+        self.assertEqual(result_cache_ttl({"resultCache": True}, "search"), 300)
+        self.assertIsNone(result_cache_ttl({"resultCache": False}, "search"))
+        self.assertEqual(result_cache_ttl({"resultCache": {"ttl": 60}}, "search"), 60)
+        self.assertEqual(result_cache_ttl({"resultCache": {}}, "search"), 300)
+
+    def test_per_tool_overrides(self):
+        option = {"resultCache": {"ttl": 60, "tools": {"write_file": False, "search": 10, "list": True}}}
+        self.assertIsNone(result_cache_ttl(option, "write_file"))
+        self.assertEqual(result_cache_ttl(option, "search"), 10)
+        self.assertEqual(result_cache_ttl(option, "list"), 300)
+        self.assertEqual(result_cache_ttl(option, "read_file"), 60)
+
+    def test_non_positive_ttl_disables_caching(self):
+        self.assertIsNone(result_cache_ttl({"resultCache": {"ttl": 0}}, "search"))
+        self.assertIsNone(result_cache_ttl({"resultCache": {"ttl": -5}}, "search"))
+
+
+class ToolResultCacheTests(SimpleTestCase):
+    def test_key_ignores_argument_order(self):
+        self.assertEqual(
+            result_cache_key("server", "search", {"q": "x", "limit": 5}),
+            result_cache_key("server", "search", {"limit": 5, "q": "x"}),
+        )
+        self.assertNotEqual(
+            result_cache_key("server", "search", {"q": "x"}), result_cache_key("other", "search", {"q": "x"}),
+        )
+
+    def test_least_recently_used_entry_is_evicted(self):
+        cache = ToolResultCache(max_entries=2)
+        cache.put("a", 1, ttl=60)
+        cache.put("b", 2, ttl=60)
+        self.assertEqual(cache.get("a"), 1)
+        cache.put("c", 3, ttl=60)
+
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("a"), 1)
+        self.assertEqual(cache.get("c"), 3)
+        self.assertEqual(cache.stats()["evictions"], 1)
+
+    def test_expired_entries_miss(self):
+        cache = ToolResultCache()
+        with mock.patch("app.mcp.result_cache.time.monotonic", return_value=1000.0):
+            cache.put("a", 1, ttl=30)
+        with mock.patch("app.mcp.result_cache.time.monotonic", return_value=1029.0):
+            self.assertEqual(cache.get("a"), 1)
+        with mock.patch("app.mcp.result_cache.time.monotonic", return_value=1031.0):
+            self.assertIsNone(cache.get("a"))
+
+        self.assertEqual(cache.stats(), {"entries": 0, "hits": 1, "misses": 1, "evictions": 1, "hit_rate": 0.5})
+
+
+def import_github_server():
+    """
+    The GitHub MCP server needs a token at import time; it never reaches the network here.
+    """
+    env = {"GITHUB_PERSONAL_ACCESS_TOKEN": "test-token", "GITHUB_CACHE_DIR": tempfile.mkdtemp()}
+    with mock.patch.dict(os.environ, env):
+        return importlib.import_module("app.mcp.servers.github")
+
+
+class FakeGitHub:
+    """
+    Serves `pages` ({url: (items, Link header)}) in place of `github_fetch`, recording requests.
+    """
+
+    def __init__(self, pages):
+        self.pages = pages
+        self.requests = []
+
+    async def __call__(self, url, params=None):
+        self.requests.append((url, params))
+        items, link = self.pages[url]
+        return items, link, None
+
+
+class GitHubPagingTests(SimpleTestCase):
+    base = "https://api.github.com/repos/o/r/commits"
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.github = import_github_server()
+
+    def collect(self, items):
+        async def run():
+            return [item async for item in items]
+        return asyncio.run(run())
+
+    def test_next_page_url(self):
+        link = (
+            '<https://api.github.com/x?page=3>; rel="last", '
+            '<https://api.github.com/x?page=2>; rel="next"'
+        )
+        self.assertEqual(self.github.next_page_url(link), "https://api.github.com/x?page=2")
+        self.assertIsNone(self.github.next_page_url('<https://api.github.com/x?page=1>; rel="prev"'))
+        self.assertIsNone(self.github.next_page_url(None))
+
+    def test_page_size_follows_the_limit(self):
+        fake = FakeGitHub({self.base: ([{"n": i} for i in range(3)], "")})
+        with mock.patch.object(self.github, "github_fetch", fake):
+            items = self.collect(self.github.iter_github_items(self.base, {"since": "2025-01-01"}, limit=3))
+
+        self.assertEqual(len(items), 3)
+        self.assertEqual(fake.requests, [(self.base, {"since": "2025-01-01", "per_page": 3})])
+
+        fake = FakeGitHub({self.base: ([], "")})
+        with mock.patch.object(self.github, "github_fetch", fake):
+            self.collect(self.github.iter_github_items(self.base, {}, limit=500))
+        self.assertEqual(fake.requests[0][1]["per_page"], 100)
+
+    def test_follows_next_links_until_the_limit(self):
+        page2 = self.base + "?per_page=2&page=2"
+        page3 = self.base + "?per_page=2&page=3"
+        fake = FakeGitHub({
+            self.base: ([{"n": 0}, {"n": 1}], f'<{page2}>; rel="next"'),
+            page2: ([{"n": 2}, {"n": 3}], f'<{page3}>; rel="next"'),
+            page3: ([{"n": 4}, {"n": 5}], ""),
+        })
+        with mock.patch.object(self.github, "github_fetch", fake):
+            items = self.collect(self.github.iter_github_items(self.base, {}, limit=3, page_size=2))
+
+        self.assertEqual([item["n"] for item in items], [0, 1, 2])
+        # The next link carries the query, and the third page is never requested
+        self.assertEqual(fake.requests, [(self.base, {"per_page": 2}), (page2, None)])
+
+    def test_pull_request_filters_stop_at_since(self):
+        pulls = self.base.replace("commits", "pulls")
+        page2 = pulls + "?page=2"
+        fake = FakeGitHub({
+            pulls: (
+                [
+                    {"number": 3, "created_at": "2025-03-01T00:00:00Z", "user": {"login": "ann"}},
+                    {"number": 2, "created_at": "2025-02-01T00:00:00Z", "user": {"login": "bob"}},
+                    {"number": 1, "created_at": "2024-12-01T00:00:00Z", "user": {"login": "ann"}},
+                ],
+                f'<{page2}>; rel="next"',
+            ),
+        })
+        with mock.patch.object(self.github, "github_fetch", fake):
+            summary = asyncio.run(
+                self.github.pull_request_summary("o", "r", 5, since="2025-01-01T00:00:00Z", author="ANN")
+            )
+
+        self.assertIn("PR #3", summary)
+        self.assertNotIn("PR #2", summary)
+        self.assertNotIn("PR #1", summary)
+        self.assertEqual(len(fake.requests), 1)
+
+
+def create_agent(name="agent", **llm):
+    return AgentConfig.objects.create(agent_name=name, llm=LLMConfig.objects.create(model="test-model", **llm))
+
+
+# 36 characters estimate to 10 tokens, plus the per-message overhead
+MESSAGE = "x" * 36
+MESSAGE_TOKENS = 14
+
+
+@mock.patch("app.mcp.history.get_encoding", return_value=None)
+class OverflowCountTests(SimpleTestCase):
+    turns = [("human", MESSAGE), ("ai", MESSAGE)] * 3
+
+    def test_everything_fits(self, _):
+        self.assertEqual(overflow_count(self.turns, 6 * MESSAGE_TOKENS), 0)
+
+    def test_keeps_whole_turns_from_the_newest(self, _):
+        # Room for two and a half turns keeps the two newest
+        self.assertEqual(overflow_count(self.turns, 5 * MESSAGE_TOKENS), 2)
+
+    def test_turn_larger_than_the_budget_is_dropped(self, _):
+        self.assertEqual(overflow_count(self.turns, 2 * MESSAGE_TOKENS - 1), 6)
+
+    def test_tool_replies_stay_with_their_question(self, _):
+        messages = [("human", MESSAGE), ("ai", MESSAGE), ("ai", MESSAGE), ("human", MESSAGE), ("ai", MESSAGE)]
+        self.assertEqual(overflow_count(messages, 4 * MESSAGE_TOKENS), 3)
+
+
+class FakeSummaryLLM:
+    def __init__(self, reply):
+        self.reply = reply
+        self.prompts = []
+
+    async def ainvoke(self, messages):
+        self.prompts.append(messages)
+        return SimpleNamespace(content=self.reply)
+
+
+@mock.patch("app.mcp.history.get_encoding", return_value=None)
+class FoldHistoryTests(TransactionTestCase):
+    # History is read on worker threads, outside a test transaction
+
+    def setUp(self):
+        self.agent = create_agent()
+        start = timezone.now() - timedelta(hours=1)
+        for i in range(6):
+            role = "human" if i % 2 == 0 else "ai"
+            text = f"message {i}".ljust(len(MESSAGE), "x")
+            message = ChatHistory.objects.create(agent=self.agent, role=role, role_order=i % 2, message=text)
+            ChatHistory.objects.filter(pk=message.pk).update(timestamp=start + timedelta(minutes=i))
+        self.oldest_turn = list(ChatHistory.objects.order_by("timestamp")[:2])
+
+    def test_folds_only_the_overflow_once(self, _):
+        llm = FakeSummaryLLM("Summary")
+        config = {"history_token_budget": 5 * MESSAGE_TOKENS}
+
+        self.assertEqual(asyncio.run(fold_history(self.agent, config, lambda _: llm)), "Summary")
+        summary = ChatSummary.objects.get(agent=self.agent)
+        self.assertEqual(summary.summary, "Summary")
+        self.assertEqual(summary.covered_until, self.oldest_turn[1].timestamp)
+        self.assertEqual(llm.prompts[0][1].content.count("HUMAN:"), 1)
+
+        # The remaining messages fit next to the summary, so nothing is folded again
+        self.assertEqual(asyncio.run(fold_history(self.agent, config, lambda _: llm)), "Summary")
+        self.assertEqual(len(llm.prompts), 1)
+
+    @override_settings(HISTORY_MAX_MESSAGES=2)
+    def test_backlog_beyond_the_loaded_window_is_folded_oldest_first(self, _):
+        llm = FakeSummaryLLM("Summary")
+        config = {"history_token_budget": 5 * MESSAGE_TOKENS}
+
+        self.assertEqual(asyncio.run(fold_history(self.agent, config, lambda _: llm)), "Summary")
+        folded = [prompt[1].content for prompt in llm.prompts]
+        self.assertEqual(len(folded), 2)
+        self.assertIn("message 0", folded[0])
+        self.assertIn("message 1", folded[0])
+        self.assertNotIn("message 2", folded[0])
+        self.assertIn("message 3", folded[1])
+        self.assertNotIn("message 4", folded[1])
+
+        covered_until = ChatSummary.objects.get(agent=self.agent).covered_until
+        self.assertEqual(covered_until, ChatHistory.objects.order_by("timestamp")[3].timestamp)
+
+    def test_nothing_to_fold(self, _):
+        llm = FakeSummaryLLM("Summary")
+        self.assertEqual(asyncio.run(fold_history(self.agent, {"history_token_budget": 1000}, lambda _: llm)), "")
+        self.assertFalse(ChatSummary.objects.exists())
+        self.assertEqual(llm.prompts, [])
+
+
+class ChatHistoryCursorTests(TestCase):
+    def setUp(self):
+        self.agent = create_agent()
+        start = timezone.now() - timedelta(hours=1)
+        # Both messages of a turn get the same timestamp on purpose, so the role_order tiebreak is exercised
+        for turn in range(5):
+            for role_order, role in enumerate(("human", "ai")):
+                message = ChatHistory.objects.create(
+                    agent=self.agent, role=role, role_order=role_order, message=f"{role} {turn}",
+                )
+                ChatHistory.objects.filter(pk=message.pk).update(timestamp=start + timedelta(minutes=turn))
+
+    def fetch(self, url, **params):
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_pages_are_newest_first_without_gaps_or_duplicates(self):
+        page = self.fetch(reverse("chat-history-cursor"), agent_id=str(self.agent.id), page_size=3)
+        self.assertIsNone(page["previous"])
+        messages = [entry["message"] for entry in page["results"]]
+        while page["next"]:
+            page = self.fetch(page["next"])
+            messages += [entry["message"] for entry in page["results"]]
+
+        expected = [f"{role} {turn}" for turn in reversed(range(5)) for role in ("ai", "human")]
+        self.assertEqual(messages, expected)
+
+    def test_requires_a_known_agent(self):
+        self.assertEqual(self.client.get(reverse("chat-history-cursor")).status_code, 400)
+        missing = self.client.get(reverse("chat-history-cursor"), {"agent_id": "00000000-0000-0000-0000-000000000000"})
+        self.assertEqual(missing.status_code, 404)
+
+
+class MetricsAggregatorTests(TransactionTestCase):
+    # Flushing recycles the database connection, which must not sit in a test transaction
+
+    def setUp(self):
+        self.agent = create_agent()
+        self.aggregator = MetricsAggregator(flush_interval=3600)
+        self.addCleanup(self.aggregator.close)
+
+    def test_flushes_coalesce_into_one_row_per_agent_and_day(self):
+        self.aggregator.record(self.agent.id, True, 100)
+        self.aggregator.record(self.agent.id, False, 300)
+        self.aggregator.flush()
+        self.aggregator.record(self.agent.id, True, 50)
+        self.aggregator.flush()
+
+        metric = AgentMetric.objects.get(agent=self.agent)
+        self.assertEqual(
+            (metric.total_requests, metric.total_success, metric.total_failures, metric.total_response_time_ms),
+            (3, 2, 1, 450),
+        )
+        self.assertEqual(self.aggregator.stats(), {"pending": 0, "flushes": 2, "failed_flushes": 0})
+
+    def test_chats_of_deleted_agents_are_dropped(self):
+        deleted = create_agent("deleted")
+        self.aggregator.record(self.agent.id, True, 100)
+        self.aggregator.record(deleted.id, True, 100)
+        deleted.delete()
+        self.aggregator.flush()
+
+        self.assertEqual(AgentMetric.objects.get().agent_id, self.agent.id)
+        self.assertEqual(self.aggregator.stats()["pending"], 0)
+
+
+class MigrationTestCase(TransactionTestCase):
+    """
+    Migrates back to `migrate_from`, lets `before_migration` create rows with the historical
+    models, then applies `migrate_to`.
+    """
+
+    migrate_from = None
+    migrate_to = None
+
+    def setUp(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate([("app", self.migrate_from)])
+        self.before_migration(executor.loader.project_state([("app", self.migrate_from)]).apps)
+
+        executor = MigrationExecutor(connection)
+        executor.migrate([("app", self.migrate_to)])
+        self.apps = executor.loader.project_state([("app", self.migrate_to)]).apps
+
+    def tearDown(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate(executor.loader.graph.leaf_nodes())
+        super().tearDown()
+
+    def before_migration(self, apps):
+        pass
+
+    @staticmethod
+    def create_metric(apps, agent, date, requests, success, response_time_ms):
+        AgentMetric = apps.get_model("app", "AgentMetric")
+        metric = AgentMetric.objects.create(
+            agent=agent, total_requests=requests, total_success=success,
+            total_failures=requests - success, total_response_time_ms=response_time_ms,
+        )
+        # `date` is auto_now_add
+        AgentMetric.objects.filter(pk=metric.pk).update(date=date)
+        return metric
+
+    @staticmethod
+    def create_historical_agent(apps, name):
+        LLMConfig = apps.get_model("app", "LLMConfig")
+        return apps.get_model("app", "AgentConfig").objects.create(
+            agent_name=name, llm=LLMConfig.objects.create(model="test-model"),
+        )
+
+
+class MergeDuplicateMetricsMigrationTests(MigrationTestCase):
+    migrate_from = "0016_alter_agentactivitylog_timestamp"
+    migrate_to = "0017_agentmetric_agentmetric_agent_date_uniq"
+
+    def before_migration(self, apps):
+        self.day = timezone.now().date()
+        agent = self.create_historical_agent(apps, "duplicated")
+        other = self.create_historical_agent(apps, "single")
+        self.kept = self.create_metric(apps, agent, self.day, 2, 1, 200)
+        self.create_metric(apps, agent, self.day, 3, 3, 300)
+        self.create_metric(apps, agent, self.day - timedelta(days=1), 7, 7, 700)
+        self.create_metric(apps, other, self.day, 1, 0, 50)
+        self.agent_id, self.other_id = agent.id, other.id
+
+    def test_duplicates_are_merged_into_the_oldest_row(self):
+        AgentMetric = self.apps.get_model("app", "AgentMetric")
+        merged = AgentMetric.objects.get(agent_id=self.agent_id, date=self.day)
+        self.assertEqual(merged.id, self.kept.id)
+        self.assertEqual(
+            (merged.total_requests, merged.total_success, merged.total_failures, merged.total_response_time_ms),
+            (5, 4, 1, 500),
+        )
+        self.assertEqual(AgentMetric.objects.filter(agent_id=self.agent_id).count(), 2)
+        self.assertEqual(AgentMetric.objects.get(agent_id=self.other_id).total_requests, 1)
+
+
+class LatencyHistogramTests(SimpleTestCase):
+    def test_bucket_bounds_contain_the_latency(self):
+        self.assertEqual(latency_bucket(0.4), 0)
+        for ms in (1, 2, 17, 250, 999, 1000, 60_000):
+            bucket = latency_bucket(ms)
+            self.assertLessEqual(bucket_upper_bound(bucket - 1), ms)
+            self.assertLess(ms, bucket_upper_bound(bucket))
+            # 8 buckets per doubling keep the error under 10%
+            self.assertLess(bucket_upper_bound(bucket) / ms, 1.1)
+
+    def test_huge_latencies_share_the_last_bucket(self):
+        self.assertEqual(latency_bucket(10 ** 12), 255)
+
+    def test_percentiles_report_bucket_upper_bounds(self):
+        counts = {latency_bucket(1): 50, latency_bucket(2): 45, latency_bucket(1000): 5}
+        self.assertEqual(
+            percentiles_from_buckets(counts, (50, 95, 99, 99.9)),
+            {"p50": 1.1, "p95": 2.2, "p99": 1024.0, "p99.9": 1024.0},
+        )
+
+    def test_no_samples(self):
+        self.assertEqual(percentiles_from_buckets({}, (50, 95)), {"p50": None, "p95": None})
+
+
+def rollup_counters(row):
+    return (row.total_requests, row.total_success, row.total_failures, row.total_response_time_ms)
+
+
+class UpsertIncrementsTests(TestCase):
+    def test_inserts_then_increments(self):
+        today = timezone.now().date()
+        yesterday = today - timedelta(days=1)
+        fields = ("total_requests", "total_success", "total_failures", "total_response_time_ms")
+        upsert_increments(DailyMetricRollup, ("date",), fields, [(today, 2, 1, 1, 300)])
+        upsert_increments(DailyMetricRollup, ("date",), fields, [(today, 1, 1, 0, 50), (yesterday, 4, 4, 0, 80)])
+
+        self.assertEqual(rollup_counters(DailyMetricRollup.objects.get(date=today)), (3, 2, 1, 350))
+        self.assertEqual(rollup_counters(DailyMetricRollup.objects.get(date=yesterday)), (4, 4, 0, 80))
+
+    def test_rows_are_written_in_key_order(self):
+        today = timezone.now().date()
+        days = [today, today - timedelta(days=2), today - timedelta(days=1)]
+        with CaptureQueriesContext(connection) as queries:
+            upsert_increments(DailyMetricRollup, ("date",), COUNTER_FIELDS, [(day, 1, 1, 0, 10) for day in days])
+
+        sql = queries.captured_queries[0]["sql"]
+        positions = [sql.index(day.isoformat()) for day in sorted(days)]
+        self.assertEqual(positions, sorted(positions))
+
+    def test_nothing_to_write(self):
+        upsert_increments(DailyMetricRollup, ("date",), ("total_requests",), [])
+        self.assertFalse(DailyMetricRollup.objects.exists())
+
+
+class MetricRollupTests(TransactionTestCase):
+    # Flushes run outside a test transaction, see MetricsAggregatorTests
+
+    def test_rollups_follow_flushes_and_agent_deletion(self):
+        kept, deleted = create_agent("kept"), create_agent("deleted")
+        aggregator = MetricsAggregator(flush_interval=3600)
+        self.addCleanup(aggregator.close)
+        aggregator.record(kept.id, True, 100)
+        aggregator.record(deleted.id, False, 40)
+        aggregator.record(deleted.id, True, 60)
+        aggregator.flush()
+
+        today = timezone.now().date()
+        self.assertEqual(rollup_counters(DailyMetricRollup.objects.get(date=today)), (3, 2, 1, 200))
+        totals = MetricTotals.objects.get(id=1)
+        self.assertEqual((totals.total_agents, *rollup_counters(totals)), (2, 3, 2, 1, 200))
+
+        deleted.delete()
+        self.assertEqual(rollup_counters(DailyMetricRollup.objects.get(date=today)), (1, 1, 0, 100))
+        totals = MetricTotals.objects.get(id=1)
+        self.assertEqual((totals.total_agents, *rollup_counters(totals)), (1, 1, 1, 0, 100))
+
+
+class AgentDeletionRollupTests(TestCase):
+    def test_metric_rows_are_locked_before_they_are_subtracted(self):
+        agent = create_agent()
+        AgentMetric.objects.create(agent=agent, total_requests=2, total_success=2, total_response_time_ms=80)
+
+        with CaptureQueriesContext(connection) as queries:
+            agent.delete()
+
+        locked = [query["sql"] for query in queries.captured_queries if query["sql"].endswith("FOR UPDATE")]
+        self.assertEqual(len(locked), 2)
+        self.assertIn('FROM "app_agentconfig"', locked[0])
+        self.assertIn('FROM "app_agentmetric"', locked[1])
+
+
+class BuildRollupsMigrationTests(MigrationTestCase):
+    migrate_from = "0018_agentlatencybucket"
+    migrate_to = "0019_metric_rollups"
+
+    def before_migration(self, apps):
+        self.day = timezone.now().date()
+        first = self.create_historical_agent(apps, "first")
+        second = self.create_historical_agent(apps, "second")
+        self.create_historical_agent(apps, "idle")
+        # Rows are created for today before moving to their date, so older days go first
+        self.create_metric(apps, first, self.day - timedelta(days=2), 5, 4, 500)
+        self.create_metric(apps, first, self.day, 2, 2, 200)
+        self.create_metric(apps, second, self.day, 3, 1, 900)
+
+    def test_rollups_are_backfilled_from_agent_metrics(self):
+        DailyMetricRollup = self.apps.get_model("app", "DailyMetricRollup")
+        MetricTotals = self.apps.get_model("app", "MetricTotals")
+
+        self.assertEqual(
+            {row.date: rollup_counters(row) for row in DailyMetricRollup.objects.all()},
+            {self.day: (5, 3, 2, 1100), self.day - timedelta(days=2): (5, 4, 1, 500)},
+        )
+        totals = MetricTotals.objects.get(id=1)
+        self.assertEqual((totals.total_agents, *rollup_counters(totals)), (3, 10, 7, 3, 1600))
+
+
+class EmptyBuildRollupsMigrationTests(MigrationTestCase):
+    migrate_from = "0018_agentlatencybucket"
+    migrate_to = "0019_metric_rollups"
+
+    def test_totals_row_exists_without_metrics(self):
+        totals = self.apps.get_model("app", "MetricTotals").objects.get(id=1)
+        self.assertEqual((totals.total_agents, *rollup_counters(totals)), (0, 0, 0, 0, 0))
+        self.assertFalse(self.apps.get_model("app", "DailyMetricRollup").objects.exists())
+
+
+class ToolReplayerTests(SimpleTestCase):
+    calls = [
+        {"name": "search", "args": {"q": "first"}, "output": "first result"},
+        {"name": "search", "args": {"q": "second"}, "output": "second result"},
+        {"name": "fetch", "args": {"url": "x"}, "error": "timed out"},
+    ]
+
+    def call(self, replayer, name, arguments):
+        result = asyncio.run(replayer.call_tool({}, name, arguments))
+        return result.content[0].text, result.isError
+
+    def test_same_arguments_win_over_recording_order(self):
+        replayer = ToolReplayer(self.calls)
+        self.assertEqual(self.call(replayer, "search", {"q": "second"}), ("second result", False))
+        self.assertEqual(self.call(replayer, "search", {"q": "first"}), ("first result", False))
+        self.assertEqual(replayer.served, 2)
+
+    def test_unknown_arguments_take_the_next_unused_result(self):
+        replayer = ToolReplayer(self.calls)
+        self.assertEqual(self.call(replayer, "search", {"q": "second"}), ("second result", False))
+        self.assertEqual(self.call(replayer, "search", {"q": "reworded"}), ("first result", False))
+        with self.assertRaises(ReplayMismatch):
+            self.call(replayer, "search", {"q": "first"})
+
+    def test_recorded_errors_replay_as_tool_errors(self):
+        self.assertEqual(self.call(ToolReplayer(self.calls), "fetch", {"url": "x"}), ("timed out", True))
+
+    def test_unrecorded_tool(self):
+        with self.assertRaises(ReplayMismatch):
+            self.call(ToolReplayer(self.calls), "delete", {})
+
+
+class ReplayChatModelTests(SimpleTestCase):
+    def test_serves_recorded_responses_in_order(self):
+        llm = ReplayChatModel(calls=[
+            {"content": "", "tool_calls": [{"name": "search", "args": {"q": "x"}}]},
+            {"content": "done"},
+        ])
+        first = llm.invoke("question")
+        self.assertEqual(first.tool_calls[0]["name"], "search")
+        self.assertEqual(first.tool_calls[0]["args"], {"q": "x"})
+        self.assertEqual(llm.invoke("question").content, "done")
+        self.assertEqual(llm.served, 2)
+        with self.assertRaises(ReplayMismatch):
+            llm.invoke("question")
+
+
+class LLMResponseCacheTests(SimpleTestCase):
+    def setUp(self):
+        self.store = LLMResponseStore()
+        self.cache = AgentLLMCache("agent-1", ttl=60, store=self.store)
+
+    def test_key_separates_agents_models_and_prompts(self):
+        key = response_cache_key("agent-1", "prompt", "model")
+        self.assertEqual(key, response_cache_key("agent-1", "prompt", "model"))
+        self.assertNotEqual(key, response_cache_key("agent-2", "prompt", "model"))
+        self.assertNotEqual(key, response_cache_key("agent-1", "other prompt", "model"))
+        self.assertNotEqual(key, response_cache_key("agent-1", "prompt", "other model"))
+        self.assertNotEqual(response_cache_key("a", "c", "b"), response_cache_key("a", "", "bc"))
+
+    def test_only_deterministic_agents_are_cached(self):
+        config = {"agent_id": "agent-1", "response_cache_ttl": 60, "temperature": 0}
+        self.assertIsNotNone(get_llm_cache(config))
+        self.assertIsNone(get_llm_cache({**config, "temperature": 0.7}))
+        self.assertIsNone(get_llm_cache({**config, "response_cache_ttl": None}))
+
+    def test_miss_update_then_hit(self):
+        async def run():
+            self.assertIsNone(await self.cache.alookup("prompt", "model"))
+            await self.cache.aupdate("prompt", "model", ["reply"])
+            return await self.cache.alookup("prompt", "model")
+
+        self.assertEqual(asyncio.run(run()), ["reply"])
+        self.assertEqual(self.store.stats(), {"entries": 1, "hits": 1, "misses": 1, "evictions": 0})
+
+    def test_bypass_skips_lookups_but_refreshes_the_entry(self):
+        async def run():
+            await self.cache.aupdate("prompt", "model", ["old"])
+            with bypass_llm_cache():
+                self.assertIsNone(await self.cache.alookup("prompt", "model"))
+                await self.cache.aupdate("prompt", "model", ["new"])
+            return await self.cache.alookup("prompt", "model")
+
+        self.assertEqual(asyncio.run(run()), ["new"])
+
+    def test_concurrent_misses_are_timed_separately(self):
+        async def call(prompt, seconds):
+            await self.cache.alookup(prompt, "model")
+            await asyncio.sleep(seconds)
+            await self.cache.aupdate(prompt, "model", [prompt])
+
+        async def run():
+            await asyncio.gather(call("slow", 0.3), call("fast", 0.05))
+
+        asyncio.run(run())
+        fast = self.store.get(response_cache_key("agent-1", "fast", "model"))["latency_ms"]
+        slow = self.store.get(response_cache_key("agent-1", "slow", "model"))["latency_ms"]
+        self.assertLess(fast, 250)
+        self.assertGreaterEqual(slow, 300)
+
+    def test_invalidate_drops_one_agents_entries(self):
+        self.store.put("a", "agent-1", ["reply"], 10, ttl=60)
+        self.store.put("b", "agent-2", ["reply"], 10, ttl=60)
+        self.store.invalidate("agent-1")
+        self.assertIsNone(self.store.get("a"))
+        self.assertIsNotNone(self.store.get("b"))
+
+    def test_entries_expire(self):
+        with mock.patch("app.mcp.llm_cache.time.monotonic", return_value=1000.0):
+            self.store.put("a", "agent-1", ["reply"], 10, ttl=30)
+        with mock.patch("app.mcp.llm_cache.time.monotonic", return_value=1030.0):
+            self.assertIsNone(self.store.get("a"))
+
+
+def tool_spec(name, server_config):
+    return {"name": name, "description": f"{name} tool", "input_schema": {}, "server_key": server_config_key(server_config)}
+
+
+class ExtendMCPServersTests(TestCase):
+    existing = {"command": "existing-server"}
+
+    def setUp(self):
+        self.agent = create_agent()
+        self.agent.mcp_server = {"existing": self.existing}
+        self.agent.save()
+        Tool.objects.create(agent=self.agent, **tool_spec("search", self.existing))
+
+    def extend(self, servers):
+        return self.client.post(
+            reverse("extend-mcp-servers", args=[self.agent.id]), {"mcpServers": servers}, content_type="application/json",
+        )
+
+    def test_failed_discovery_keeps_the_previous_servers(self):
+        with mock.patch("app.views.discover_tool_specs", side_effect=RuntimeError("spawn failed")):
+            response = self.extend({"broken": {"command": "missing-binary"}})
+
+        self.assertEqual(response.status_code, 500)
+        self.agent.refresh_from_db()
+        self.assertEqual(self.agent.mcp_server, {"existing": self.existing})
+        self.assertEqual(list(Tool.objects.filter(agent=self.agent).values_list("name", flat=True)), ["search"])
+
+    def test_registers_discovered_tools(self):
+        added = {"command": "new-server"}
+
+        async def discover(servers):
+            return [tool_spec("fetch", added), tool_spec("search", added)]
+
+        with mock.patch("app.views.discover_tool_specs", discover):
+            response = self.extend({"added": added})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["skipped_duplicates"], ["search"])
+        self.agent.refresh_from_db()
+        self.assertEqual(set(self.agent.mcp_server), {"existing", "added"})
+        self.assertEqual(set(Tool.objects.filter(agent=self.agent).values_list("name", flat=True)), {"search", "fetch"})
+
+
+class AgentToolsStalenessTests(TransactionTestCase):
+    # Stored specs are loaded on worker threads, outside a test transaction
+    first = {"command": "first-server"}
+    second = {"command": "second-server"}
+
+    def setUp(self):
+        self.agent = create_agent()
+        self.agent.mcp_server = {"first": self.first, "second": self.second}
+        self.agent.save()
+        Tool.objects.create(agent=self.agent, **tool_spec("search", self.first))
+        self.addCleanup(get_tool_registry().invalidate, mcp_config_hash(self.agent.mcp_server))
+
+    def test_server_without_specs_is_rediscovered(self):
+        async def discover(servers):
+            return [tool_spec("search", self.first), tool_spec("fetch", self.second)]
+
+        with mock.patch("app.mcp.registry.discover_tool_specs", side_effect=discover) as discovered:
+            tools = asyncio.run(get_agent_tools(self.agent))
+
+        discovered.assert_called_once()
+        self.assertEqual(sorted(tool.name for tool in tools), ["fetch", "search"])
+        self.assertEqual(set(Tool.objects.filter(agent=self.agent).values_list("name", flat=True)), {"search", "fetch"})
+
+    def test_complete_specs_skip_discovery(self):
+        Tool.objects.create(agent=self.agent, **tool_spec("fetch", self.second))
+
+        with mock.patch("app.mcp.registry.discover_tool_specs") as discovered:
+            tools = asyncio.run(get_agent_tools(self.agent))
+
+        discovered.assert_not_called()
+        self.assertEqual(sorted(tool.name for tool in tools), ["fetch", "search"])
+
+
+class FakeSessionPool:
+    def __init__(self, failing=()):
+        self.failing = failing
+        self.retained = []
+
+    async def retain(self, server_config):
+        if server_config["command"] in self.failing:
+            raise RuntimeError("spawn failed")
+        self.retained.append(server_config["command"])
+
+    async def release(self, server_config):
+        self.retained.remove(server_config["command"])
+
+
+class WebSocketSessionOpenTests(SimpleTestCase):
+    def setUp(self):
+        self.agent = AgentConfig(
+            agent_name="agent", llm=LLMConfig(model="test-model"),
+            mcp_server={"first": {"command": "first"}, "second": {"command": "second"}},
+        )
+        for target, value in (
+            ("get_agent_executor", mock.AsyncMock()),
+            ("load_chat_history", mock.AsyncMock(return_value=[])),
+            ("log_activity_async", mock.AsyncMock()),
+        ):
+            patcher = mock.patch(f"app.websocket.{target}", value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def open(self, pool):
+        session = AgentChatSession(self.agent, mock.AsyncMock())
+        with mock.patch("app.websocket.get_session_pool", return_value=pool):
+            asyncio.run(session.open())
+        return session
+
+    def test_open_pins_every_server_until_close(self):
+        pool = FakeSessionPool()
+        session = self.open(pool)
+        self.assertEqual(sorted(pool.retained), ["first", "second"])
+
+        with mock.patch("app.websocket.get_session_pool", return_value=pool):
+            asyncio.run(session.close())
+        self.assertEqual(pool.retained, [])
+
+    def test_failed_history_load_releases_the_servers(self):
+        pool = FakeSessionPool()
+        with mock.patch("app.websocket.load_chat_history", side_effect=RuntimeError("database down")):
+            with self.assertRaises(RuntimeError):
+                self.open(pool)
+        self.assertEqual(pool.retained, [])
+
+    def test_failed_retain_releases_the_other_servers(self):
+        pool = FakeSessionPool(failing=("second",))
+        with self.assertRaises(RuntimeError):
+            self.open(pool)
+        self.assertEqual(pool.retained, [])
@@ -0,0 +1,213 @@
+import contextvars
+import functools
+import inspect
+import logging
+import random
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.utils.timezone import now
+from langchain_core.callbacks import AsyncCallbackHandler
+
+from .buffered_writer import create_buffered_writer
+from .models import ChatTrace
+
+logger = logging.getLogger(__name__)
+
+_current_trace = contextvars.ContextVar("current_trace", default=None)
+_current_span = contextvars.ContextVar("current_span", default=-1)
+
+
+class Trace:
+    """
+    Spans of one chat request, kept as compact rows (see `ChatTrace.spans`).
+
+    A span's row is reserved when it opens so children can reference it as their parent,
+    and completed when it closes.
+    """
+
+    def __init__(self, request_id, agent, transport):
+        self.id = request_id
+        self.agent = agent
+        self.transport = transport
+        self.message_id = None
+        self.status = "ok"
+        self.created_at = now()
+        self.started = time.perf_counter()
+        self.spans = []
+        self._lock = threading.Lock()
+
+    def open(self, name, parent, attributes=None) -> int:
+        row = [name, round((time.perf_counter() - self.started) * 1000, 1), None, parent, attributes or None]
+        with self._lock:
+            self.spans.append(row)
+            return len(self.spans) - 1
+
+    def close(self, index, attributes=None):
+        row = self.spans[index]
+        row[2] = round((time.perf_counter() - self.started) * 1000 - row[1], 1)
+        if attributes:
+            row[4] = {**(row[4] or {}), **attributes}
+
+    def to_model(self) -> ChatTrace:
+        return ChatTrace(
+            id=self.id,
+            agent=self.agent,
+            message_id=self.message_id,
+            transport=self.transport,
+            status=self.status,
+            created_at=self.created_at,
+            duration_ms=int((time.perf_counter() - self.started) * 1000),
+            spans=self.spans,
+        )
+
+
+def current_trace():
+    return _current_trace.get()
+
+
+def should_sample() -> bool:
+    rate = getattr(settings, "TRACE_SAMPLE_RATE", 0.1)
+    return rate >= 1 or (rate > 0 and random.random() < rate)
+
+
+@contextmanager
+def start_trace(agent, transport, request_id=None, force=False):
+    """
+    Trace one chat request if it is sampled (`TRACE_SAMPLE_RATE`) or `force` is set.
+
+    The trace is queued for storage when the block exits; it is marked as an error when
+    the block raises or the caller sets `trace.status`.
+    Yields:
+        Trace | None: The active trace, or None when the request is not sampled.
+    """
+    if not (force or should_sample()):
+        yield None
+        return
+
+    trace = Trace(request_id or uuid.uuid4(), agent, transport)
+    token = _current_trace.set(trace)
+    try:
+        yield trace
+    except Exception:
+        trace.status = "error"
+        raise
+    finally:
+        _current_trace.reset(token)
+        get_trace_writer().put(trace.to_model())
+
+
+@contextmanager
+def span(name, **attributes):
+    """
+    Time a stage of the current trace; a no-op when the request is not traced.
+    """
+    trace = _current_trace.get()
+    if trace is None:
+        yield
+        return
+
+    index = trace.open(name, _current_span.get(), attributes)
+    token = _current_span.set(index)
+    try:
+        yield
+    except Exception as e:
+        trace.close(index, {"error": type(e).__name__})
+        raise
+    else:
+        trace.close(index)
+    finally:
+        _current_span.reset(token)
+
+
+def traced(name):
+    """
+    Decorator wrapping every call of a sync or async function in a span.
+    """
+    def decorator(func):
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with span(name):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def token_usage(response):
+    """
+    `usage_metadata` of the first generation of an LLM result, if the provider reported it.
+    """
+    generations = response.generations[0] if response.generations else []
+    return getattr(getattr(generations[0], "message", None), "usage_metadata", None) if generations else None
+
+
+class TracingCallbackHandler(AsyncCallbackHandler):
+    """
+    Records LLM calls and tool calls made by an AgentExecutor as spans.
+    """
+
+    def __init__(self, trace):
+        self.trace = trace
+        self._open = {}
+
+    def _start(self, run_id, name, attributes=None):
+        self._open[run_id] = self.trace.open(name, _current_span.get(), attributes)
+
+    def _end(self, run_id, attributes=None):
+        index = self._open.pop(run_id, None)
+        if index is not None:
+            self.trace.close(index, attributes)
+
+    async def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+        self._start(run_id, "llm", {"messages": sum(len(batch) for batch in messages)})
+
+    async def on_llm_end(self, response, *, run_id, **kwargs):
+        attributes = None
+        usage = token_usage(response)
+        if usage:
+            attributes = {"input_tokens": usage.get("input_tokens"), "output_tokens": usage.get("output_tokens")}
+        self._end(run_id, attributes)
+
+    async def on_llm_error(self, error, *, run_id, **kwargs):
+        self._end(run_id, {"error": type(error).__name__})
+
+    async def on_tool_start(self, serialized, input_str, *, run_id, **kwargs):
+        self._start(run_id, f"tool:{(serialized or {}).get('name', 'unknown')}")
+
+    async def on_tool_end(self, output, *, run_id, **kwargs):
+        self._end(run_id)
+
+    async def on_tool_error(self, error, *, run_id, **kwargs):
+        self._end(run_id, {"error": type(error).__name__})
+
+
+def trace_config():
+    """
+    Runnable config attaching the tracing callbacks when the current request is traced.
+    """
+    trace = _current_trace.get()
+    return {"callbacks": [TracingCallbackHandler(trace)]} if trace is not None else {}
+
+
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def get_trace_writer():
+    global _writer
+    if _writer is None:
+        with _writer_lock:
+            if _writer is None:
+                # Traces are diagnostics: never make a chat wait for them
+                _writer = create_buffered_writer(ChatTrace, policy="drop")
+    return _writer
@@ -1,5 +1,5 @@
 from django.urls import  path
-from .views import AgentConfigViewSet, AgentMetricsView, ChatView, ExtendMCPServersView, RecentActivityLogsView, SampleAgentConfigView, chat_history, delete_chat_history
+from .views import AgentBreakdownMetricsView, AgentConfigViewSet, AgentLatencyView, AgentMetricsView, DailyMetricsView, ChatStreamView, ChatTraceDetailView, ChatTraceListView, ChatView, ExtendMCPServersView, RecentActivityLogsView, SampleAgentConfigView, chat_history, chat_history_cursor, delete_chat_history
 from rest_framework.routers import DefaultRouter
 
 router = DefaultRouter()
@@ -8,11 +8,18 @@ router.register(r'agents', AgentConfigViewSet, basename='agent-config')
 urlpatterns = [
     path('sample-config/', SampleAgentConfigView.as_view(), name='sample-agent-config'),
     path("chat/", ChatView.as_view(), name="chat"),
+    path("chat/stream/", ChatStreamView.as_view(), name="chat-stream"),
     path("chat/history/", chat_history, name="chat-history"),
+    path("chat/history/cursor/", chat_history_cursor, name="chat-history-cursor"),
     path("chat/delete/", delete_chat_history, name="chat-delete"),
     path('agents/<uuid:id>/extend/', ExtendMCPServersView.as_view(), name='extend-mcp-servers'),
     path('dashboard/analytics/', AgentMetricsView.as_view(), name='dashboard-analytics'),
+    path('dashboard/analytics/daily/', DailyMetricsView.as_view(), name='dashboard-analytics-daily'),
+    path('dashboard/analytics/agents/', AgentBreakdownMetricsView.as_view(), name='dashboard-analytics-agents'),
+    path('dashboard/latency/', AgentLatencyView.as_view(), name='dashboard-latency'),
     path('dashboard/logs/', RecentActivityLogsView.as_view(), name='dashboard-logs'),
+    path('traces/', ChatTraceListView.as_view(), name='chat-traces'),
+    path('traces/<uuid:request_id>/', ChatTraceDetailView.as_view(), name='chat-trace'),
 ]
 
 urlpatterns += router.urls
@@ -1,8 +1,11 @@
-from mcp_use.client import MCPClient
-from mcp_use.adapters.langchain_adapter import LangChainAdapter
-from .models import AgentActivityLog, AgentMetric
+import asyncio
+
+from .activity_log import get_activity_writer
+from .mcp.registry import build_tools, discover_tool_specs
+from .metrics import get_metrics_aggregator
+from .models import AgentActivityLog
+from .prometheus import record_chat
 from django.utils.timezone import now
-from asgiref.sync import sync_to_async
 
 async def get_tools(mcp_servers):
     """
@@ -12,41 +15,40 @@ async def get_tools(mcp_servers):
     Returns:
         list: A list of tools created from the MCP servers.
     """
-    client = MCPClient.from_dict({'mcpServers': mcp_servers})
-    adapter = LangChainAdapter()
-    return await adapter.create_tools(client)
+    specs = await discover_tool_specs(mcp_servers)
+    return build_tools(mcp_servers, specs)
 
-def log_activity(agent, action, description="", metadata=None):
-    AgentActivityLog.objects.create(
+def build_activity_log(agent, action, description="", metadata=None):
+    return AgentActivityLog(
         agent=agent,
         action=action,
+        timestamp=now(),
         description=description,
         metadata=metadata or {}
     )
 
-def update_metrics(agent, success: bool, response_time_ms: int):
-    today = now().date()
+def log_activity(agent, action, description="", metadata=None):
+    """
+    Queue an activity log; rows are written in batches by a background thread.
+    """
+    get_activity_writer().put(build_activity_log(agent, action, description, metadata))
 
-    metric, _ = AgentMetric.objects.get_or_create(agent=agent, date=today)
-    metric.total_requests += 1
-    if success:
-        metric.total_success += 1
-    else:
-        metric.total_failures += 1
-    metric.total_response_time_ms += response_time_ms
-    metric.save()
+def update_metrics(agent, success: bool, response_time_ms: int):
+    """
+    Record a chat outcome; it is added to today's `AgentMetric` row on the next periodic flush
+    and to the Prometheus counters right away.
+    """
+    get_metrics_aggregator().record(agent.id, success, response_time_ms)
+    record_chat(agent.id, success, response_time_ms)
 
-@sync_to_async(thread_sensitive=False)
-def log_activity_async(agent, action, description, metadata=None):
-    log_activity(
-        agent=agent,
-        action=action,
-        description=description,
-        metadata=metadata
-    )
+async def log_activity_async(agent, action, description, metadata=None):
+    writer = get_activity_writer()
+    entry = build_activity_log(agent, action, description, metadata)
+    # Only a full queue under the `block` policy has to wait, and never on the event loop
+    if not writer.offer(entry):
+        await asyncio.to_thread(writer.put, entry)
 
-@sync_to_async(thread_sensitive=False)
-def update_metrics_async(agent, success: bool, response_time_ms: int):
+async def update_metrics_async(agent, success: bool, response_time_ms: int):
     update_metrics(
         agent=agent,
         success=success,
@@ -5,24 +5,44 @@ import json
 import time
 import uuid
 from django.conf import settings
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
+from django.utils.decorators import method_decorator
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
 from drf_yasg.utils import swagger_auto_schema
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework import viewsets
-from rest_framework.pagination import PageNumberPagination
+from rest_framework.pagination import CursorPagination, PageNumberPagination
 from rest_framework import generics
-from django.db.models import Sum, Count
-from asgiref.sync import sync_to_async, async_to_sync
-
-from .mcp.client import agent_executor, run_client
-
-from .utils import get_tools, log_activity, log_activity_async, update_metrics, update_metrics_async
-
-from .models import ActivityEvents, AgentActivityLog, AgentConfig, AgentMetric, ChatHistory, Tool
+from django.db.models import Sum, Count, F
+from django.utils.dateparse import parse_date, parse_datetime
+from django.utils.timezone import now
+from datetime import timedelta
+from rest_framework.exceptions import ValidationError
+from asgiref.sync import sync_to_async
+
+from .mcp.client import run_client, stream_client
+
+from .mcp.executor_cache import get_executor_cache
+from .mcp.llm_cache import drop_llm_cache
+from .mcp.memory import drop_message_index
+from .mcp.pool import server_config_key
+from .mcp.registry import discover_tool_specs, invalidate_agent_tools
+from .mcp.tool_selector import drop_tool_index
+
+from .utils import log_activity, log_activity_async, update_metrics, update_metrics_async
+
+from .metrics import COUNTER_FIELDS as METRIC_FIELDS, percentiles_from_buckets
+from .prometheus import CONTENT_TYPE as PROMETHEUS_CONTENT_TYPE, REGISTRY as PROMETHEUS_REGISTRY
+from .models import (
+    ActivityEvents, AgentActivityLog, AgentConfig, AgentLatencyBucket, AgentMetric, ChatHistory, ChatSummary,
+    ChatTrace, DailyMetricRollup, MetricTotals, Tool,
+)
 
-from .serializers import AgentActivityLogSerializer, AgentConfigCoreSerializer, AgentConfigWrapperSerializer, AgentMetricSerializer, ToolSerializer
+from .serializers import AgentActivityLogSerializer, AgentConfigCoreSerializer, AgentConfigWrapperSerializer, AgentMetricSerializer, ChatTraceSerializer, ToolSerializer
 import json
 from drf_yasg import openapi
 from rest_framework.decorators import api_view
@@ -169,8 +189,14 @@ class AgentConfigViewSet(viewsets.ModelViewSet):
         instance = self.get_object()
         agent_id = str(instance.id)
         agent_name = instance.agent_name
+        mcp_servers = instance.mcp_server
         try:
             response = super().destroy(request, *args, **kwargs)
+            invalidate_agent_tools(mcp_servers)
+            get_executor_cache().invalidate(agent_id)
+            drop_tool_index(agent_id)
+            drop_message_index(agent_id)
+            drop_llm_cache(agent_id)
 
             log_activity(
                 agent=None,  # Agent is deleted, can't FK it
@@ -222,116 +248,272 @@ class ExtendMCPServersView(APIView):
 
         agent = get_object_or_404(AgentConfig, id=id)
 
+        # Discover first: a server that cannot start must not be saved without its tools
+        try:
+            new_specs = asyncio.run(discover_tool_specs(new_mcp_servers))
+        except Exception as e:
+            return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
         existing_mcp_servers = agent.mcp_server or {}
         merged_mcp_servers = {**existing_mcp_servers, **new_mcp_servers}
         agent.mcp_server = merged_mcp_servers
         agent.save()
+        invalidate_agent_tools(existing_mcp_servers)
+        get_executor_cache().invalidate(agent.id)
+        drop_tool_index(agent.id)
+
+        # Drop tools of servers that were overridden by the new configs
+        current_server_keys = {server_config_key(config) for config in merged_mcp_servers.values()}
+        Tool.objects.filter(agent=agent).exclude(server_key="").exclude(server_key__in=current_server_keys).delete()
 
         existing_tool_names = set(Tool.objects.filter(agent=agent).values_list('name', flat=True))
 
-        try:
-            new_tools = asyncio.run(get_tools(new_mcp_servers))
+        new_tool_instances = []
+        duplicate_names = []
 
-            new_tool_instances = []
-            duplicate_names = []
+        for spec in new_specs:
+            if spec["name"] in existing_tool_names:
+                duplicate_names.append(spec["name"])
+                continue
 
-            for tool in new_tools:
-                if tool.name in existing_tool_names:
-                    duplicate_names.append(tool.name)
-                    continue
+            tool_instance = Tool.objects.create(agent=agent, **spec)
+            existing_tool_names.add(spec["name"])
+            new_tool_instances.append(tool_instance)
 
-                tool_instance = Tool.objects.create(
-                    agent=agent,
-                    name=tool.name,
-                    description=tool.description
-                )
-                new_tool_instances.append(tool_instance)
+        serialized = ToolSerializer(new_tool_instances, many=True)
+        response = {
+            "message": "MCP servers extended successfully.",
+            "new_tools_registered": serialized.data
+        }
 
-            serialized = ToolSerializer(new_tool_instances, many=True)
-            response = {
-                "message": "MCP servers extended successfully.",
-                "new_tools_registered": serialized.data
-            }
+        if duplicate_names:
+            response["skipped_duplicates"] = duplicate_names
 
-            if duplicate_names:
-                response["skipped_duplicates"] = duplicate_names
+        return Response(response, status=status.HTTP_200_OK)
 
-            return Response(response, status=status.HTTP_200_OK)
+def parse_json_body(request):
+    if not request.body:
+        return {}
+    data = json.loads(request.body)
+    if not isinstance(data, dict):
+        raise ValueError("Request body must be a JSON object.")
+    return data
 
-        except Exception as e:
-            return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+async def record_chat_outcome(agent, duration_ms, error=None, tool_calls=None):
+    if error:
+        logger.error(f"[{agent.agent_name}] Agent execution error: {error}")
+        await asyncio.gather(
+            log_activity_async(
+                agent=agent,
+                action=ActivityEvents.ERROR_OCCURRED,
+                description=f"Error during agent execution: {error}",
+                metadata={"response": error, "duration_ms": duration_ms}
+            ),
+            update_metrics_async(agent, success=False, response_time_ms=duration_ms),
+        )
+        return
 
-class ChatView(APIView):
-    @swagger_auto_schema(
-        operation_description="Send a message to a specific agent and get response.",
-        request_body=openapi.Schema(
-            type=openapi.TYPE_OBJECT,
-            required=["message", "agent_id"],
-            properties={
-                "message": openapi.Schema(type=openapi.TYPE_STRING, description="User message"),
-                "agent_id": openapi.Schema(type=openapi.TYPE_STRING, description="UUID of the agent"),
-            },
+    await asyncio.gather(
+        log_activity_async(
+            agent=agent,
+            action=ActivityEvents.CHAT_ENDED,
+            description="Successfully exited chat with agent",
+            metadata={"duration_ms": duration_ms, "tool_calls": tool_calls or []}
         ),
-        responses={
-            200: openapi.Response(
-                description="Successful response",
-                examples={"application/json": {"response": "Agent's reply"}}
-            ),
-            400: "Bad Request",
-            404: "Agent Not Found",
-            500: "Internal Server Error",
-        }
+        update_metrics_async(agent, success=True, response_time_ms=duration_ms),
     )
-    def post(self, request):
-        user_message = request.data.get("message", "")
-        agent_id = request.data.get("agent_id")
 
-        if not agent_id:
-            return Response({"error": "agent_id is required."}, status=status.HTTP_400_BAD_REQUEST)
+async def get_chat_agent(data):
+    """
+    Validate a chat request body and load its agent.
+    Returns:
+        tuple: (agent, None) on success, (None, JsonResponse) on failure.
+    """
+    agent_id = data.get("agent_id")
 
+    if not agent_id:
+        return None, JsonResponse({"error": "agent_id is required."}, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        agent_uuid = uuid.UUID(str(agent_id))
+    except ValueError:
+        return None, JsonResponse({"error": "Invalid UUID format for agent_id."}, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        return await AgentConfig.objects.select_related("llm").aget(id=agent_uuid), None
+    except AgentConfig.DoesNotExist:
+        return None, JsonResponse({"error": f"Agent with id {agent_id} not found."}, status=status.HTTP_404_NOT_FOUND)
+
+@method_decorator(csrf_exempt, name="dispatch")
+class ChatView(View):
+    """
+    Send a message to a specific agent and get response.
+
+    Native async Django view: under the ASGI server the request awaits the LLM and tool
+    calls on the event loop instead of pinning a worker thread for the whole agent run.
+
+    Request body: {"message": "User message", "agent_id": "UUID of the agent", "cache": false (optional)}
+    Responses: 200 {"response": "Agent's reply", "request_id": "..."}, 400 Bad Request, 404 Agent Not Found,
+    500 Internal Server Error. The request id is also sent as `X-Request-ID` and keys the
+    trace of sampled requests (`traces/<request_id>/`). `"cache": false` skips the agent's
+    LLM response cache for this request.
+    """
+
+    async def post(self, request):
         try:
-            agent_uuid = uuid.UUID(agent_id)
+            data = parse_json_body(request)
         except ValueError:
-            return Response({"error": "Invalid UUID format for agent_id."}, status=status.HTTP_400_BAD_REQUEST)
+            return JsonResponse({"error": "Request body must be a valid JSON object."}, status=status.HTTP_400_BAD_REQUEST)
+
+        user_message = data.get("message", "")
 
         try:
-            agent = AgentConfig.objects.select_related("llm").get(id=agent_uuid)
+            agent, error_response = await get_chat_agent(data)
+            if error_response:
+                return error_response
 
             start_time = time.time()
-            response = async_to_sync(run_client)(user_message, agent)  # sync-safe call
+            response = await run_client(user_message, agent, bypass_cache=data.get("cache") is False)
             duration_ms = int((time.time() - start_time) * 1000)
 
             logger.info(f"Response: {response}")
+            await record_chat_outcome(agent, duration_ms, response.get("error"), response.get("tool_calls"))
+
             if "error" in response:
-                logger.error(f"[{agent.agent_name}] Agent execution error: {response['error']}")
-                async_to_sync(log_activity_async)(
-                    agent=agent,
-                    action=ActivityEvents.ERROR_OCCURRED,
-                    description=f"Error during agent execution: {response['error']}",
-                    metadata={"response": response["error"], "duration_ms": duration_ms}
+                http_response = JsonResponse(
+                    {"error": response["error"], "request_id": response["request_id"]},
+                    status=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 )
-                async_to_sync(update_metrics_async)(agent, success=False, response_time_ms=duration_ms)
-                return Response({"error": response["error"]}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-
-            async_to_sync(log_activity_async)(
-                agent=agent,
-                action=ActivityEvents.CHAT_ENDED,
-                description="Successfully exited chat with agent",
-                metadata={"duration_ms": duration_ms}
-            )
-            async_to_sync(update_metrics_async)(agent, success=True, response_time_ms=duration_ms)
-            return Response({"response": response["output"]}, status=status.HTTP_200_OK)
+            else:
+                http_response = JsonResponse(
+                    {"response": response["output"], "request_id": response["request_id"]},
+                    status=status.HTTP_200_OK,
+                )
+            http_response["X-Request-ID"] = response["request_id"]
+            return http_response
 
-        except AgentConfig.DoesNotExist:
-            return Response({"error": f"Agent with id {agent_id} not found."}, status=status.HTTP_404_NOT_FOUND)
         except Exception as e:
             logger.exception("Unexpected error in chat view")
-            return Response({"error": "Something went wrong, please try again."}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+            return JsonResponse({"error": "Something went wrong, please try again."}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+def format_sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+# Keeps detached chat runs referenced until they finish
+_background_chats = set()
+
+@method_decorator(csrf_exempt, name="dispatch")
+class ChatStreamView(View):
+    """
+    Streaming variant of the chat endpoint using Server-Sent Events.
+
+    Emits `token`, `tool_start`, `tool_end` and a closing `final` or `error` event. The
+    agent runs in a detached task, so if the client disconnects the run still completes
+    and its history, activity log and metrics are written.
+
+    Request body: {"message": "User message", "agent_id": "UUID of the agent", "cache": false (optional)}
+    """
+
+    heartbeat_interval = 15
+
+    async def post(self, request):
+        try:
+            data = parse_json_body(request)
+        except ValueError:
+            return JsonResponse({"error": "Request body must be a valid JSON object."}, status=status.HTTP_400_BAD_REQUEST)
+
+        agent, error_response = await get_chat_agent(data)
+        if error_response:
+            return error_response
+
+        user_message = data.get("message", "")
+        queue = asyncio.Queue()
+
+        async def run():
+            start_time = time.time()
+            error = None
+            tool_calls = None
+            try:
+                async for event, payload in stream_client(user_message, agent, bypass_cache=data.get("cache") is False):
+                    if event == "error":
+                        error = payload["error"]
+                    elif event == "final":
+                        tool_calls = payload.get("tool_calls")
+                    queue.put_nowait((event, payload))
+            except Exception as e:
+                logger.exception("Unexpected error in chat stream")
+                error = str(e)
+                queue.put_nowait(("error", {"error": "Something went wrong, please try again."}))
+            finally:
+                queue.put_nowait(None)
+                try:
+                    await record_chat_outcome(agent, int((time.time() - start_time) * 1000), error, tool_calls)
+                except Exception:
+                    logger.exception("Failed to record chat stream outcome")
+
+        task = asyncio.create_task(run())
+        _background_chats.add(task)
+        task.add_done_callback(_background_chats.discard)
+
+        async def event_stream():
+            while True:
+                try:
+                    item = await asyncio.wait_for(queue.get(), timeout=self.heartbeat_interval)
+                except asyncio.TimeoutError:
+                    yield ": ping\n\n"
+                    continue
+                if item is None:
+                    return
+                yield format_sse(*item)
+
+        response = StreamingHttpResponse(event_stream(), content_type="text/event-stream")
+        response["Cache-Control"] = "no-cache"
+        response["X-Accel-Buffering"] = "no"
+        return response
+
 class CustomPagination(PageNumberPagination):
     page_size = 20
     page_size_query_param = 'page_size'
     max_page_size = 100
 
+class ChatHistoryCursorPagination(CursorPagination):
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    ordering = ("-timestamp", "-role_order")
+
+def get_query_agent(request):
+    """
+    Resolve the `agent_id` query parameter.
+    Returns:
+        tuple: (agent, None) on success, or (None, error Response).
+    """
+    agent_id = request.GET.get("agent_id")
+
+    if not agent_id:
+        return None, Response({"error": "agent_id is required."}, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        agent_uuid = uuid.UUID(agent_id)
+    except ValueError:
+        return None, Response({"error": "Invalid UUID format for agent_id."}, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        return AgentConfig.objects.get(id=agent_uuid), None
+    except AgentConfig.DoesNotExist:
+        return None, Response({"error": f"Agent with id {agent_id} not found."}, status=status.HTTP_404_NOT_FOUND)
+
+def serialize_chat_entries(entries):
+    return [
+        {
+            "id": entry.id,
+            "message": entry.message,
+            "role": entry.role,
+            "timestamp": entry.timestamp,
+        }
+        for entry in entries
+    ]
+
 @swagger_auto_schema(
     method='get',
     operation_description="Retrieve the chat history of a specific AI agent.",
@@ -378,20 +560,9 @@ class CustomPagination(PageNumberPagination):
 )
 @api_view(["GET"])
 def chat_history(request):
-    agent_id = request.GET.get("agent_id")
-
-    if not agent_id:
-        return Response({"error": "agent_id is required."}, status=status.HTTP_400_BAD_REQUEST)
-
-    try:
-        agent_uuid = uuid.UUID(agent_id)
-    except ValueError:
-        return Response({"error": "Invalid UUID format for agent_id."}, status=status.HTTP_400_BAD_REQUEST)
-
-    try:
-        agent = AgentConfig.objects.get(id=agent_uuid)
-    except AgentConfig.DoesNotExist:
-        return Response({"error": f"Agent with id {agent_id} not found."}, status=status.HTTP_404_NOT_FOUND)
+    agent, error_response = get_query_agent(request)
+    if error_response:
+        return error_response
 
     queryset = ChatHistory.objects.filter(agent=agent).order_by("timestamp", "role_order")
 
@@ -400,15 +571,67 @@ def chat_history(request):
 
     paginated_qs = paginated_qs or []
 
-    serialized = [
-        {
-            "message": entry.message,
-            "role": entry.role,
-            "timestamp": entry.timestamp,
-        }
-        for entry in paginated_qs
-    ]
-    return paginator.get_paginated_response(serialized)
+    return paginator.get_paginated_response(serialize_chat_entries(paginated_qs))
+
+@swagger_auto_schema(
+    method='get',
+    operation_description=(
+        "Retrieve the chat history of a specific AI agent, newest first, with cursor pagination. "
+        "Follow `next` to load older messages; no total count is computed."
+    ),
+    manual_parameters=[
+        openapi.Parameter(
+            'agent_id', openapi.IN_QUERY, description="UUID of the agent",
+            type=openapi.TYPE_STRING, required=True
+        ),
+        openapi.Parameter(
+            'cursor', openapi.IN_QUERY, description="Opaque cursor taken from `next` or `previous`",
+            type=openapi.TYPE_STRING, required=False
+        ),
+        openapi.Parameter(
+            'page_size', openapi.IN_QUERY, description="Number of records per page",
+            type=openapi.TYPE_INTEGER, required=False
+        ),
+    ],
+    responses={
+        200: openapi.Response(
+            description='Chat history',
+            schema=openapi.Schema(
+                type=openapi.TYPE_OBJECT,
+                properties={
+                    'next': openapi.Schema(type=openapi.FORMAT_URI),
+                    'previous': openapi.Schema(type=openapi.FORMAT_URI),
+                    'results': openapi.Schema(
+                        type=openapi.TYPE_ARRAY,
+                        items=openapi.Schema(
+                            type=openapi.TYPE_OBJECT,
+                            properties={
+                                'message': openapi.Schema(type=openapi.TYPE_STRING),
+                                'role': openapi.Schema(type=openapi.TYPE_STRING),
+                                'timestamp': openapi.Schema(type=openapi.FORMAT_DATETIME),
+                            }
+                        )
+                    )
+                }
+            )
+        ),
+        400: openapi.Response(description='Bad request'),
+        404: openapi.Response(description='Agent not found'),
+    }
+)
+@api_view(["GET"])
+def chat_history_cursor(request):
+    agent, error_response = get_query_agent(request)
+    if error_response:
+        return error_response
+
+    # Served by the (agent, timestamp, role_order) index: a keyset seek, no COUNT or OFFSET
+    queryset = ChatHistory.objects.filter(agent=agent).only("message", "role", "timestamp", "role_order")
+
+    paginator = ChatHistoryCursorPagination()
+    paginated_qs = paginator.paginate_queryset(queryset, request) or []
+
+    return paginator.get_paginated_response(serialize_chat_entries(paginated_qs))
 
 @swagger_auto_schema(
     method='delete',
@@ -427,24 +650,15 @@ def chat_history(request):
 )
 @api_view(["DELETE"])
 def delete_chat_history(request):
-    agent_id = request.GET.get("agent_id")
-
-    if not agent_id:
-        return Response({"error": "agent_id is required."}, status=status.HTTP_400_BAD_REQUEST)
-
-    try:
-        agent_uuid = uuid.UUID(agent_id)
-    except ValueError:
-        return Response({"error": "Invalid UUID format for agent_id."}, status=status.HTTP_400_BAD_REQUEST)
-
-    try:
-        agent = AgentConfig.objects.get(id=agent_uuid)
-    except AgentConfig.DoesNotExist:
-        return Response({"error": f"Agent with id {agent_id} not found."}, status=status.HTTP_404_NOT_FOUND)
+    agent, error_response = get_query_agent(request)
+    if error_response:
+        return error_response
 
     # Delete the chat history related to the agent
     try:
         ChatHistory.objects.filter(agent=agent).delete()
+        ChatSummary.objects.filter(agent=agent).delete()
+        drop_message_index(agent.id)
 
         # Log the deletion activity
         log_activity(
@@ -465,13 +679,63 @@ def delete_chat_history(request):
         )
         return Response({"error": f"Error occurred while deleting chat history: {str(e)}"}, status=status.HTTP_400_BAD_REQUEST)
 
+class ActivityLogCursorPagination(CursorPagination):
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    ordering = "-timestamp"
+
 class RecentActivityLogsView(generics.ListAPIView):
-    queryset = AgentActivityLog.objects.order_by('-timestamp')
     serializer_class = AgentActivityLogSerializer
-    pagination_class = CustomPagination
+    pagination_class = ActivityLogCursorPagination
+
+    def get_queryset(self):
+        params = self.request.query_params
+        queryset = AgentActivityLog.objects.annotate(agent_name=F("agent__agent_name"))
+
+        agent_id = params.get("agent_id")
+        if agent_id:
+            try:
+                queryset = queryset.filter(agent_id=uuid.UUID(agent_id))
+            except ValueError:
+                raise ValidationError({"agent_id": "Invalid UUID format."})
+
+        actions = [action for action in params.get("action", "").split(",") if action]
+        if actions:
+            queryset = queryset.filter(action__in=actions)
+
+        for param, lookup in (("since", "timestamp__gte"), ("until", "timestamp__lt")):
+            if params.get(param):
+                value = parse_datetime(params[param])
+                if value is None:
+                    raise ValidationError({param: "Expected an ISO 8601 datetime."})
+                queryset = queryset.filter(**{lookup: value})
+
+        if params.get("metadata"):
+            try:
+                metadata = json.loads(params["metadata"])
+            except ValueError:
+                metadata = None
+            if not isinstance(metadata, dict):
+                raise ValidationError({"metadata": "Expected a JSON object."})
+            queryset = queryset.filter(metadata__contains=metadata)
+
+        return queryset
 
     @swagger_auto_schema(
-        operation_description="Get a paginated list of recent agent activity logs (ordered by timestamp).",
+        operation_description=(
+            "Get agent activity logs, newest first, with cursor pagination (follow `next`). "
+            "`metadata` matches logs whose metadata contains the given JSON object."
+        ),
+        manual_parameters=[
+            openapi.Parameter('agent_id', openapi.IN_QUERY, description="UUID of the agent", type=openapi.TYPE_STRING),
+            openapi.Parameter('action', openapi.IN_QUERY, description="Comma-separated actions", type=openapi.TYPE_STRING),
+            openapi.Parameter('since', openapi.IN_QUERY, description="Inclusive ISO 8601 start", type=openapi.TYPE_STRING),
+            openapi.Parameter('until', openapi.IN_QUERY, description="Exclusive ISO 8601 end", type=openapi.TYPE_STRING),
+            openapi.Parameter('metadata', openapi.IN_QUERY, description='JSON object, e.g. {"transport": "websocket"}', type=openapi.TYPE_STRING),
+            openapi.Parameter('cursor', openapi.IN_QUERY, description="Opaque cursor taken from `next` or `previous`", type=openapi.TYPE_STRING),
+            openapi.Parameter('page_size', openapi.IN_QUERY, description="Number of records per page", type=openapi.TYPE_INTEGER),
+        ],
         responses={200: AgentActivityLogSerializer(many=True)}
     )
     def get(self, request, *args, **kwargs):
@@ -495,26 +759,200 @@ class AgentMetricsView(APIView):
         )}
     )
     def get(self, request):
-        # Correct: count all AgentConfig instances
-        total_agents = AgentConfig.objects.count()
-
-        # Aggregate metrics from AgentMetric
-        summary = AgentMetric.objects.aggregate(
-            total_requests=Sum('total_requests'),
-            total_success=Sum('total_success'),
-            total_failures=Sum('total_failures'),
-            total_response_time=Sum('total_response_time_ms'),
-        )
+        # Single-row rollup maintained by the metrics flush and agent create/delete signals
+        totals = MetricTotals.objects.filter(id=1).first() or MetricTotals()
+
+        return Response({
+            'total_agents': totals.total_agents,
+            'total_success': totals.total_success,
+            'total_failures': totals.total_failures,
+            'average_response_time': round(totals.average_response_time(), 2),
+        })
 
-        total_requests = summary['total_requests'] or 0
-        avg_response_time = (
-            summary['total_response_time'] / total_requests
-            if total_requests else 0
+def parse_date_range(params, default_days=30):
+    """
+    Read `start`/`end` (YYYY-MM-DD) query parameters, defaulting to the last `default_days` days.
+    Returns:
+        tuple: (start, end, None) on success, or (None, None, error Response).
+    """
+    end = parse_date(params["end"]) if params.get("end") else now().date()
+    start = parse_date(params["start"]) if params.get("start") else None
+    if end is None or (params.get("start") and start is None):
+        return None, None, Response({"error": "start and end must be YYYY-MM-DD dates."}, status=status.HTTP_400_BAD_REQUEST)
+    if start is None:
+        start = end - timedelta(days=default_days - 1)
+    if start > end:
+        return None, None, Response({"error": "start must not be after end."}, status=status.HTTP_400_BAD_REQUEST)
+    return start, end, None
+
+def metric_row(row, prefix=""):
+    requests = row[f'{prefix}total_requests'] or 0
+    return {
+        'total_requests': requests,
+        'total_success': row[f'{prefix}total_success'] or 0,
+        'total_failures': row[f'{prefix}total_failures'] or 0,
+        'average_response_time': round(row[f'{prefix}total_response_time_ms'] / requests, 2) if requests else 0,
+    }
+
+date_range_parameters = [
+    openapi.Parameter('start', openapi.IN_QUERY, description="First date, YYYY-MM-DD (default: 29 days before end)", type=openapi.TYPE_STRING),
+    openapi.Parameter('end', openapi.IN_QUERY, description="Last date, YYYY-MM-DD (default: today)", type=openapi.TYPE_STRING),
+]
+
+class DailyMetricsView(APIView):
+
+    @swagger_auto_schema(
+        operation_description="Get per-day totals over all agents for a date range, read from the daily rollup.",
+        manual_parameters=date_range_parameters,
+    )
+    def get(self, request):
+        start, end, error_response = parse_date_range(request.query_params)
+        if error_response:
+            return error_response
+
+        rows = DailyMetricRollup.objects.filter(date__range=(start, end)).order_by('date').values('date', *METRIC_FIELDS)
+        return Response([{'date': row['date'], **metric_row(row)} for row in rows])
+
+class AgentBreakdownMetricsView(APIView):
+
+    @swagger_auto_schema(
+        operation_description="Get per-agent totals for a date range, summed from the per-agent daily metrics.",
+        manual_parameters=date_range_parameters,
+    )
+    def get(self, request):
+        start, end, error_response = parse_date_range(request.query_params)
+        if error_response:
+            return error_response
+
+        rows = (
+            AgentMetric.objects.filter(date__range=(start, end))
+            .values('agent_id', 'agent__agent_name')
+            # Annotations may not reuse the model's field names
+            .annotate(**{f'sum_{field}': Sum(field) for field in METRIC_FIELDS})
+            .order_by('-sum_total_requests')
         )
+        return Response([
+            {'agent_id': row['agent_id'], 'agent': row['agent__agent_name'], **metric_row(row, prefix='sum_')}
+            for row in rows
+        ])
+
+class AgentLatencyView(APIView):
+
+    @swagger_auto_schema(
+        operation_description=(
+            "Get chat latency percentiles (ms) from the daily latency histograms, for one agent or all agents, "
+            "over an optional date range. Values are bucket upper bounds, accurate to about 9%."
+        ),
+        manual_parameters=[
+            openapi.Parameter('agent_id', openapi.IN_QUERY, description="UUID of the agent (all agents if omitted)", type=openapi.TYPE_STRING),
+            openapi.Parameter('start', openapi.IN_QUERY, description="First date, YYYY-MM-DD", type=openapi.TYPE_STRING),
+            openapi.Parameter('end', openapi.IN_QUERY, description="Last date, YYYY-MM-DD", type=openapi.TYPE_STRING),
+            openapi.Parameter('percentiles', openapi.IN_QUERY, description="Comma-separated percentiles, default 50,90,95,99", type=openapi.TYPE_STRING),
+        ],
+        responses={200: openapi.Response(
+            description="Latency percentiles",
+            schema=openapi.Schema(
+                type=openapi.TYPE_OBJECT,
+                properties={
+                    'count': openapi.Schema(type=openapi.TYPE_INTEGER),
+                    'p50': openapi.Schema(type=openapi.TYPE_NUMBER, format='float'),
+                    'p90': openapi.Schema(type=openapi.TYPE_NUMBER, format='float'),
+                    'p95': openapi.Schema(type=openapi.TYPE_NUMBER, format='float'),
+                    'p99': openapi.Schema(type=openapi.TYPE_NUMBER, format='float'),
+                }
+            )
+        )}
+    )
+    def get(self, request):
+        params = request.query_params
+        queryset = AgentLatencyBucket.objects.all()
+
+        if params.get("agent_id"):
+            try:
+                queryset = queryset.filter(agent_id=uuid.UUID(params["agent_id"]))
+            except ValueError:
+                return Response({"error": "Invalid UUID format for agent_id."}, status=status.HTTP_400_BAD_REQUEST)
+
+        for param, lookup in (("start", "date__gte"), ("end", "date__lte")):
+            if params.get(param):
+                value = parse_date(params[param])
+                if value is None:
+                    return Response({"error": f"{param} must be a YYYY-MM-DD date."}, status=status.HTTP_400_BAD_REQUEST)
+                queryset = queryset.filter(**{lookup: value})
+
+        try:
+            percentiles = [float(p) for p in params.get("percentiles", "50,90,95,99").split(",") if p]
+        except ValueError:
+            return Response({"error": "percentiles must be comma-separated numbers."}, status=status.HTTP_400_BAD_REQUEST)
+        if not percentiles or any(not 0 < p <= 100 for p in percentiles):
+            return Response({"error": "percentiles must be between 0 and 100."}, status=status.HTTP_400_BAD_REQUEST)
+
+        # Histograms of different agents and days merge by summing each bucket
+        counts = dict(queryset.values("bucket").annotate(total=Sum("count")).values_list("bucket", "total"))
 
         return Response({
-            'total_agents': total_agents,
-            'total_success': summary['total_success'] or 0,
-            'total_failures': summary['total_failures'] or 0,
-            'average_response_time': round(avg_response_time, 2),
+            "count": sum(counts.values()),
+            **percentiles_from_buckets(counts, percentiles),
         })
+
+class ChatTraceCursorPagination(CursorPagination):
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    ordering = "-created_at"
+
+class ChatTraceListView(generics.ListAPIView):
+    serializer_class = ChatTraceSerializer
+    pagination_class = ChatTraceCursorPagination
+
+    def get_queryset(self):
+        params = self.request.query_params
+        queryset = ChatTrace.objects.all()
+
+        for param, field in (("agent_id", "agent_id"), ("message_id", "message_id")):
+            if params.get(param):
+                try:
+                    queryset = queryset.filter(**{field: uuid.UUID(params[param])})
+                except ValueError:
+                    raise ValidationError({param: "Invalid UUID format."})
+
+        if params.get("status"):
+            queryset = queryset.filter(status=params["status"])
+
+        return queryset
+
+    @swagger_auto_schema(
+        operation_description=(
+            "Get sampled chat traces, newest first, with cursor pagination. Each trace lists its spans as "
+            "`[name, start_ms, duration_ms, parent_index, attributes]` rows."
+        ),
+        manual_parameters=[
+            openapi.Parameter('agent_id', openapi.IN_QUERY, description="UUID of the agent", type=openapi.TYPE_STRING),
+            openapi.Parameter('message_id', openapi.IN_QUERY, description="UUID of the human chat message of the turn", type=openapi.TYPE_STRING),
+            openapi.Parameter('status', openapi.IN_QUERY, description="ok or error", type=openapi.TYPE_STRING),
+            openapi.Parameter('cursor', openapi.IN_QUERY, description="Opaque cursor taken from `next` or `previous`", type=openapi.TYPE_STRING),
+            openapi.Parameter('page_size', openapi.IN_QUERY, description="Number of records per page", type=openapi.TYPE_INTEGER),
+        ],
+        responses={200: ChatTraceSerializer(many=True)}
+    )
+    def get(self, request, *args, **kwargs):
+        return super().get(request, *args, **kwargs)
+
+class ChatTraceDetailView(generics.RetrieveAPIView):
+    serializer_class = ChatTraceSerializer
+    queryset = ChatTrace.objects.all()
+    lookup_url_kwarg = "request_id"
+
+    @swagger_auto_schema(
+        operation_description="Get the trace of one chat request by the request id returned by the chat endpoints.",
+        responses={200: ChatTraceSerializer(), 404: openapi.Response(description="Request was not traced")}
+    )
+    def get(self, request, *args, **kwargs):
+        return super().get(request, *args, **kwargs)
+
+def prometheus_metrics(request):
+    """
+    Prometheus scrape endpoint: in-process counters and histograms of all workers, rendered
+    without touching the database.
+    """
+    return HttpResponse(PROMETHEUS_REGISTRY.render(), content_type=PROMETHEUS_CONTENT_TYPE)
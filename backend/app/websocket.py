@@ -0,0 +1,224 @@
+import asyncio
+import json
+import logging
+import re
+import time
+import uuid
+from collections import deque
+
+from .mcp.client import (
+    build_agent_config, get_agent_executor, get_llm_from_config, load_chat_history, recall_memory, save_messages,
+    stream_executor,
+)
+from .mcp.llm_cache import bypass_llm_cache
+from .mcp.history import count_tokens, load_history_window, overflow_count, schedule_fold, summary_messages
+from .mcp.pool import get_session_pool
+from .models import ActivityEvents, AgentConfig
+from .tracing import span, start_trace
+from .utils import log_activity_async, update_metrics_async
+
+logger = logging.getLogger(__name__)
+
+CHAT_PATH = re.compile(r"^/ws/chat/(?P<agent_id>[0-9a-fA-F-]{36})/?$")
+
+
+class AgentChatSession:
+    """
+    One WebSocket connection bound to one agent.
+
+    The executor, the pinned MCP sessions and the recent history are loaded once on
+    connect and reused for every turn; history, activity logs and metrics are written in
+    background tasks so a turn never waits on the database.
+    """
+
+    def __init__(self, agent, send):
+        self.agent = agent
+        self.send = send
+        self.agent_config = build_agent_config(agent)
+        self.executor = None
+        self.budget = self.agent_config.get("history_token_budget")
+        self.summary = ""
+        # A token budget trims history per turn, a message count through the deque itself
+        self.history = deque(maxlen=None if self.budget else max(1, self.agent_config["n_history_messages"]))
+        self.pending_writes = set()
+        self.retained = []
+
+    async def open(self):
+        self.executor = await get_agent_executor(self.agent, self.agent_config)
+
+        pool = get_session_pool()
+        configs = list((self.agent.mcp_server or {}).values())
+        results = await asyncio.gather(*[pool.retain(config) for config in configs], return_exceptions=True)
+        self.retained = [config for config, result in zip(configs, results) if not isinstance(result, BaseException)]
+
+        # A session that fails to open never reaches close(), so unpin its servers here
+        try:
+            for result in results:
+                if isinstance(result, BaseException):
+                    raise result
+
+            if self.budget:
+                self.summary, messages = await load_history_window(self.agent, self.agent_config, get_llm_from_config)
+                self.history.extend(messages)
+            else:
+                self.history.extend(await load_chat_history(self.agent, self.agent_config))
+        except BaseException:
+            await self.release_sessions()
+            raise
+
+        self.write_in_background(log_activity_async(
+            agent=self.agent,
+            action=ActivityEvents.CHAT_STARTED,
+            description="WebSocket chat session opened",
+            metadata={"transport": "websocket"}
+        ))
+
+    async def release_sessions(self):
+        pool = get_session_pool()
+        retained, self.retained = self.retained, []
+        await asyncio.gather(*[pool.release(config) for config in retained], return_exceptions=True)
+
+    async def close(self):
+        await self.release_sessions()
+        await log_activity_async(
+            agent=self.agent,
+            action=ActivityEvents.CHAT_ENDED,
+            description="WebSocket chat session closed",
+            metadata={"transport": "websocket"}
+        )
+        if self.pending_writes:
+            await asyncio.gather(*self.pending_writes, return_exceptions=True)
+
+    def write_in_background(self, coro):
+        task = asyncio.create_task(coro)
+        self.pending_writes.add(task)
+        task.add_done_callback(self.pending_writes.discard)
+
+    def set_summary(self, summary):
+        self.summary = summary
+
+    def prompt_history(self):
+        """
+        Snapshot the history for one turn; the prompt renders it as a list.
+
+        Turns pushed out of the token budget are dropped from memory and folded into the
+        stored summary in the background.
+        """
+        messages = list(self.history)
+        if not self.budget:
+            return messages
+
+        split = overflow_count(messages, self.budget - count_tokens(self.summary))
+        if split:
+            for _ in range(split):
+                self.history.popleft()
+            schedule_fold(self.agent, self.agent_config, get_llm_from_config, on_done=self.set_summary)
+        return summary_messages(self.summary) + messages[split:]
+
+    async def send_event(self, event, data):
+        await self.send({"type": "websocket.send", "text": json.dumps({"event": event, **data}, default=str)})
+
+    async def handle_turn(self, query, bypass_cache=False):
+        request_id = uuid.uuid4()
+        with start_trace(self.agent, "websocket", request_id) as trace, bypass_llm_cache(bypass_cache):
+            await self.run_turn(query, request_id, trace)
+
+    async def run_turn(self, query, request_id, trace):
+        start_time = time.time()
+        output = None
+        error = None
+
+        try:
+            executor = self.executor
+            if self.agent_config.get("tool_top_k"):
+                with span("executor.get"):
+                    executor = await get_agent_executor(self.agent, self.agent_config, query)
+
+            with span("history.load"):
+                chat_history = self.prompt_history()
+                if self.agent_config.get("memory_top_k"):
+                    chat_history = await recall_memory(self.agent, self.agent_config, query, chat_history) + chat_history
+
+            async for event, data in stream_executor(executor, query, chat_history):
+                if event == "final":
+                    output = data["response"]
+                    data = {**data, "request_id": str(request_id)}
+                await self.send_event(event, data)
+        except Exception as e:
+            logger.exception(f"[{self.agent.agent_name}] Error during websocket turn")
+            error = str(e)
+            if trace is not None:
+                trace.status = "error"
+            await self.send_event("error", {"error": error})
+
+        duration_ms = int((time.time() - start_time) * 1000)
+        if error:
+            self.write_in_background(log_activity_async(
+                agent=self.agent,
+                action=ActivityEvents.ERROR_OCCURRED,
+                description=f"Error during agent execution: {error}",
+                metadata={"error": error, "duration_ms": duration_ms, "transport": "websocket"}
+            ))
+        else:
+            self.history.append(("human", query))
+            self.history.append(("ai", output))
+            # The id is generated here so the trace, stored before the background write
+            # finishes, can already point at the message
+            message_id = uuid.uuid4()
+            if trace is not None:
+                trace.message_id = message_id
+            self.write_in_background(save_messages(self.agent, query, output, message_id))
+
+        self.write_in_background(update_metrics_async(self.agent, success=error is None, response_time_ms=duration_ms))
+
+
+async def websocket_application(scope, receive, send):
+    """
+    ASGI handler for `ws/chat/<agent_id>/`.
+
+    Clients send `{"message": "..."}` frames (`"cache": false` skips the LLM response
+    cache for that turn) and receive the same events as the SSE endpoint, one JSON frame
+    per event.
+    """
+    message = await receive()
+    if message["type"] != "websocket.connect":
+        return
+
+    match = CHAT_PATH.match(scope["path"])
+    if not match:
+        await send({"type": "websocket.close", "code": 4404})
+        return
+
+    try:
+        agent = await AgentConfig.objects.select_related("llm").aget(id=uuid.UUID(match.group("agent_id")))
+    except (ValueError, AgentConfig.DoesNotExist):
+        await send({"type": "websocket.close", "code": 4404})
+        return
+
+    session = AgentChatSession(agent, send)
+    try:
+        await session.open()
+    except Exception:
+        logger.exception(f"[{agent.agent_name}] Failed to open websocket chat session")
+        await send({"type": "websocket.close", "code": 1011})
+        return
+
+    try:
+        await send({"type": "websocket.accept"})
+        while True:
+            message = await receive()
+            if message["type"] == "websocket.disconnect":
+                break
+            if message["type"] != "websocket.receive":
+                continue
+
+            try:
+                data = json.loads(message.get("text") or "{}")
+                query = data["message"]
+            except (ValueError, TypeError, KeyError):
+                await session.send_event("error", {"error": "Frames must be JSON objects with a 'message' key."})
+                continue
+
+            await session.handle_turn(query, bypass_cache=data.get("cache") is False)
+    finally:
+        await session.close()
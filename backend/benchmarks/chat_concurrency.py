@@ -0,0 +1,56 @@
+"""
+Concurrent chat throughput benchmark against the stub LLM provider.
+
+Start the backend with `STUB_LLM_ENABLED=True`, then run for example:
+
+    python -m benchmarks.chat_concurrency --base-url http://localhost:8000 --requests 200 --concurrency 50
+
+See benchmarks/README.md for the full procedure.
+"""
+import argparse
+import asyncio
+import os
+import sys
+
+import httpx
+
+if __package__ in (None, ""):
+    # Run as `python benchmarks/chat_concurrency.py`: make the `benchmarks` package importable
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.harness import ensure_agent, run_load, stub_agent  # noqa: E402
+
+STUB_AGENT = stub_agent("Benchmark Stub Agent", "stub")
+
+
+async def run(args):
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=args.timeout) as client:
+        agent_id = args.agent_id or await ensure_agent(client, STUB_AGENT)
+        result = await run_load(
+            client,
+            lambda i: ("POST", "/api/chat/", {"json": {"agent_id": agent_id, "message": f"ping {i}"}}),
+            args.requests,
+            args.concurrency,
+        )
+
+    print(f"requests      {result['requests']} (concurrency {args.concurrency}, failures {result['failures']})")
+    print(f"wall time     {result['elapsed_s']:.2f} s")
+    print(f"throughput    {result['throughput_rps']:.1f} req/s")
+    print(f"latency mean  {result['mean_ms']:.0f} ms")
+    print(f"latency p50   {result['p50_ms']:.0f} ms")
+    print(f"latency p95   {result['p95_ms']:.0f} ms")
+    print(f"latency p99   {result['p99_ms']:.0f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--agent-id", help="Existing stub agent to use; created on first run if omitted.")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--timeout", type=float, default=120)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
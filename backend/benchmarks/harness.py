@@ -0,0 +1,102 @@
+"""
+Load driver shared by the benchmark scripts: stub agent setup, concurrent request firing
+and latency summaries.
+"""
+import asyncio
+import math
+import statistics
+import time
+
+import httpx
+
+
+def percentile(values, pct):
+    """
+    Nearest-rank percentile of `values`.
+    """
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(len(ordered) * pct / 100) - 1)]
+
+
+def summarize(latencies, failures, elapsed):
+    return {
+        "requests": len(latencies),
+        "failures": failures,
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        "mean_ms": round(statistics.mean(latencies), 1),
+        "p50_ms": round(percentile(latencies, 50), 1),
+        "p95_ms": round(percentile(latencies, 95), 1),
+        "p99_ms": round(percentile(latencies, 99), 1),
+    }
+
+
+def stub_agent(name, model, mcp_servers=None):
+    """
+    Agent payload backed by the stub LLM provider; `model` picks its tool-call script.
+    """
+    return {
+        "agentConfig": {
+            "agent_name": name,
+            "description": "Agent backed by the stub LLM provider, used by the benchmarks.",
+            "tags": ["benchmark"],
+            "llm": {"provider": "stub", "model": model, "max_tokens": 256, "temperature": 0, "n_history_messages": 4},
+            "prompt": {"system_message": "You are a benchmark agent."},
+        },
+        "mcpServers": mcp_servers or {},
+    }
+
+
+async def ensure_agent(client, payload):
+    """
+    Create the agent, or update the one with the same name so it matches `payload`.
+    Returns:
+        str: The agent id.
+    """
+    response = await client.get("/api/agents/")
+    response.raise_for_status()
+    for agent in response.json():
+        if agent["agent_name"] == payload["agentConfig"]["agent_name"]:
+            # Resending the name fails its uniqueness check, so patch everything else
+            config = {key: value for key, value in payload["agentConfig"].items() if key != "agent_name"}
+            response = await client.patch(f"/api/agents/{agent['id']}/", json={**payload, "agentConfig": config})
+            response.raise_for_status()
+            return str(agent["id"])
+
+    response = await client.post("/api/agents/", json=payload)
+    response.raise_for_status()
+    return response.json()["id"]
+
+
+async def run_load(client, build, requests, concurrency):
+    """
+    Send `requests` requests, at most `concurrency` at a time, and summarize their latency.
+    Args:
+        client (httpx.AsyncClient): Client bound to the backend.
+        build (callable): `build(i)` returns `(method, url, request kwargs)` of request `i`.
+        requests (int): Number of requests.
+        concurrency (int): Maximum requests in flight.
+    Returns:
+        dict: Throughput, failures and latency percentiles (see `summarize`).
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    failures = 0
+
+    async def one(i):
+        nonlocal failures
+        method, url, options = build(i)
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                response = await client.request(method, url, **options)
+                ok = response.status_code < 400
+            except httpx.HTTPError:
+                ok = False
+            latencies.append((time.perf_counter() - started) * 1000)
+            if not ok:
+                failures += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*[one(i) for i in range(requests)])
+    return summarize(latencies, failures, time.perf_counter() - started)
@@ -0,0 +1,37 @@
+"""
+Local stand-in MCP server for benchmarks: the tools of `app/mcp/servers/calculator.py`,
+each delayed by `STUB_MCP_LATENCY_MS` to simulate a remote tool.
+
+Registered by `benchmarks/suite.py` as the stdio server of its tool-calling agent:
+
+    {"command": "python", "args": ["benchmarks/stub_mcp_server.py"], "env": {"STUB_MCP_LATENCY_MS": "20"}}
+"""
+import asyncio
+import functools
+import os
+import sys
+
+from mcp.server.fastmcp import FastMCP
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from app.mcp.servers.calculator import add, multiply  # noqa: E402
+
+LATENCY_S = float(os.environ.get("STUB_MCP_LATENCY_MS", "0")) / 1000
+
+mcp = FastMCP("benchmark-calculator")
+
+
+def delayed(func):
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        await asyncio.sleep(LATENCY_S)
+        return func(*args, **kwargs)
+    return wrapper
+
+
+for tool in (add, multiply):
+    mcp.add_tool(delayed(tool), name=tool.__name__, description=tool.__doc__)
+
+if __name__ == "__main__":
+    mcp.run(transport="stdio")
@@ -0,0 +1,243 @@
+"""
+Latency and throughput benchmark suite for the chat, history, activity log and dashboard endpoints.
+
+Every scenario fires `--requests` requests at `--concurrency` against agents backed by the
+stub LLM provider, one of them calling the tools of the local stub MCP server
+(`benchmarks/stub_mcp_server.py`), so runs are deterministic and need no network access.
+
+    python -m benchmarks.suite --start-server --save-baseline benchmarks/baselines/main.json
+    python -m benchmarks.suite --start-server --compare benchmarks/baselines/main.json
+
+See benchmarks/README.md for the full procedure.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from urllib.parse import urlparse
+
+import httpx
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if __package__ in (None, ""):
+    # Run as `python benchmarks/suite.py`: make the `benchmarks` package importable
+    sys.path.insert(0, BACKEND_DIR)
+
+from benchmarks.harness import ensure_agent, run_load, stub_agent  # noqa: E402
+
+STUB_MCP_SERVER = os.path.join(BACKEND_DIR, "benchmarks", "stub_mcp_server.py")
+
+# Chats run first so the read scenarios page through the history and logs they wrote
+SCENARIOS = {
+    "chat": lambda agents, i: ("POST", "/api/chat/", {"json": {"agent_id": agents["chat"], "message": f"ping {i}"}}),
+    "chat_tools": lambda agents, i: ("POST", "/api/chat/", {"json": {"agent_id": agents["tools"], "message": f"calculate {i}"}}),
+    "history": lambda agents, i: ("GET", "/api/chat/history/cursor/", {"params": {"agent_id": agents["chat"]}}),
+    "logs": lambda agents, i: ("GET", "/api/dashboard/logs/", {"params": {"agent_id": agents["chat"]}}),
+    "dashboard": lambda agents, i: ("GET", "/api/dashboard/analytics/", {}),
+    "dashboard_daily": lambda agents, i: ("GET", "/api/dashboard/analytics/daily/", {}),
+    "dashboard_agents": lambda agents, i: ("GET", "/api/dashboard/analytics/agents/", {}),
+    "dashboard_latency": lambda agents, i: ("GET", "/api/dashboard/latency/", {"params": {"agent_id": agents["chat"]}}),
+}
+
+# Compared against a baseline: higher is worse for latencies, lower for throughput
+LATENCY_KEYS = ("p50_ms", "p95_ms", "p99_ms")
+
+
+def benchmark_agents(args):
+    calculator = {
+        "command": sys.executable,
+        "args": [STUB_MCP_SERVER],
+        "env": {"STUB_MCP_LATENCY_MS": str(args.mcp_latency_ms)},
+    }
+    return {
+        "chat": stub_agent("Benchmark Chat Agent", "stub"),
+        "tools": stub_agent("Benchmark Tool Agent", args.script, {"calculator": calculator}),
+    }
+
+
+async def run(args):
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=args.timeout) as client:
+        agents = {}
+        for key, payload in benchmark_agents(args).items():
+            agents[key] = await ensure_agent(client, payload)
+            if args.clear_history:
+                response = await client.delete("/api/chat/delete/", params={"agent_id": agents[key]})
+                response.raise_for_status()
+
+        results = {}
+        for name in args.scenarios:
+            build = SCENARIOS[name]
+            if args.warmup:
+                await run_load(client, lambda i: build(agents, i), args.warmup, args.concurrency)
+            results[name] = await run_load(client, lambda i: build(agents, i), args.requests, args.concurrency)
+            print_result(name, results[name])
+        return results
+
+
+def print_result(name, result):
+    print(
+        f"{name:<18} {result['throughput_rps']:>8.1f} req/s   "
+        f"p50 {result['p50_ms']:>8.1f} ms   p95 {result['p95_ms']:>8.1f} ms   p99 {result['p99_ms']:>8.1f} ms   "
+        f"failures {result['failures']}/{result['requests']}"
+    )
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_metadata(args):
+    return {
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "revision": git_revision(),
+        "requests": args.requests,
+        "concurrency": args.concurrency,
+        "script": args.script,
+        "mcp_latency_ms": args.mcp_latency_ms,
+        # Only known when the suite started the server itself
+        "llm_latency_ms": args.llm_latency_ms if args.start_server else None,
+        "workers": args.workers if args.start_server else None,
+        "python": platform.python_version(),
+        "machine": f"{platform.system()} {platform.machine()}, {os.cpu_count()} CPUs",
+    }
+
+
+def compare(baseline, results, tolerance):
+    """
+    Print the change of every scenario against a baseline.
+    Returns:
+        list: Names of the scenarios whose p95 latency or throughput regressed beyond `tolerance`.
+    """
+    regressions = []
+    for name, result in results.items():
+        base = baseline["results"].get(name)
+        if base is None:
+            print(f"{name:<18} not in baseline")
+            continue
+
+        changes = {key: relative_change(base[key], result[key]) for key in (*LATENCY_KEYS, "throughput_rps")}
+        regressed = changes["p95_ms"] > tolerance or changes["throughput_rps"] < -tolerance
+        if regressed:
+            regressions.append(name)
+        print(
+            f"{name:<18} throughput {changes['throughput_rps']:+7.1%}   "
+            + "   ".join(f"{key[:-3]} {changes[key]:+7.1%}" for key in LATENCY_KEYS)
+            + ("   REGRESSION" if regressed else "")
+        )
+    return regressions
+
+
+def relative_change(before, after):
+    if not before:
+        return 0.0
+    return (after - before) / before
+
+
+@contextmanager
+def backend_server(args):
+    """
+    Migrate and start uvicorn with the stub LLM provider, and stop it on exit.
+    """
+    url = urlparse(args.base_url)
+    env = {**os.environ, "STUB_LLM_ENABLED": "True", "STUB_LLM_LATENCY_MS": str(args.llm_latency_ms)}
+    subprocess.run([sys.executable, "manage.py", "migrate", "--no-input"], cwd=BACKEND_DIR, env=env, check=True)
+
+    process = subprocess.Popen(
+        [
+            sys.executable, "-m", "uvicorn", "connect_forge_base.asgi:application",
+            "--host", url.hostname or "127.0.0.1", "--port", str(url.port or 8000),
+            "--workers", str(args.workers), "--log-level", "warning",
+        ],
+        cwd=BACKEND_DIR,
+        env=env,
+    )
+    try:
+        wait_until_ready(args.base_url, process)
+        yield
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+def wait_until_ready(base_url, process, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Backend exited with code {process.returncode} during startup")
+        try:
+            httpx.get(f"{base_url}/api/agents/", timeout=2).raise_for_status()
+            return
+        except httpx.HTTPError:
+            time.sleep(0.5)
+    raise RuntimeError(f"Backend did not become ready within {timeout} seconds")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help="Comma-separated scenarios, run in this order.")
+    parser.add_argument("--requests", type=int, default=200, help="Measured requests per scenario.")
+    parser.add_argument("--warmup", type=int, default=20, help="Unmeasured requests sent before each scenario.")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--timeout", type=float, default=120)
+    parser.add_argument("--script", default="calculator_chain", help="Stub LLM tool-call script of the tool agent.")
+    parser.add_argument("--mcp-latency-ms", type=int, default=20, help="Delay of every stub MCP tool call.")
+    parser.add_argument("--clear-history", action="store_true", help="Delete the benchmark agents' history first.")
+    parser.add_argument("--start-server", action="store_true", help="Run uvicorn with the stub LLM for the duration of the suite.")
+    parser.add_argument("--llm-latency-ms", type=int, default=200, help="Stub LLM latency (with --start-server).")
+    parser.add_argument("--workers", type=int, default=1, help="Uvicorn workers (with --start-server).")
+    parser.add_argument("--save-baseline", metavar="PATH", help="Write the results as a JSON baseline.")
+    parser.add_argument("--compare", metavar="PATH", help="Compare with a baseline; exits 1 on regressions.")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="Allowed relative p95/throughput regression.")
+    args = parser.parse_args()
+
+    args.scenarios = [name for name in args.scenarios.split(",") if name]
+    unknown = [name for name in args.scenarios if name not in SCENARIOS]
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(unknown)} (choose from {', '.join(SCENARIOS)})")
+
+    if args.start_server:
+        with backend_server(args):
+            results = asyncio.run(run(args))
+    else:
+        results = asyncio.run(run(args))
+
+    report = {"meta": run_metadata(args), "results": results}
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(os.path.abspath(args.save_baseline)), exist_ok=True)
+        with open(args.save_baseline, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nBaseline written to {args.save_baseline}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        differing = [
+            key for key in ("requests", "concurrency", "script", "mcp_latency_ms", "llm_latency_ms", "workers", "machine")
+            if baseline["meta"].get(key) != report["meta"][key]
+        ]
+        print(f"\nCompared with {args.compare} (revision {baseline['meta'].get('revision')})")
+        if differing:
+            print(f"warning: run settings differ from the baseline: {', '.join(differing)}")
+        regressions = compare(baseline, results, args.tolerance)
+        if regressions:
+            print(f"\n{len(regressions)} scenario(s) regressed by more than {args.tolerance:.0%}: {', '.join(regressions)}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -9,8 +9,26 @@ https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 
 import os
 import django
+from django.conf import settings
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'connect_forge_base.settings')
 django.setup()
-application = get_asgi_application()
\ No newline at end of file
+http_application = get_asgi_application()
+
+if settings.DEBUG:
+    # runserver used to serve admin/swagger assets; keep that working under uvicorn in development
+    from django.contrib.staticfiles.handlers import ASGIStaticFilesHandler
+    http_application = ASGIStaticFilesHandler(http_application)
+
+from app.lifespan import lifespan_application
+from app.websocket import websocket_application
+
+
+async def application(scope, receive, send):
+    if scope["type"] == "websocket":
+        await websocket_application(scope, receive, send)
+    elif scope["type"] == "lifespan":
+        await lifespan_application(scope, receive, send)
+    else:
+        await http_application(scope, receive, send)
@@ -10,6 +10,9 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
+import tempfile
+
 import environ
 from pathlib import Path
 
@@ -181,3 +184,65 @@ LOGGING = {
 
 GROQ_API_KEY= env.str("GROQ_API_KEY")
 OPENAI_API_KEY=env.str("OPENAI_API_KEY")
+
+# MCP session pool
+MCP_POOL_IDLE_TTL = env.int("MCP_POOL_IDLE_TTL", default=600)
+MCP_POOL_HEALTH_CHECK_INTERVAL = env.int("MCP_POOL_HEALTH_CHECK_INTERVAL", default=30)
+MCP_POOL_HEALTH_CHECK_TIMEOUT = env.int("MCP_POOL_HEALTH_CHECK_TIMEOUT", default=5)
+
+# Tool schema registry
+TOOL_REGISTRY_CACHE_SIZE = env.int("TOOL_REGISTRY_CACHE_SIZE", default=256)
+
+# Compiled agent executor cache
+EXECUTOR_CACHE_SIZE = env.int("EXECUTOR_CACHE_SIZE", default=128)
+EXECUTOR_CACHE_TTL = env.int("EXECUTOR_CACHE_TTL", default=3600)
+
+# Stub LLM provider, only meant for benchmarks
+STUB_LLM_ENABLED = env.bool("STUB_LLM_ENABLED", default=False)
+STUB_LLM_LATENCY_MS = env.int("STUB_LLM_LATENCY_MS", default=500)
+STUB_LLM_SCRIPTS = env.json("STUB_LLM_SCRIPTS", default={})  # extra tool-call scripts, by stub model name
+
+# Tool execution
+MCP_TOOL_MAX_PARALLEL = env.int("MCP_TOOL_MAX_PARALLEL", default=4)
+MCP_TOOL_TIMEOUT = env.float("MCP_TOOL_TIMEOUT", default=30)
+
+# Tool result cache
+TOOL_RESULT_CACHE_DEFAULT = env.bool("TOOL_RESULT_CACHE_DEFAULT", default=False)
+TOOL_RESULT_CACHE_TTL = env.int("TOOL_RESULT_CACHE_TTL", default=300)
+TOOL_RESULT_CACHE_SIZE = env.int("TOOL_RESULT_CACHE_SIZE", default=2048)
+
+# Embedding-based tool selection
+EMBEDDING_MODEL = env("EMBEDDING_MODEL", default="BAAI/bge-small-en-v1.5")
+
+# Token-budgeted chat history
+HISTORY_TOKEN_ENCODING = env("HISTORY_TOKEN_ENCODING", default="cl100k_base")
+HISTORY_MAX_MESSAGES = env.int("HISTORY_MAX_MESSAGES", default=200)
+
+# Long-term chat memory
+MEMORY_INDEX_DIR = env("MEMORY_INDEX_DIR", default=str(BASE_DIR / "data" / "memory"))
+MEMORY_MIN_SCORE = env.float("MEMORY_MIN_SCORE", default=0.3)
+
+# Buffered activity log writer
+ACTIVITY_LOG_QUEUE_SIZE = env.int("ACTIVITY_LOG_QUEUE_SIZE", default=10000)
+ACTIVITY_LOG_BATCH_SIZE = env.int("ACTIVITY_LOG_BATCH_SIZE", default=200)
+ACTIVITY_LOG_FLUSH_INTERVAL = env.float("ACTIVITY_LOG_FLUSH_INTERVAL", default=1.0)
+ACTIVITY_LOG_FULL_POLICY = env("ACTIVITY_LOG_FULL_POLICY", default="drop")
+ACTIVITY_LOG_BLOCK_TIMEOUT = env.float("ACTIVITY_LOG_BLOCK_TIMEOUT", default=5)
+
+# Agent metrics aggregation
+METRICS_FLUSH_INTERVAL = env.float("METRICS_FLUSH_INTERVAL", default=5.0)
+
+# Chat recording for offline replays (`manage.py replay_chats`); empty disables it
+CHAT_RECORD_DIR = env("CHAT_RECORD_DIR", default="")
+CHAT_RECORD_SAMPLE_RATE = env.float("CHAT_RECORD_SAMPLE_RATE", default=1.0)
+
+# Request tracing: fraction of chat requests whose stage timings are stored
+TRACE_SAMPLE_RATE = env.float("TRACE_SAMPLE_RATE", default=0.1)
+
+# Prometheus metrics: worker processes share their counters through snapshot files
+PROMETHEUS_MULTIPROC_DIR = env("PROMETHEUS_MULTIPROC_DIR", default=os.path.join(tempfile.gettempdir(), "connectforge-metrics"))
+PROMETHEUS_SYNC_INTERVAL = env.float("PROMETHEUS_SYNC_INTERVAL", default=5.0)
+
+# LLM response cache of agents with `response_cache_ttl` set (temperature 0 only)
+LLM_CACHE_SIZE = env.int("LLM_CACHE_SIZE", default=1024)
+LLM_CACHE_PERSISTENT = env.bool("LLM_CACHE_PERSISTENT", default=False)
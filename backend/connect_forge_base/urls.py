@@ -21,6 +21,9 @@ from drf_yasg import openapi
 from rest_framework import permissions
 from django.urls import include, path
 
+from app.schema import SchemaGenerator
+from app.views import prometheus_metrics
+
 schema_view = get_schema_view(
     openapi.Info(
         title="AgentDoc API",
@@ -29,12 +32,14 @@ schema_view = get_schema_view(
     ),
     public=True,  # Public access for Swagger documentation.
     permission_classes=(permissions.AllowAny,),  # No authentication required.
-    urlconf=settings.ROOT_URLCONF
+    urlconf=settings.ROOT_URLCONF,
+    generator_class=SchemaGenerator,  # documents the async chat views as well
 )
 
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/', include('app.urls')),
+    path('metrics', prometheus_metrics, name='prometheus-metrics'),
     path('swagger/', schema_view.with_ui('swagger', cache_timeout=0), name='schema-swagger-ui'),
 ]